@@ -0,0 +1,186 @@
+"""
+Off-target binding search of primers on a template.
+
+A BindingIndex is built once per template. Both strands are 2-bit encoded and every position gets the
+integer value of the INDEX_K nucleotides starting there (first nucleotide most significant). Sorting these
+values gives a truncated suffix array: all positions whose next j <= INDEX_K nucleotides equal a given
+prefix form one contiguous range, found with two binary searches.
+
+A site with at most m mismatches in the 3' n nucleotides of a primer is found with pigeonhole seeds: the
+n nucleotides are split into m + 1 pieces and at least one of them must match exactly. Every exact hit of
+a piece prefix is a candidate, and candidates are verified by counting the mismatches of the whole window.
+Letters other than a/c/g/t always count as a mismatch, on the primer as well as on the template.
+
+Sites are reported on the top strand: start and end (0-based, end exclusive) of the template region the
+3' end of the primer binds. A primer on the "+" strand has the sequence of that region, a primer on the
+"-" strand has its reverse complement. On circular templates a site across the origin has end > length.
+"""
+
+from argparse import ArgumentParser, Namespace
+from collections import namedtuple
+import numpy as np
+from composition import read_template
+
+NUCLEOTIDES = "acgt"
+INDEX_K = 16
+# Template and primer letters outside a/c/g/t get different codes so they never match each other
+TEMPLATE_GAP = 4
+QUERY_GAP = 5
+QUERY_CHUNK = 1024
+COMPLEMENTS = str.maketrans("acgtACGT", "tgcaTGCA")
+
+TEMPLATE_CODES = np.full(256, TEMPLATE_GAP, dtype=np.uint8)
+QUERY_CODES = np.full(256, QUERY_GAP, dtype=np.uint8)
+for code, nucleotide in enumerate(NUCLEOTIDES):
+    for letter in (nucleotide, nucleotide.upper()):
+        TEMPLATE_CODES[ord(letter)] = code
+        QUERY_CODES[ord(letter)] = code
+
+BindingSite = namedtuple("BindingSite", ["strand", "start", "end", "mismatches"])
+
+def _encode(sequence, table):
+    return table[np.frombuffer(sequence.encode("ascii", "replace"), dtype=np.uint8)]
+
+class BindingIndex():
+
+    def __init__(self, template, circular=False, overhang=64):
+        """
+        Index both strands of a template. A circular template (plasmid) also finds sites across the origin,
+        for primer 3' ends of up to overhang + 1 nucleotides.
+        """
+
+        self.template = template.lower()
+        self.circular = circular
+        self.overhang = overhang if circular else 0
+        self.length = len(self.template)
+
+        reverse_strand = self.template.translate(COMPLEMENTS)[::-1]
+        self._strands = {}
+        for strand, sequence in (("+", self.template), ("-", reverse_strand)):
+            if circular:
+                sequence += sequence[:overhang]
+            codes = _encode(sequence, TEMPLATE_CODES)
+            values = self._prefix_values(codes)
+            order = np.argsort(values, kind="stable")
+            self._strands[strand] = (codes, values[order], order)
+
+    @staticmethod
+    def _prefix_values(codes):
+        """ Value of the INDEX_K nucleotides at every position. Gaps and the padding past the end count as "a": verification rejects them. """
+        padded = np.concatenate((np.where(codes == TEMPLATE_GAP, 0, codes), np.zeros(INDEX_K - 1, dtype=np.uint8))).astype(np.int64)
+        values = np.zeros(len(codes), dtype=np.int64)
+        for offset in range(INDEX_K):
+            values |= padded[offset:offset + len(codes)] << (2 * (INDEX_K - 1 - offset))
+        return values
+
+    def _candidates(self, strand, queries, mismatches):
+        """ (query row, window start) pairs from the pigeonhole seeds of a (Q, n) block of query codes """
+
+        codes, sorted_values, order = self._strands[strand]
+        query_count, length = queries.shape
+        last_start = min(len(codes) - length, self.length - 1)
+        if last_start < 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+        if mismatches >= length:
+            # Every window is within the mismatch budget
+            starts = np.arange(last_start + 1)
+            return np.repeat(np.arange(query_count), starts.size), np.tile(starts, query_count)
+
+        pieces = mismatches + 1
+        bounds = [piece * length // pieces for piece in range(pieces + 1)]
+        rows, starts = [], []
+        for piece_start, piece_end in zip(bounds, bounds[1:]):
+            seed_length = min(piece_end - piece_start, INDEX_K)
+            seeds = queries[:, piece_start:piece_start + seed_length].astype(np.int64)
+            usable = (seeds < 4).all(axis=1)
+            prefix = np.zeros(query_count, dtype=np.int64)
+            for column in range(seed_length):
+                prefix = (prefix << 2) | np.where(usable, seeds[:, column], 0)
+            shift = 2 * (INDEX_K - seed_length)
+            low = np.searchsorted(sorted_values, prefix << shift, side="left")
+            high = np.searchsorted(sorted_values, (prefix + 1) << shift, side="left")
+            counts = np.where(usable, high - low, 0)
+
+            # Expand every [low, high) range of the sorted positions into one flat array
+            total = int(counts.sum())
+            positions = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(low, counts)
+            rows.append(np.repeat(np.arange(query_count), counts))
+            starts.append(order[positions] - piece_start)
+
+        rows = np.concatenate(rows)
+        starts = np.concatenate(starts)
+        inside = (starts >= 0) & (starts <= last_start)
+        keys = np.unique(rows[inside] * (last_start + 1) + starts[inside])
+
+        return keys // (last_start + 1), keys % (last_start + 1)
+
+    def _search_block(self, queries, mismatches):
+        """ Verified sites of a (Q, n) block of query codes: (query row, strand, start, mismatches) arrays per strand """
+
+        offsets = np.arange(queries.shape[1])
+        for strand, (codes, _, _) in self._strands.items():
+            rows, starts = self._candidates(strand, queries, mismatches)
+            counts = (codes[starts[:, None] + offsets] != queries[rows]).sum(axis=1)
+            keep = counts <= mismatches
+            yield strand, rows[keep], starts[keep], counts[keep]
+
+    def search(self, sequences, mismatches=0, three_prime=None):
+        """
+        Binding sites of many primer sequences at once: a list with, for each sequence, the BindingSite of every
+        window where its 3' three_prime nucleotides (the whole primer by default) match with at most
+        `mismatches` mismatches, sorted by strand and position.
+        """
+
+        if self.circular and three_prime is None and any(len(sequence) > self.overhang + 1 for sequence in sequences):
+            raise ValueError(f"Primers longer than {self.overhang + 1} nt need a larger overhang on a circular template")
+        if self.circular and three_prime is not None and three_prime > self.overhang + 1:
+            raise ValueError(f"three_prime can be at most {self.overhang + 1} nt with an overhang of {self.overhang}")
+
+        queries = [sequence[-three_prime:] if three_prime else sequence for sequence in sequences]
+        results = [[] for _ in queries]
+        # Queries of the same length are searched together as one code matrix
+        by_length = {}
+        for index, query in enumerate(queries):
+            by_length.setdefault(len(query), []).append(index)
+
+        for length, indices in by_length.items():
+            if length == 0:
+                continue
+            for block_start in range(0, len(indices), QUERY_CHUNK):
+                block = indices[block_start:block_start + QUERY_CHUNK]
+                codes = _encode("".join(queries[index] for index in block), QUERY_CODES).reshape(len(block), length)
+                for strand, rows, starts, counts in self._search_block(codes, mismatches):
+                    if strand == "-" and starts.size:
+                        # A window of the reverse strand covers the mirrored region of the top strand
+                        starts = (self.length - starts - length) % self.length
+                    for row, start, count in zip(rows.tolist(), starts.tolist(), counts.tolist()):
+                        results[block[row]].append(BindingSite(strand, start, start + length, count))
+
+        for sites in results:
+            sites.sort()
+
+        return results
+
+    def sites(self, sequence, mismatches=0, three_prime=None):
+        """ Binding sites of one primer sequence, see search """
+        return self.search([sequence], mismatches, three_prime)[0]
+
+def main() -> None:
+    parser = ArgumentParser(description="Find every binding site of primers on both strands of a template")
+    parser.add_argument("template", help="Plain or FASTA file with the template sequence", type=str)
+    parser.add_argument("primers", nargs="+", help="Primer sequences")
+    parser.add_argument("-m", "--mismatches", help="Mismatches allowed in the 3' end", type=int, default=0)
+    parser.add_argument("-n", "--three-prime", help="Number of 3' nucleotides to match, defaults to the whole primer", type=int)
+    parser.add_argument("-c", "--circular", help="The template is circular (plasmid)", action="store_true")
+
+    args: Namespace = parser.parse_args()
+    index = BindingIndex(read_template(args.template), args.circular)
+    for primer, sites in zip(args.primers, index.search(args.primers, args.mismatches, args.three_prime)):
+        for site in sites:
+            print(f"{primer}\t{site.strand}\t{site.start + 1}\t{site.end}\t{site.mismatches}")
+
+    return
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+"""
+Memory-compact primer type for holding very large candidate sets.
+
+CompactPrimer has the same public API as Primer but no per-instance __dict__. The sequence is stored
+2-bit packed in a single integer (a=0, c=1, g=2, t=3, nucleotide i in bits 2i and 2i+1). Letters other
+than a, c, g and t are flagged in an ambiguity bitmask and kept verbatim in a short string, so the
+original sequence can always be rebuilt.
+"""
+
+from primer_class import IUPAC_COMPLEMENTS, TM_METRICS, Primer, gc_percentage_calc, melting_temperature_calc, sequence_metric
+
+NUCLEOTIDES = "acgt"
+TO_DIGITS = str.maketrans(NUCLEOTIDES, "0123")
+COMPLEMENTS = str.maketrans(IUPAC_COMPLEMENTS)
+# Every byte of the packed integer holds four nucleotides
+BYTE_TO_NUCLEOTIDES = ["".join(NUCLEOTIDES[(byte >> shift) & 3] for shift in (0, 2, 4, 6)) for byte in range(256)]
+
+def pack_sequence(sequence):
+    """ 2-bit pack a lowercase sequence. Returns (packed, ambiguity mask, ambiguous letters). """
+
+    if not sequence.strip(NUCLEOTIDES):
+        return int(sequence[::-1].translate(TO_DIGITS) or "0", 4), 0, ""
+
+    packed = 0
+    ambiguity = 0
+    ambiguous = []
+    for index, nucleotide in enumerate(sequence):
+        code = NUCLEOTIDES.find(nucleotide)
+        if code < 0:
+            ambiguity |= 1 << index
+            ambiguous.append(nucleotide)
+        else:
+            packed |= code << (2 * index)
+
+    return packed, ambiguity, "".join(ambiguous)
+
+class CompactPrimer():
+
+    __slots__ = ("primer_name", "_packed", "_length", "_ambiguity", "_ambiguous", "_orientation", "_tm_mode")
+
+    def __init__(self, name, sequence, orientation="forward", tm_mode="basic"):
+        """ Initialize a compact primer with a name, DNA sequence and the DNA strand to which the primer binds. By default, the binding is set to the forward strand."""
+
+        sequence = sequence.lower()
+        self.primer_name = name
+        self._length = len(sequence)
+        self._packed, self._ambiguity, self._ambiguous = pack_sequence(sequence)
+        self._orientation = orientation
+        self.tm_mode = tm_mode
+
+    @classmethod
+    def from_sequences(cls, names, sequences, orientation="forward", tm_mode="basic"):
+        """ Bulk-construct compact primers from parallel lists of names and sequences """
+        return [cls(name, sequence, orientation, tm_mode) for name, sequence in zip(names, sequences)]
+
+    @classmethod
+    def from_primer(cls, primer):
+        return cls(primer.name, primer.sequence, primer.orientation, primer.tm_mode)
+
+    def __repr__(self):
+        return f"Name: {self.primer_name}\nSequence: {self.sequence}\nBinding Strand: {self.orientation}"
+
+    def __iter__(self):
+        """ Iterate over the nucleotides in the primer sequence of the CompactPrimer object """
+        yield from self.sequence
+
+    @property
+    def name(self):
+        return self.primer_name
+
+    @property
+    def length(self):
+        return self._length
+
+    @property
+    def sequence(self):
+        """ Unpack the sequence four nucleotides (one byte) at a time """
+
+        packed_bytes = self._packed.to_bytes((self._length + 3) // 4, "little")
+        sequence = "".join([BYTE_TO_NUCLEOTIDES[byte] for byte in packed_bytes])[:self._length]
+        if not self._ambiguity:
+            return sequence
+
+        nucleotides = list(sequence)
+        ambiguous = iter(self._ambiguous)
+        for index in range(self._length):
+            if (self._ambiguity >> index) & 1:
+                nucleotides[index] = next(ambiguous)
+
+        return "".join(nucleotides)
+
+    @property
+    def primer_sequence(self):
+        return self.sequence
+
+    @property
+    def orientation(self):
+        return self._orientation
+
+    @orientation.setter
+    def orientation(self, bound_orientation: str):
+        """Set orientation to 'reverse' if the primer binds to the antisense strand."""
+        self._orientation = bound_orientation
+
+    @property
+    def tm_mode(self):
+        return self._tm_mode
+
+    @tm_mode.setter
+    def tm_mode(self, mode: str):
+        if mode not in TM_METRICS:
+            raise ValueError(f"Unknown Tm mode: {mode}. Use one of {', '.join(TM_METRICS)}")
+        self._tm_mode = mode
+
+    @property
+    def gc_count(self):
+        """ c (01) and g (10) are the codes whose two bits differ; ambiguous positions are packed as 00 """
+        low_bits = (4**self._length - 1) // 3
+        return ((self._packed ^ (self._packed >> 1)) & low_bits).bit_count()
+
+    @property
+    def gc_percentage(self):
+        """ Calculate the % of nucleotides in the primer sequence that are either guanine or cytosine """
+        return gc_percentage_calc(self.gc_count, self._length)
+
+    @property
+    def melting_temperature(self):
+        """ Calculate the melting temperature of the primer in Celcius """
+        if self._tm_mode == "basic":
+            return melting_temperature_calc(self.gc_count, self._length)
+
+        return sequence_metric(self.sequence, TM_METRICS[self._tm_mode])
+
+    def reverse_complement(self):
+        # Letters outside the IUPAC alphabet raise the same KeyError as Primer.reverse_complement
+        for nucleotide in self._ambiguous:
+            Primer.base_complement(nucleotide)
+
+        return self.sequence.translate(COMPLEMENTS)[::-1]
+
+    def homopolymer_check(self):
+        return sequence_metric(self.sequence, "homopolymer")
+
+    def last_nucleotide_check(self):
+        if not self._length:
+            # The same error as indexing the empty sequence of a Primer
+            raise IndexError("string index out of range")
+
+        last = self._length - 1
+        if (self._ambiguity >> last) & 1:
+            return False
+
+        return (self._packed >> (2 * last)) & 3 in (1, 2)
+
+    def hairpin_check(self):
+        return sequence_metric(self.sequence, "hairpin")
+
+    def primer_dimer_check(self):
+        return sequence_metric(self.sequence, "dimer")
+
+    def primer_qc_check(self):
+        """Check to ensure all the letters in the primer nucleotide sequence are in ('a','g','c','t')."""
+        return self._ambiguity == 0
+
+def main():
+    test = CompactPrimer("TDSP1712", "tgaggccgccatccacgc", "reverse")
+    print(test)
+    print(f"length: {test.length}")
+    print(f"gc%: {test.gc_percentage}")
+    print(f"Is G/C last NT? {test.last_nucleotide_check()}")
+    print(f"Melting temp: {test.melting_temperature}")
+    print(f"Homopolymer length: {test.homopolymer_check()}")
+    print(f"Reverse complement: {test.reverse_complement()}")
+    print(f"Hairpin check result: {test.hairpin_check()}")
+    print(f"Primer dimer check: {test.primer_dimer_check()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+Nucleotide, dinucleotide, codon-usage and k-mer composition of sequences.
+
+Sequences are encoded once as arrays of a/c/g/t codes 0-3 (either case), with GAP for every other letter.
+Counts come from np.bincount over those codes, and the k-mers are hashed for all positions at once: the
+value of a window is its k codes as 2-bit digits, first nucleotide most significant, so k-mer counts are a
+bincount of the window values into 4**k bins. Windows holding a GAP are not counted. A Composition adds the
+k-mers of every chunk with np.add.at instead, which does not allocate another 4**k bins per chunk.
+
+A Composition accumulates the counts of one sequence fed in chunks and keeps the last few codes between
+chunks, so k-mers and codons across chunk boundaries are counted exactly once. fasta_composition streams a
+plain or gzip FASTA file record by record with bounded memory. read_fasta_chunks is the FASTA reader of
+primer_designer; read_fasta builds whole records on it and read_template reads one template from a plain
+sequence or FASTA file.
+"""
+
+import gzip
+from argparse import ArgumentParser, Namespace
+import numpy as np
+
+NUCLEOTIDES = "acgt"
+GAP = 4 # code of every letter that is not a/c/g/t
+# Dense k-mer counts need 4**k bins: 16.7 million for k = 12
+MAX_K = 12
+CHUNK_SIZE = 1 << 20 # nucleotides read at a time when streaming
+
+CODES = np.full(256, GAP, dtype=np.uint8)
+for code, nucleotide in enumerate(NUCLEOTIDES):
+    CODES[ord(nucleotide)] = code
+    CODES[ord(nucleotide.upper())] = code
+
+def encode(sequence: str) -> np.ndarray:
+    """ Codes 0-3 of a/c/g/t and GAP for any other character, one per character of the sequence """
+    return CODES[np.frombuffer(sequence.encode("ascii", "replace"), dtype=np.uint8)]
+
+def nucleotide_counts(sequence: str) -> np.ndarray:
+    """ Counts of a, c, g, t and of every other character (last), in one bincount """
+    return np.bincount(encode(sequence), minlength=GAP + 1)
+
+def window_values(codes: np.ndarray, k: int, step: int = 1) -> np.ndarray:
+    """ Value of every complete window of k codes starting at a multiple of step, leaving out the windows with a GAP """
+
+    count = (len(codes) - k) // step + 1 if len(codes) >= k else 0
+    starts = np.arange(count) * step
+    digits = np.where(codes == GAP, 0, codes).astype(np.int64)
+    values = np.zeros(count, dtype=np.int64)
+    for offset in range(k):
+        values |= digits[starts + offset] << (2 * (k - 1 - offset))
+
+    # A window is complete when the running number of gaps does not change across it
+    gaps = np.concatenate(([0], np.cumsum(codes == GAP)))
+    return values[gaps[starts + k] == gaps[starts]]
+
+def kmer_counts(sequence: str, k: int) -> np.ndarray:
+    """ Counts of all 4**k k-mers of a sequence, indexed by k-mer value (aa...a first, tt...t last) """
+    if not 1 <= k <= MAX_K:
+        raise ValueError(f"k must be between 1 and {MAX_K}")
+    return np.bincount(window_values(encode(sequence), k), minlength=4 ** k)
+
+def codon_usage(sequence: str, frame: int = 0) -> np.ndarray:
+    """ Counts of the 64 codons read in one frame (0-2) of a sequence, codons with other letters left out """
+    return np.bincount(window_values(encode(sequence)[frame:], 3, 3), minlength=64)
+
+def kmer_names(k: int) -> list[str]:
+    """ The k-mer of every index of kmer_counts """
+    values = np.arange(4 ** k)
+    letters = np.frombuffer(NUCLEOTIDES.encode("ascii"), dtype=np.uint8)
+    digits = values[:, None] >> (2 * np.arange(k - 1, -1, -1)) & 3
+    return [row.tobytes().decode("ascii") for row in letters[digits]]
+
+class Composition():
+    """
+    Running composition of one sequence fed in chunks: nucleotide counts (a, c, g, t and other characters),
+    dinucleotide counts, the codon usage of frame 1 and the counts of k-mers of one length.
+    """
+
+    def __init__(self, name: str = "", k: int = 4):
+        if not 1 <= k <= MAX_K:
+            raise ValueError(f"k must be between 1 and {MAX_K}")
+        self.name = name
+        self.k = k
+        self.length = 0
+        self.nucleotides = np.zeros(GAP + 1, dtype=np.int64)
+        self.dinucleotides = np.zeros(16, dtype=np.int64)
+        self.codons = np.zeros(64, dtype=np.int64)
+        self.kmers = np.zeros(4 ** k, dtype=np.int64)
+        # Codes at the end of the sequence so far that start windows completed by the next chunk
+        self._tail = np.zeros(0, dtype=np.uint8)
+
+    def add(self, chunk: str) -> None:
+        """ Count the next chunk of the sequence """
+
+        new_codes = encode(chunk)
+        codes = np.concatenate((self._tail, new_codes))
+        tail_length = len(self._tail)
+        self.nucleotides += np.bincount(new_codes, minlength=GAP + 1)
+
+        # Windows that end in the new chunk: the ones starting at most size - 1 codes before it
+        first = max(tail_length - 1, 0)
+        self.dinucleotides += np.bincount(window_values(codes[first:], 2), minlength=16)
+        first = max(tail_length - self.k + 1, 0)
+        np.add.at(self.kmers, window_values(codes[first:], self.k), 1)
+        # Codons start at multiples of 3 from the start of the sequence
+        first = max(tail_length - 2, 0)
+        first += (tail_length - first - self.length) % 3
+        self.codons += np.bincount(window_values(codes[first:], 3, 3), minlength=64)
+
+        self.length += len(new_codes)
+        self._tail = codes[max(len(codes) - max(self.k, 3) + 1, 0):]
+
+    @property
+    def gc_percentage(self) -> float:
+        valid = self.nucleotides[:GAP].sum()
+        return float((self.nucleotides[1] + self.nucleotides[2]) / valid * 100) if valid else 0.0
+
+    def kmer_table(self) -> dict[str, int]:
+        """ {k-mer: count} of the k-mers that occur """
+        names = kmer_names(self.k)
+        return {names[index]: int(self.kmers[index]) for index in np.flatnonzero(self.kmers)}
+
+def sequence_composition(sequence: str, k: int = 4, name: str = "") -> Composition:
+    composition = Composition(name, k)
+    composition.add(sequence)
+    return composition
+
+def read_fasta_chunks(file_path: str, chunk_size: int = CHUNK_SIZE):
+    """
+    Stream a plain or gzip FASTA file as (name, None) at the start of every record followed by (name, sequence chunk)
+    pieces of about chunk_size characters. name is the record ID, the first word of the header. Blank lines and
+    anything before the first header are skipped. No line is ever read whole, so memory stays bounded for
+    unwrapped files too.
+
+    primer_designer and python_tools are separate folders of scripts that never import from each other, so this is
+    a copy of python_tools/dna_translate.read_fasta_chunks. Change both together: the unit tests check that they
+    yield the same pieces.
+    """
+
+    with open(file_path, "rb") as file:
+        gzipped = file.read(2) == b"\x1f\x8b"
+    opener = gzip.open if gzipped else open
+
+    with opener(file_path, "rt") as file:
+        name = None
+        # Sequence lines are joined into chunks of about chunk_size
+        pieces = []
+        size = 0
+        line_start = True
+        while line := file.readline(chunk_size):
+            if line_start and line.startswith(">"):
+                while not line.endswith("\n") and (rest := file.readline(chunk_size)):
+                    line += rest
+                if pieces:
+                    yield name, "".join(pieces)
+                    pieces, size = [], 0
+                name = next(iter(line[1:].split()), "")
+                yield name, None
+            elif name is not None and (piece := line.strip()):
+                pieces.append(piece)
+                size += len(piece)
+                if size >= chunk_size:
+                    yield name, "".join(pieces)
+                    pieces, size = [], 0
+            line_start = line.endswith("\n")
+
+        if pieces:
+            yield name, "".join(pieces)
+
+def read_fasta(file_path: str):
+    """ Yield (name, sequence) for every record of a plain or gzip FASTA file """
+
+    name = None
+    pieces = []
+    for record, chunk in read_fasta_chunks(file_path):
+        if chunk is not None:
+            pieces.append(chunk)
+            continue
+        if name is not None:
+            yield name, "".join(pieces)
+        name, pieces = record, []
+
+    if name is not None:
+        yield name, "".join(pieces)
+
+def read_template(file_path):
+    """ Read a template from a plain sequence file or the first record of a plain or gzip FASTA file """
+    for _, sequence in read_fasta(file_path):
+        return sequence
+
+    with open(file_path, "r") as file:
+        return "".join(line.strip() for line in file)
+
+def fasta_composition(file_path: str, k: int = 4, chunk_size: int = CHUNK_SIZE):
+    """ Yield the Composition of every record of a plain or gzip FASTA file, read chunk_size characters at a time """
+
+    composition = None
+    for name, chunk in read_fasta_chunks(file_path, chunk_size):
+        if chunk is None:
+            if composition is not None:
+                yield composition
+            composition = Composition(name, k)
+        else:
+            composition.add(chunk)
+
+    if composition is not None:
+        yield composition
+
+def main() -> None:
+    parser = ArgumentParser(description="Nucleotide, codon-usage and k-mer composition of every record of a FASTA file")
+    parser.add_argument("input", help="FASTA file, plain or gzip", type=str)
+    parser.add_argument("-k", "--kmer", help=f"k-mer length, at most {MAX_K}", type=int, default=4)
+    parser.add_argument("-o", "--output", help="Tab-separated k-mer counts (record, k-mer, count)", type=str)
+    parser.add_argument("-u", "--codon-usage", help="Tab-separated codon usage of frame 1 (record, codon, count)", type=str)
+
+    args: Namespace = parser.parse_args()
+    kmer_file = open(args.output, "w") if args.output else None
+    codon_file = open(args.codon_usage, "w") if args.codon_usage else None
+    codon_names = kmer_names(3)
+    try:
+        for composition in fasta_composition(args.input, args.kmer):
+            a, c, g, t, other = composition.nucleotides.tolist()
+            print(f"{composition.name}\tlength {composition.length}\ta {a}\tc {c}\tg {g}\tt {t}\tother {other}\tGC {composition.gc_percentage:.2f}%")
+            if kmer_file:
+                kmer_file.writelines(f"{composition.name}\t{kmer}\t{count}\n" for kmer, count in composition.kmer_table().items())
+            if codon_file:
+                codon_file.writelines(f"{composition.name}\t{codon}\t{count}\n" for codon, count in zip(codon_names, composition.codons.tolist()))
+    finally:
+        for file in (kmer_file, codon_file):
+            if file:
+                file.close()
+
+    return
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,301 @@
+"""
+Batched version of the Primer metrics for scoring large candidate libraries.
+
+All sequences of a batch are held in one zero-padded (primers x longest primer) uint8 array of
+lowercase ASCII codes, so every metric is computed as a whole column with NumPy instead of a
+Python loop per primer and per nucleotide. The values match the scalar Primer properties.
+"""
+
+import numpy as np
+from primer_class import Primer, dimer_percentage_calc, gc_percentage_calc, hairpin_percentage_calc, melting_temperature_calc
+
+NUCLEOTIDE_CODES = np.frombuffer(b"acgt", dtype=np.uint8)
+GC_CODES = np.frombuffer(b"gc", dtype=np.uint8)
+BITSET_WIDTH = 64
+# Rows per block of the dimer kernel
+CHUNK_SIZE = 1 << 16
+# Maps an ASCII code to its index in NUCLEOTIDE_CODES
+BASE_INDEX = np.zeros(256, dtype=np.uint8)
+BASE_INDEX[NUCLEOTIDE_CODES] = np.arange(len(NUCLEOTIDE_CODES))
+BYTE_POPCOUNT = np.array([bin(byte).count("1") for byte in range(256)], dtype=np.uint8)
+
+def popcount(values):
+    """ Number of set bits of every element of a uint64 array """
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values)
+    bytes_view = np.ascontiguousarray(values).view(np.uint8).reshape(values.shape + (8,))
+    return BYTE_POPCOUNT[bytes_view].sum(axis=-1)
+
+class PrimerBatch():
+
+    def __init__(self, names, sequences, orientations="forward"):
+        """ Initialize a batch of primers from parallel lists of names and sequences. Orientation can be one value shared by the batch or one value per primer.
+        Raises ValueError for empty sequences, which Primer can only score with ZeroDivisionError or IndexError."""
+
+        sequences = [sequence.lower() for sequence in sequences]
+        self.primer_names = list(names)
+        if len(self.primer_names) != len(sequences):
+            raise ValueError("names and sequences must have the same length")
+
+        if isinstance(orientations, str):
+            orientations = [orientations] * len(sequences)
+        self._orientations = list(orientations)
+        if len(self._orientations) != len(sequences):
+            raise ValueError("orientations must be one value or one value per sequence")
+
+        self._lengths, self._encoded = self.encode(sequences)
+        # An empty row has no 3' nucleotide and no length to take percentages of
+        if not self._lengths.all():
+            raise ValueError("sequences must not be empty")
+
+    @classmethod
+    def from_primers(cls, primers):
+        """ Build a batch from existing Primer objects """
+        primers = list(primers)
+        return cls([primer.name for primer in primers], [primer.sequence for primer in primers], [primer.orientation for primer in primers])
+
+    @staticmethod
+    def encode(sequences):
+        """ Pack the sequences into a zero-padded 2D array of ASCII codes. Returns the lengths and the array."""
+
+        lengths = np.fromiter(map(len, sequences), dtype=np.int64, count=len(sequences))
+        # Non-ASCII letters become '?', which keeps one byte per nucleotide and still fails the QC check.
+        flat = np.frombuffer("".join(sequences).encode("ascii", "replace"), dtype=np.uint8)
+
+        encoded = np.zeros((len(sequences), lengths.max(initial=0)), dtype=np.uint8)
+        rows = np.repeat(np.arange(len(sequences)), lengths)
+        columns = np.arange(flat.size) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        encoded[rows, columns] = flat
+
+        return lengths, encoded
+
+    def __repr__(self):
+        return f"PrimerBatch of {len(self)} primers"
+
+    def __len__(self):
+        return len(self.primer_names)
+
+    def __getitem__(self, index):
+        """ Return the primer at the given index as a scalar Primer object """
+        sequence = self._encoded[index, :self._lengths[index]].tobytes().decode("ascii")
+        return Primer(self.primer_names[index], sequence, self._orientations[index])
+
+    def __iter__(self):
+        """ Iterate over the batch as scalar Primer objects """
+        for index in range(len(self)):
+            yield self[index]
+
+    @property
+    def names(self):
+        return self.primer_names
+
+    @property
+    def length(self):
+        return self._lengths
+
+    @property
+    def sequences(self):
+        return [primer.sequence for primer in self]
+
+    @property
+    def orientations(self):
+        return self._orientations
+
+    @property
+    def gc_count(self):
+        return np.isin(self._encoded, GC_CODES).sum(axis=1)
+
+    @property
+    def gc_percentage(self):
+        """ GC% of every primer in the batch """
+        return self._per_value_pair(self.gc_count, self._lengths, gc_percentage_calc)
+
+    @property
+    def melting_temperature(self):
+        """ Melting temperature of every primer in the batch in Celcius """
+        return self._per_value_pair(self.gc_count, self._lengths, melting_temperature_calc)
+
+    @staticmethod
+    def _per_value_pair(first, second, calc):
+        """
+        The percentage metrics only depend on a pair of small integers (e.g. gc count and length), so the
+        scalar formula is evaluated once per distinct pair and scattered back. This keeps Python's rounding exactly.
+        """
+        stride = int(second.max(initial=0)) + 1
+        keys = first.astype(np.int64) * stride + second
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        values = np.array([calc(int(key) // stride, int(key) % stride) for key in unique_keys], dtype=float)
+
+        return values[inverse.reshape(-1)]
+
+    def _valid_positions(self):
+        return np.arange(self._encoded.shape[1]) < self._lengths[:, None]
+
+    def homopolymer_check(self):
+        """ Longest homopolymeric stretch of every primer in the batch """
+
+        encoded = self._encoded
+        longest = np.ones(len(self), dtype=np.int64)
+        current = np.ones(len(self), dtype=np.int64)
+        # One vectorised step per column: the loop runs primer-length times, not batch-size times.
+        for column in range(1, encoded.shape[1]):
+            same = (encoded[:, column] == encoded[:, column - 1]) & (column < self._lengths)
+            current += 1
+            current[~same] = 1
+            np.maximum(longest, current, out=longest)
+
+        return longest
+
+    def last_nucleotide_check(self):
+        """ True for every primer whose 3' nucleotide is G or C """
+        last_nucleotide = self._encoded[np.arange(len(self)), self._lengths - 1]
+        return np.isin(last_nucleotide, GC_CODES)
+
+    def primer_qc_check(self):
+        """ True for every primer whose sequence only contains a, g, c and t """
+        valid = np.isin(self._encoded, NUCLEOTIDE_CODES) | ~self._valid_positions()
+        return valid.all(axis=1)
+
+    def _bitset_rows(self):
+        """ Rows that fit the 64-bit hairpin/dimer kernels: only a, c, g, t and at most 64 nucleotides """
+        return self.primer_qc_check() & (self._lengths <= BITSET_WIDTH)
+
+    def _base_masks(self, rows, reverse=False):
+        """
+        uint64 bit-packed form of the given rows: masks[b] has bit i set where the nucleotide at i is NUCLEOTIDE_CODES[b].
+        With reverse=True bit i refers to the i-th nucleotide from the 3' end instead.
+        """
+
+        encoded = self._encoded[rows, :BITSET_WIDTH]
+        width = encoded.shape[1]
+        matches = encoded == NUCLEOTIDE_CODES[:, None, None]
+        if reverse:
+            matches = matches[..., ::-1]
+        # Eight little-endian bytes of packed matches per row are the uint64 mask
+        packed = np.zeros(matches.shape[:2] + (8,), dtype=np.uint8)
+        packed[..., :(width + 7) // 8] = np.packbits(matches, axis=-1, bitorder="little")
+        masks = packed.view("<u8")[..., 0].astype(np.uint64)
+        if reverse:
+            # The flipped rows end at bit width - 1; move the 3' end of every primer down to bit 0
+            masks >>= (width - self._lengths[rows]).astype(np.uint64)
+
+        return masks
+
+    def hairpin_check(self):
+        """
+        Hairpin percentage of every primer in the batch.
+
+        Runs the bitset walker scan of hairpin_stem_length with one uint64 per primer, so each step of
+        the scan is a handful of array operations over the whole batch. Primers longer than 64 nt or
+        with other letters go through the scalar Primer.hairpin_check.
+        """
+
+        max_hairpin = np.zeros(len(self), dtype=np.int64)
+        rows = np.flatnonzero(self._bitset_rows())
+        if rows.size:
+            max_hairpin[rows] = self._hairpin_stems(rows)
+
+        percentages = self._per_value_pair(max_hairpin, self._lengths, hairpin_percentage_calc)
+        for row in np.flatnonzero(~self._bitset_rows()):
+            percentages[row] = self[row].hairpin_check()
+
+        return percentages
+
+    def _hairpin_stems(self, rows):
+        lengths = self._lengths[rows]
+        masks = self._base_masks(rows)
+        # a pairs with t, c with g: the complement of base index b is 3 - b
+        pairs_with = masks[::-1]
+        base_index = BASE_INDEX[self._encoded[rows]]
+        row_index = np.arange(len(rows))
+        one = np.uint64(1)
+
+        runs = [np.full(len(rows), np.iinfo(np.uint64).max, dtype=np.uint64)]
+        max_hairpin = np.zeros(len(rows), dtype=np.int64)
+        for step in range(int(lengths.max()) - 1):
+            j = lengths - 1 - step
+            active = j > 0
+            j = np.where(active, j, 0)
+            alive = np.where(active, (one << j.astype(np.uint64)) - one, np.uint64(0))
+            paired = pairs_with[base_index[row_index, j], row_index]
+
+            walkers = runs[0] & alive
+            next_runs = [((walkers & paired) << one) | (walkers & ~paired)]
+            for run in runs:
+                extended = run & alive & paired
+                if not extended.any():
+                    break
+                next_runs.append(extended << one)
+                np.maximum(max_hairpin, np.where(extended != 0, len(next_runs) - 1, 0), out=max_hairpin)
+
+            runs = next_runs
+
+        return max_hairpin
+
+    def primer_dimer_check(self):
+        """
+        Self-dimer percentage of every primer in the batch.
+
+        The offsets are scanned one at a time over the whole batch of bit-packed primers, so a step is a
+        few array operations on one uint64 per primer. Primers where the scalar check divides by zero (no
+        complementary pair at all) are NaN.
+        Primers longer than 64 nt or with other letters go through the scalar Primer.primer_dimer_check.
+        """
+
+        percentages = np.full(len(self), np.nan)
+        rows = np.flatnonzero(self._bitset_rows())
+        for start in range(0, rows.size, CHUNK_SIZE):
+            chunk = rows[start:start + CHUNK_SIZE]
+            max_dimer, max_dimer_overlap = self._dimer_alignments(chunk)
+            paired = max_dimer > 0
+            percentages[chunk[paired]] = self._per_value_pair(max_dimer[paired], max_dimer_overlap[paired], dimer_percentage_calc)
+
+        for row in np.flatnonzero(~self._bitset_rows()):
+            try:
+                percentages[row] = self[row].primer_dimer_check()
+            except ZeroDivisionError:
+                pass
+
+        return percentages
+
+    def _dimer_alignments(self, rows):
+        lengths = self._lengths[rows]
+        masks = self._base_masks(rows)
+        reverse_masks = self._base_masks(rows, reverse=True)
+        # With a, c, g, t as 0-3 two nucleotides pair (a-t, c-g) when both bits of their codes differ, so the
+        # pairs of an offset come from two bit planes and the positions both primers cover
+        planes = (masks[1] | masks[3], masks[2] | masks[3], np.bitwise_or.reduce(masks))
+        low, high, valid = reverse_masks[1] | reverse_masks[3], reverse_masks[2] | reverse_masks[3], np.bitwise_or.reduce(reverse_masks)
+
+        max_dimer = np.zeros(len(rows), dtype=np.int64)
+        best_offset = np.zeros(len(rows), dtype=np.int64)
+        for offset in range(2 * int(lengths.max(initial=1)) - 1):
+            shifts = lengths - 1 - offset
+            left = np.maximum(shifts, 0).astype(np.uint64)
+            right = np.maximum(-shifts, 0).astype(np.uint64)
+            aligned_low, aligned_high, aligned_valid = ((plane << left) >> right for plane in planes)
+            dimer_length = popcount((aligned_low ^ low) & (aligned_high ^ high) & aligned_valid & valid).astype(np.int64)
+
+            # The first offset with the most pairs wins
+            better = dimer_length > max_dimer
+            max_dimer = np.where(better, dimer_length, max_dimer)
+            best_offset[better] = offset
+
+        max_dimer_overlap = np.minimum(best_offset, lengths - 1) - np.maximum(0, best_offset - lengths + 1) + 1
+
+        return max_dimer, max_dimer_overlap
+
+def main():
+    batch = PrimerBatch(["TDSP1712", "TDSP1713"], ["tgaggccgccatccacgc", "acttggcagtacatctacgtattagtcatcgctatta"], "reverse")
+    print(batch)
+    print(f"length: {batch.length}")
+    print(f"gc%: {batch.gc_percentage}")
+    print(f"Is G/C last NT? {batch.last_nucleotide_check()}")
+    print(f"Melting temp: {batch.melting_temperature}")
+    print(f"Homopolymer length: {batch.homopolymer_check()}")
+    print(f"Hairpin check result: {batch.hairpin_check()}")
+    print(f"Primer dimer check: {batch.primer_dimer_check()}")
+    print(f"Passes QC: {batch.primer_qc_check()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+Benchmark of the Primer and PrimerBatch metrics across sequence lengths and batch sizes.
+
+Every method in METHODS runs over a batch of random Primer objects, and every method in BATCH_METHODS over
+the same sequences as one PrimerBatch, for each combination of length and batch size. Primers cache their
+derived metrics, so each repeat builds fresh primers and batches and only the method calls are timed.
+Small batches are run several times per repeat so that every timing is long enough to be stable. The time is
+the best of the repeats; peak memory is measured with tracemalloc in a separate, untimed pass.
+
+Results are saved as JSON. Absolute timings only mean something on the machine that made them, so every run
+also times reference_kernel, a fixed pure-Python loop that does not touch this repository, and stores each
+timing relative to it. Pass --baseline with the results of an earlier run to compare against them: every entry
+whose relative timing grew by more than the tolerance is reported and the script exits with status 1.
+
+The default batch sizes stop at 10,000 primers to keep a run to a few minutes. --full runs the sizes
+FULL_BATCH_SIZES up to a million primers, which takes hours for every method and length; limit it with -m,
+-b and -l, e.g.
+
+    python primer_benchmark.py --full -l 20 -m hairpin_check -b hairpin_check
+"""
+
+import gc
+import json
+import math
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from argparse import ArgumentParser, Namespace
+from primer_batch import PrimerBatch
+from primer_class import SCORING_ERRORS, Primer, disable_metric_cache
+
+METHODS = {
+    "gc_percentage": lambda primer: primer.gc_percentage,
+    "melting_temperature": lambda primer: primer.melting_temperature,
+    "melting_temperature_nn": lambda primer: primer.melting_temperature,
+    "last_nucleotide_check": lambda primer: primer.last_nucleotide_check(),
+    "homopolymer_check": lambda primer: primer.homopolymer_check(),
+    "reverse_complement": lambda primer: primer.reverse_complement(),
+    "hairpin_check": lambda primer: primer.hairpin_check(),
+    "primer_dimer_check": lambda primer: primer.primer_dimer_check(),
+    "primer_qc_check": lambda primer: primer.primer_qc_check(),
+}
+BATCH_METHODS = {
+    "gc_percentage": lambda batch: batch.gc_percentage,
+    "melting_temperature": lambda batch: batch.melting_temperature,
+    "last_nucleotide_check": lambda batch: batch.last_nucleotide_check(),
+    "homopolymer_check": lambda batch: batch.homopolymer_check(),
+    "hairpin_check": lambda batch: batch.hairpin_check(),
+    "primer_dimer_check": lambda batch: batch.primer_dimer_check(),
+    "primer_qc_check": lambda batch: batch.primer_qc_check(),
+}
+DEFAULT_LENGTHS = [10, 20, 50, 100, 200]
+DEFAULT_BATCH_SIZES = [1, 100, 10_000]
+FULL_BATCH_SIZES = [1, 1_000, 1_000_000]
+# Entries faster than this per call are too noisy to flag as regressions
+NOISE_FLOOR_US = 1.0
+# Every timing covers at least MIN_TIME seconds by running the batch several times, up to MAX_ROUNDS
+MIN_TIME = 0.05
+MAX_ROUNDS = 1000
+
+def random_sequences(length, count, seed=0):
+    generator = random.Random(f"{seed}-{length}")
+    return ["".join(generator.choices("acgt", k=length)) for _ in range(count)]
+
+def reference_kernel(sequences):
+    """ Fixed pure-Python workload the timings are divided by: a G/C count one nucleotide at a time """
+    count = 0
+    for sequence in sequences:
+        for nucleotide in sequence:
+            if nucleotide in "gc":
+                count += 1
+    return count
+
+def reference_time(repeats=20):
+    """ Best time in microseconds of reference_kernel over 1,000 random 100-mers """
+    sequences = random_sequences(100, 1000)
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        reference_kernel(sequences)
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1e6
+
+def _primers(sequences, method):
+    tm_mode = "nearest_neighbour" if method == "melting_temperature_nn" else "basic"
+    return [Primer(f"P{index}", sequence, tm_mode=tm_mode) for index, sequence in enumerate(sequences)]
+
+def _batch(sequences):
+    return PrimerBatch([f"P{index}" for index in range(len(sequences))], sequences)
+
+def benchmark_method(method, sequences, repeats=3, measure_memory=True, kind="primer"):
+    """
+    Best time in seconds over the repeats and peak traced memory in bytes of one method over a batch of sequences.
+    kind "primer" calls METHODS[method] on one Primer per sequence, kind "batch" calls BATCH_METHODS[method] once on a PrimerBatch.
+    """
+
+    if kind == "batch":
+        build = _batch
+
+        def run(batch):
+            BATCH_METHODS[method](batch)
+    else:
+        method_call = METHODS[method]
+
+        def build(sequences):
+            return _primers(sequences, method)
+
+        def run(primers):
+            for primer in primers:
+                # Unscorable primers (e.g. no base pair for the dimer check) still cost the time until they fail
+                try:
+                    method_call(primer)
+                except SCORING_ERRORS:
+                    pass
+
+    def timed(rounds):
+        # Fresh primers per round, built before the clock starts
+        batches = [build(sequences) for _ in range(rounds)]
+        # Like timeit, keep collections of the primers built above out of the timing
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            for batch in batches:
+                run(batch)
+            return (time.perf_counter() - start) / rounds
+        finally:
+            gc.enable()
+
+    # Like timeit's autorange: small batches are repeated until a timing covers at least MIN_TIME
+    first = timed(1)
+    rounds = min(max(1, math.ceil(MIN_TIME / first)) if first else MAX_ROUNDS, MAX_ROUNDS)
+    best = min([first] + [timed(rounds) for _ in range(repeats)])
+
+    peak = None
+    if measure_memory:
+        batch = build(sequences)
+        tracemalloc.start()
+        run(batch)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return best, peak
+
+def run_benchmarks(methods, batch_methods, lengths, batch_sizes, repeats=3, measure_memory=True, seed=0, reference_us=1.0):
+    results = []
+    for length in lengths:
+        for batch_size in batch_sizes:
+            sequences = random_sequences(length, batch_size, seed)
+            for kind, kind_methods in (("primer", methods), ("batch", batch_methods)):
+                for method in kind_methods:
+                    seconds, peak = benchmark_method(method, sequences, repeats, measure_memory, kind)
+                    per_call_us = seconds / batch_size * 1e6
+                    results.append({
+                        "kind": kind,
+                        "method": method,
+                        "length": length,
+                        "batch_size": batch_size,
+                        "seconds": seconds,
+                        "per_call_us": per_call_us,
+                        "relative": per_call_us / reference_us,
+                        "peak_memory_bytes": peak,
+                    })
+                    print(f"{kind:6} {method:24} length {length:4} batch {batch_size:8}: {per_call_us:10.2f} us/call", file=sys.stderr)
+
+    return results
+
+def compare_to_baseline(results, baseline, tolerance=0.25):
+    """
+    (entry, baseline entry, ratio) for every result whose timing relative to the reference kernel grew by more
+    than the tolerance over its baseline entry
+    """
+
+    reference = {(entry["kind"], entry["method"], entry["length"], entry["batch_size"]): entry for entry in baseline["results"]}
+    regressions = []
+    for entry in results:
+        previous = reference.get((entry["kind"], entry["method"], entry["length"], entry["batch_size"]))
+        if previous is None or max(entry["per_call_us"], previous["per_call_us"]) < NOISE_FLOOR_US:
+            continue
+        ratio = entry["relative"] / previous["relative"] if previous["relative"] else float("inf")
+        if ratio > 1 + tolerance:
+            regressions.append((entry, previous, ratio))
+
+    return regressions
+
+def main():
+    parser = ArgumentParser(description="Benchmark the Primer and PrimerBatch metrics across sequence lengths and batch sizes")
+    parser.add_argument("-o", "--output", help="JSON file for the results", type=str, default="primer_benchmark.json")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to check for regressions against", type=str)
+    parser.add_argument("-t", "--tolerance", help="Allowed slowdown against the baseline as a fraction", type=float, default=0.25)
+    parser.add_argument("-m", "--methods", help="Primer methods to benchmark", nargs="*", choices=list(METHODS), default=list(METHODS))
+    parser.add_argument("-b", "--batch-methods", help="PrimerBatch methods to benchmark", nargs="*", choices=list(BATCH_METHODS), default=list(BATCH_METHODS))
+    parser.add_argument("-l", "--lengths", help="Sequence lengths", nargs="+", type=int, default=DEFAULT_LENGTHS)
+    parser.add_argument("-n", "--batch-sizes", help="Number of primers per batch", nargs="+", type=int, default=DEFAULT_BATCH_SIZES)
+    parser.add_argument("--full", help=f"Use the batch sizes {' '.join(map(str, FULL_BATCH_SIZES))}", action="store_true")
+    parser.add_argument("-r", "--repeats", help="Timed repeats per entry, the best is kept", type=int, default=3)
+    parser.add_argument("--no-memory", help="Skip the tracemalloc pass", action="store_true")
+    parser.add_argument("--seed", help="Seed of the random sequences", type=int, default=0)
+
+    args: Namespace = parser.parse_args()
+    batch_sizes = FULL_BATCH_SIZES if args.full else args.batch_sizes
+    # The shared LRU would turn repeats into cache hits
+    disable_metric_cache()
+    reference_us = reference_time()
+    results = run_benchmarks(args.methods, args.batch_methods, args.lengths, batch_sizes, args.repeats, not args.no_memory, args.seed, reference_us)
+    report = {"python": platform.python_version(), "platform": platform.platform(), "seed": args.seed, "reference_us": reference_us, "results": results}
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=4)
+
+    if args.baseline:
+        with open(args.baseline, "r") as file:
+            baseline = json.load(file)
+        regressions = compare_to_baseline(results, baseline, args.tolerance)
+        for entry, previous, ratio in regressions:
+            print(f"Regression: {entry['kind']} {entry['method']} length {entry['length']} batch {entry['batch_size']}: "
+                  f"{previous['per_call_us']:.2f} -> {entry['per_call_us']:.2f} us/call ({ratio:.2f}x relative to the reference)")
+        if regressions:
+            return 1
+        print(f"No regressions against {args.baseline}")
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,14 +1,227 @@
 import math
+from functools import lru_cache
+from thermodynamics import nn_melting_temperature
 ## Reference for primer conditions to design or select optimal primers: https://dnacore.mgh.harvard.edu/new-cgi-bin/site/pages/sequencing_pages/primer_design.jsp
 
+def gc_percentage_calc(gc_count, length):
+    """ Calculate the GC% of a sequence from its G/C count and length. Shared by Primer and PrimerBatch so both round identically. """
+
+    gc_percentage = round((gc_count/length), 4)
+
+    return round(gc_percentage*100, 2)
+
+def melting_temperature_calc(gc_count, length):
+    """ Calculate the melting temperature in Celcius of a sequence from its G/C count and length. """
+
+    at_count = length - gc_count
+
+    if length <= 14:
+        # Formula 1:
+        melting_temp = (2*at_count) + (4*gc_count)
+        # Formula 1 only works for oligos shorter than 14 bp.
+
+    else:
+    # Formula 2:
+        melting_temp = 64.9 + ((41*(gc_count - 16.4))/length)
+    ## Formula 2 gave similar numbers to the IDT oligo analyser tool under ideal conditions.
+    # Formula 3 does not skew the numbers as bad under low GC% and long length conditions.
+
+    # Formula 3:
+    # melting_temp = 81.5 + (0.41*gc_count) - 675/len(sequence)
+    ## Formula 3 gave comparable numbers (+/- 5 Celcius) to IDT tool: https://eu.idtdna.com/calc/analyzer
+    # This formula becomes the most inaccurate for long oligos (>30 bases) with low GC% (<40%)
+
+    # Formula 4:
+    # melting_temp = 81.5 + ((41*gc_count)/len(sequence)) - (675/len(sequence)) + (16.6 * math.log(0.05, 10))#
+
+    melting_temp_rounded = round(melting_temp, 2)
+
+    return melting_temp_rounded
+
+def homopolymer_length(sequence):
+    """ Length of the longest run of one repeated nucleotide in the sequence. """
+
+    last_nucleotide = ""
+    current_nt_count = 1
+    max_nt_count = 1
+    for letter in sequence:
+        if letter == last_nucleotide:
+            current_nt_count += 1
+
+        elif letter != last_nucleotide:
+            current_nt_count = 1
+
+        if max_nt_count < current_nt_count:
+            max_nt_count = current_nt_count
+
+        last_nucleotide = letter
+
+    return max_nt_count
+
+def hairpin_percentage_calc(max_hairpin, length):
+    """ Share of the sequence covered by both arms of a hairpin stem of the given length. """
+
+    hairpin_percentage = (2 * max_hairpin) / length * 100
+
+    return round(hairpin_percentage, 2)
+
+def base_masks(sequence):
+    """ Bit-packed form of a sequence: one integer per nucleotide with bit i set where sequence[i] is that nucleotide. """
+
+    masks = {}
+    for index, nucleotide in enumerate(sequence):
+        masks[nucleotide] = masks.get(nucleotide, 0) | (1 << index)
+
+    return masks
+
+# Watson-Crick pairs counted by the hairpin and dimer scans. IUPAC ambiguity codes never pair, not even
+# with their complement: n is not known to pair with n.
+BASE_PAIRS = {"a": "t", "t": "a", "g": "c", "c": "g"}
+
+def pairing_masks(sequence):
+    """ {nucleotide: bitmask} with bit i set where sequence[i] pairs with that nucleotide, leaving out ambiguous positions """
+
+    pairs = {}
+    for nucleotide, mask in base_masks(sequence).items():
+        if nucleotide in BASE_PAIRS:
+            pairs[BASE_PAIRS[nucleotide]] = mask
+
+    return pairs
+
+def hairpin_stem_length(sequence):
+    """
+    Longest hairpin stem found by the hairpin scan of Primer.hairpin_check.
+
+    The scan starts one walker at every index i and moves a second pointer j down from the 3' end.
+    A walker steps i forward when sequence[i] pairs with sequence[j] and the stem count resets on a mismatch.
+    All walkers share the same j, so they are run together as bitsets: runs[k] holds the positions of
+    the walkers whose current stem is at least k long. Each step costs a few integer operations per
+    stem length instead of a pass over every start position.
+    """
+
+    length = len(sequence)
+    # pairs_with[y] has bit i set when sequence[i] pairs with y
+    pairs_with = pairing_masks(sequence)
+
+    runs = [(1 << length) - 1]
+    max_hairpin = 0
+    for j in range(length - 1, 0, -1):
+        # Only walkers with i < j are still comparing
+        alive = (1 << j) - 1
+        paired = pairs_with.get(sequence[j], 0)
+        walkers = runs[0] & alive
+        next_runs = [((walkers & paired) << 1) | (walkers & ~paired)]
+        for run in runs:
+            extended = run & alive & paired
+            if not extended:
+                break
+            next_runs.append(extended << 1)
+
+        runs = next_runs
+        if max_hairpin < len(runs) - 1:
+            max_hairpin = len(runs) - 1
+
+    return max_hairpin
+
+def dimer_percentage_calc(max_dimer, max_dimer_overlap):
+    """ Complementary share of the best dimer alignment. """
+
+    return round((max_dimer/max_dimer_overlap*100), 2)
+
+def dimer_alignment(sequence, partner):
+    """
+    Best antiparallel alignment of sequence against partner, returned as (max_dimer, max_dimer_overlap).
+
+    Every alignment offset pairs sequence[a] with partner[offset - a]. The offsets are scanned in order
+    and the first one with the most complementary pairs wins. Instead of building the full pairing
+    matrix, each offset is a shift of the bit-packed sequence against the bit-packed reverse of the
+    partner, counted with int.bit_count(), so no per-pair objects are allocated.
+    """
+
+    length = len(sequence)
+    partner_length = len(partner)
+    # partner_pairs[x] has bit k set when partner[-1 - k] pairs with nucleotide x
+    partner_pairs = pairing_masks(partner[::-1])
+    masks = [(mask, partner_pairs[nucleotide]) for nucleotide, mask in base_masks(sequence).items() if nucleotide in partner_pairs]
+
+    max_dimer = 0
+    max_dimer_overlap = 0
+    for offset in range(length + partner_length - 1):
+        shift = partner_length - 1 - offset
+        dimer_length = 0
+        for mask, partner_mask in masks:
+            aligned = mask << shift if shift >= 0 else mask >> -shift
+            dimer_length += (aligned & partner_mask).bit_count()
+
+        if max_dimer < dimer_length:
+            max_dimer = dimer_length
+            max_dimer_overlap = min(offset, length - 1) - max(0, offset - partner_length + 1) + 1
+
+    return max_dimer, max_dimer_overlap
+
+# Complement of every IUPAC nucleotide code
+IUPAC_COMPLEMENTS = {
+    "a": "t", "t": "a", "g": "c", "c": "g",
+    "r": "y", "y": "r", "k": "m", "m": "k",
+    "b": "v", "v": "b", "d": "h", "h": "d",
+    "s": "s", "w": "w", "n": "n"
+}
+
+# Errors raised when scoring sequences with letters outside the IUPAC alphabet, or too short or repetitive to align
+SCORING_ERRORS = (KeyError, ZeroDivisionError, IndexError)
+
+# Metric used for melting_temperature under each Tm mode
+TM_METRICS = {
+    "basic": "melting_temperature",
+    "nearest_neighbour": "melting_temperature_nn",
+}
+
+def _compute_metric(sequence, metric):
+    if metric == "gc_count":
+        return sequence.count("g") + sequence.count("c")
+    if metric == "melting_temperature":
+        return melting_temperature_calc(sequence_metric(sequence, "gc_count"), len(sequence))
+    if metric == "melting_temperature_nn":
+        return nn_melting_temperature(sequence)
+    if metric == "homopolymer":
+        return homopolymer_length(sequence)
+    if metric == "hairpin":
+        return hairpin_percentage_calc(hairpin_stem_length(sequence), len(sequence))
+    if metric == "dimer":
+        max_dimer, max_dimer_overlap = dimer_alignment(sequence, sequence)
+        return dimer_percentage_calc(max_dimer, max_dimer_overlap)
+
+    raise ValueError(f"Unknown primer metric: {metric}")
+
+_shared_metrics = None
+
+def enable_metric_cache(maxsize=1_000_000):
+    """ Opt in to a process-wide LRU of derived metrics keyed by sequence, so duplicate oligos are computed once across primers and files. """
+    global _shared_metrics
+    _shared_metrics = lru_cache(maxsize=maxsize)(_compute_metric)
+
+def disable_metric_cache():
+    global _shared_metrics
+    _shared_metrics = None
+
+def sequence_metric(sequence, metric):
+    """ One of gc_count, melting_temperature(_nn), homopolymer, hairpin or dimer for a lowercase sequence, through the shared LRU if enabled """
+    if _shared_metrics is None:
+        return _compute_metric(sequence, metric)
+
+    return _shared_metrics(sequence, metric)
+
 class Primer():
 
-    def __init__(self, name, sequence, orientation="forward"):
-        """ Initialize a primer object that binds to a given DNA sequence with a name, DNA sequence and the DNA strand to which the primer binds. By default, the binding is set to the forward strand."""
+    def __init__(self, name, sequence, orientation="forward", tm_mode="basic"):
+        """ Initialize a primer object that binds to a given DNA sequence with a name, DNA sequence and the DNA strand to which the primer binds. By default, the binding is set to the forward strand.
+        tm_mode selects the melting temperature model: "basic" (GC count formula) or "nearest_neighbour" (SantaLucia 1998 with salt correction)."""
 
         self.primer_name = name
+        self._metrics = {}
         self.primer_sequence = sequence.lower()
         self._orientation = orientation
+        self.tm_mode = tm_mode
 
     def __repr__(self):
         return f"Name: {self.primer_name}\nSequence: {self.primer_sequence}\nBinding Strand: {self.orientation}"
@@ -26,10 +239,24 @@ class Primer():
     def length(self):
         return len(self.primer_sequence)
     
+    @property
+    def primer_sequence(self):
+        return self._sequence
+    
+    @primer_sequence.setter
+    def primer_sequence(self, sequence: str):
+        """ Changing the sequence drops every cached metric of the old one """
+        self._sequence = sequence.lower()
+        self._metrics.clear()
+    
     @property
     def sequence(self):
         return self.primer_sequence
     
+    @sequence.setter
+    def sequence(self, sequence: str):
+        self.primer_sequence = sequence
+    
     @property
     def orientation(self):
         return self._orientation
@@ -39,97 +266,59 @@ class Primer():
         """Set orientation to 'reverse' if the primer binds to the antisense strand."""
         self._orientation = bound_orientation
     
+    def _metric(self, metric):
+        """ Derived metrics are computed once per sequence and kept until the sequence changes """
+        if metric not in self._metrics:
+            if metric == "melting_temperature":
+                # The basic Tm only needs the G/C count, which is memoised on its own
+                self._metrics[metric] = melting_temperature_calc(self.gc_count, self.length)
+            else:
+                self._metrics[metric] = sequence_metric(self.primer_sequence, metric)
+
+        return self._metrics[metric]
+    
+    @property
+    def tm_mode(self):
+        return self._tm_mode
+    
+    @tm_mode.setter
+    def tm_mode(self, mode: str):
+        if mode not in TM_METRICS:
+            raise ValueError(f"Unknown Tm mode: {mode}. Use one of {', '.join(TM_METRICS)}")
+        self._tm_mode = mode
+    
     @property
     def gc_count(self):
-        sequence = self.primer_sequence
-        gc_count = 0
-        for nucleotide in sequence:
-            if nucleotide in ("g", "c"):
-                gc_count += 1
-
-        return gc_count
+        return self._metric("gc_count")
     
     @property
     def gc_percentage(self):
         """ Calculate the % of nucleotides in the primer sequence that are either guanine or cytosine """
             
-        gc_percentage = round((self.gc_count/len(self.primer_sequence)), 4)
-
-        return round(gc_percentage*100, 2)
+        return gc_percentage_calc(self.gc_count, self.length)
     
     @property
     def melting_temperature(self):
         """ Calculate the melting temperature of the primer in Celcius """
-        sequence = self.primer_sequence
-
-        gc_count = self.gc_count
-        at_count = self.length - gc_count
-
-        if self.length <= 14:
-            # Formula 1:
-            melting_temp = (2*at_count) + (4*gc_count)
-            # Formula 1 only works for oligos shorter than 14 bp.
-
-        else:
-        # Formula 2:
-            melting_temp = 64.9 + ((41*(gc_count - 16.4))/self.length)
-        ## Formula 2 gave similar numbers to the IDT oligo analyser tool under ideal conditions.
-        # Formula 3 does not skew the numbers as bad under low GC% and long length conditions.
-
-        # Formula 3:
-        # melting_temp = 81.5 + (0.41*gc_count) - 675/len(sequence)
-        ## Formula 3 gave comparable numbers (+/- 5 Celcius) to IDT tool: https://eu.idtdna.com/calc/analyzer
-        # This formula becomes the most inaccurate for long oligos (>30 bases) with low GC% (<40%)
-
-        # Formula 4:
-        # melting_temp = 81.5 + ((41*gc_count)/len(sequence)) - (675/len(sequence)) + (16.6 * math.log(0.05, 10))#
-
-        melting_temp_rounded = round(melting_temp, 2)
-
-        return melting_temp_rounded
+        return self._metric(TM_METRICS[self.tm_mode])
       
     @staticmethod
     def base_complement(nucleotide):
-        base_pairs = {
-            "a": "t",
-            "t": "a",
-            "g": "c",
-            "c": "g"
-        }
-        return base_pairs[nucleotide]
+        """ Complement of a nucleotide or IUPAC ambiguity code (r and y, k and m, b and v, d and h; s, w and n are their own) """
+        return IUPAC_COMPLEMENTS[nucleotide]
 
     def reverse_complement(self):
         
         sense_direction = self.primer_sequence.lower()
         sense_reverse = sense_direction[::-1] # no built-in function to reverse. Use splicing in reverse direction.
         # print(sense_reverse)
-        sense_reverse_complement = ""
-        for letter in sense_reverse:
-            complement = self.base_complement(letter)
-            sense_reverse_complement += complement
+        sense_reverse_complement = "".join(map(self.base_complement, sense_reverse))
 
         return sense_reverse_complement
     
     def homopolymer_check(self):
-        sequence = self.primer_sequence
-
-        last_nucleotide = ""
-        current_nt_count = 1
-        max_nt_count = 1
-        for letter in sequence:
-            if letter == last_nucleotide:
-                current_nt_count += 1
-
-            elif letter != last_nucleotide:
-                current_nt_count = 1
-
-            if max_nt_count < current_nt_count:
-                max_nt_count = current_nt_count
-
-            last_nucleotide = letter
-
         # Homopolymeric stretch in primers should not exceed 6 nucleotides        
-        return max_nt_count
+        return self._metric("homopolymer")
     
     def last_nucleotide_check(self):
         last_nucleotide = self.primer_sequence[len(self.primer_sequence)-1]
@@ -140,106 +329,12 @@ class Primer():
         return False
 
     def hairpin_check(self):
-
-        sequence = self.sequence
-        length = len(sequence)
-        
-        max_hairpin = 0
-        for index, _ in enumerate(sequence):
-            i = index
-            j = len(sequence)-1
-            hairpin_length = 0
-            hairpin_sequence = ""
-
-            while j > i:
-                x = sequence[i]
-                y = sequence[j]
-                if self.base_complement(x) == y:
-                    hairpin_length += 1
-                    i += 1
-                    hairpin_sequence = hairpin_sequence + x
-
-                elif self.base_complement(x) != y and hairpin_length != 0:
-                    if max_hairpin < hairpin_length:
-                        max_hairpin = hairpin_length
-
-                    hairpin_length = 0
-                    hairpin_sequence = ""
-
-                if max_hairpin < hairpin_length:
-                    max_hairpin = hairpin_length
-
-                j -= 1
-            # print(hairpin_sequence)
-
-        # print(max_hairpin)
-        hairpin_percentage = (2 * max_hairpin) / length * 100
-        
-        return round(hairpin_percentage, 2)
+        """ Longest self-complementary stem, as a percentage of the primer length covered by both arms of the hairpin """
+        return self._metric("hairpin")
     
     def primer_dimer_check(self):
-        seq = self.primer_sequence
-        seq_reverse = seq[::-1]
-        dimer_array = []
-
-        for letter in seq_reverse:
-            row = []
-            for sense_letter in seq:
-                letter_pairs = []
-                letter_pairs.append(sense_letter)
-                letter_pairs.append(letter)
-                row.append(letter_pairs)
-
-            dimer_array.append(row)
-
-        # for row in dimer_array:
-        #     for column in row:
-        #         print(column, end=" ")
-
-        #     print()
-        # print(dimer_array)
-
-        current_row = len(dimer_array) - 1
-        current_column = 0
-        row_increment = 0
-        column_increment = 0
-        dimer_length = 0
-        overlap_length = 0
-        max_dimer = 0
-        max_dimer_overlap = 0
-        switch = False
-        while current_row >= 0 and current_column < len(dimer_array[0]):
-
-            while current_row + row_increment < len(dimer_array) and current_column + column_increment < len(dimer_array[0]):
-                if dimer_array[current_row + row_increment][current_column + column_increment][0] == self.base_complement(dimer_array[current_row + row_increment][current_column + column_increment][1]):
-                    dimer_length += 1
-                    # print(dimer_array[current_row + row_increment][current_column + column_increment][0])
-
-                overlap_length += 1
-                row_increment += 1
-                column_increment += 1
-
-            if max_dimer < dimer_length:
-                max_dimer = dimer_length
-                max_dimer_overlap = overlap_length
-
-            if switch:
-                current_column += 1
-            else:    
-                current_row -= 1
-
-            row_increment = 0
-            column_increment = 0
-            dimer_length = 0
-            overlap_length = 0
-            
-            if current_row == 0:
-                switch = True
-
-        dimer_percentage = round((max_dimer/max_dimer_overlap*100), 2)
-
-        # return max_dimer, max_dimer_overlap
-        return dimer_percentage
+        """ Share of the best self-alignment of the primer that is complementary. Raises ZeroDivisionError when no base pairs at any offset. """
+        return self._metric("dimer")
     
     def primer_qc_check(self):
         """Check to ensure all the letters in the primer nucleotide sequence are in ('a','g','c','t')."""
@@ -250,6 +345,10 @@ class Primer():
             
         return True
     
+    def binding_sites(self, index, mismatches=0, three_prime=None):
+        """ Every site of a binding_index.BindingIndex template where the 3' end of the primer binds with at most `mismatches` mismatches """
+        return index.sites(self.primer_sequence, mismatches, three_prime)
+    
     # @property
     # def primer_score(self):
     #     """ Based on all the properties of the primer, giving it a score if it fulfills specified length, GC%, Tm, hairpin and primer-dimer check conditions"""
@@ -0,0 +1,164 @@
+"""
+Cross-dimer screening for multiplex PCR pools.
+
+Every primer of the pool is aligned against every other primer with the same antiparallel offset scan
+as Primer.primer_dimer_check (the diagonal of the matrix is the self-dimer). Each primer is bit-packed
+once up front, so a pair costs one shift/and/popcount per offset and nucleotide.
+
+A pair without a single complementary base pair has no dimer percentage: Primer.primer_dimer_check raises
+ZeroDivisionError for it and PrimerBatch.primer_dimer_check returns NaN, so cross_dimer returns NaN too.
+
+When a threshold is given (primerDimerPercentage in variables.json), pairs that provably cannot score
+above it are skipped and set to PRUNED (-1.0) in the matrix. Dimer percentages are never negative, so
+`matrix == PRUNED` finds the skipped pairs and `matrix > threshold` is False for them, as it is for NaN:
+- A pair can form at most `bound` complementary pairs at any offset, where bound is the sum over
+  nucleotides of min(count in first primer, count of its complement in the second primer).
+- The dimer percentage is taken at the first offset with the most pairs, so it can only exceed the
+  threshold if that offset overlaps by fewer than bound * 100 / threshold nucleotides.
+- The short offsets are scanned first. If their best alignment is not above the threshold, or any
+  longer offset has more pairs, the pair is skipped.
+"""
+
+import math
+from argparse import ArgumentParser, Namespace
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from primer_class import Primer, base_masks, dimer_percentage_calc, pairing_masks
+from primer_score import variables_access
+
+# Value of the pairs skipped because they cannot score above the threshold
+PRUNED = -1.0
+
+def pool_entry(sequence):
+    """ Bit-packed form of a primer used by cross_dimer: forward masks, reversed partner masks and their counts """
+
+    masks = base_masks(sequence)
+    # partner_pairs[x] has bit k set when sequence[-1 - k] pairs with nucleotide x
+    partner_pairs = pairing_masks(sequence[::-1])
+
+    return {
+        "length": len(sequence),
+        "masks": masks,
+        "counts": {nucleotide: mask.bit_count() for nucleotide, mask in masks.items()},
+        "partner_pairs": partner_pairs,
+        "partner_counts": {nucleotide: mask.bit_count() for nucleotide, mask in partner_pairs.items()},
+    }
+
+def cross_dimer(first, second, threshold=None):
+    """
+    Dimer percentage of two pool entries, as primer_dimer_check would give for first against second.
+    Returns NaN if no complementary pair forms at any offset, and PRUNED if a threshold is given and the
+    pair cannot score above it.
+    """
+
+    length = first["length"]
+    partner_length = second["length"]
+    masks = [(mask, second["partner_pairs"][nucleotide]) for nucleotide, mask in first["masks"].items() if nucleotide in second["partner_pairs"]]
+
+    def overlap(offset):
+        return min(offset, length - 1) - max(0, offset - partner_length + 1) + 1
+
+    def dimer_length(offset):
+        shift = partner_length - 1 - offset
+        paired = 0
+        for mask, partner_mask in masks:
+            aligned = mask << shift if shift >= 0 else mask >> -shift
+            paired += (aligned & partner_mask).bit_count()
+        return paired
+
+    offsets = range(length + partner_length - 1)
+    if threshold is None or threshold <= 0:
+        short_offsets, long_offsets = offsets, []
+    else:
+        bound = sum(min(count, second["partner_counts"].get(nucleotide, 0)) for nucleotide, count in first["counts"].items())
+        if bound == 0:
+            return math.nan
+        limit = bound * 100 / threshold
+        # The overlap grows by one per offset from both ends, so the short offsets are the two tails
+        tail = max(0, math.ceil(limit) - 1)
+        if min(length, partner_length) < limit:
+            short_offsets, long_offsets = offsets, []
+        else:
+            short_offsets = [*range(tail), *range(len(offsets) - tail, len(offsets))]
+            long_offsets = range(tail, len(offsets) - tail)
+
+    max_dimer = 0
+    best_offset = 0
+    for offset in short_offsets:
+        paired = dimer_length(offset)
+        if max_dimer < paired:
+            max_dimer = paired
+            best_offset = offset
+
+    if long_offsets:
+        if max_dimer == 0 or dimer_percentage_calc(max_dimer, overlap(best_offset)) <= threshold:
+            return PRUNED
+        for offset in long_offsets:
+            paired = dimer_length(offset)
+            if paired > max_dimer or (paired == max_dimer and offset < best_offset):
+                return PRUNED
+
+    if max_dimer == 0:
+        return math.nan
+
+    return dimer_percentage_calc(max_dimer, overlap(best_offset))
+
+_pool_entries = []
+
+def _init_worker(entries):
+    global _pool_entries
+    _pool_entries = entries
+
+def _matrix_rows(rows, threshold):
+    """ Upper triangle (j >= i) of the given rows of the matrix """
+    return [[cross_dimer(_pool_entries[i], _pool_entries[j], threshold) for j in range(i, len(_pool_entries))] for i in rows]
+
+def cross_dimer_matrix(primers, threshold=None, workers=1):
+    """
+    N x N cross-dimer matrix of a primer pool. Entry [i, j] is the dimer percentage of primer i against
+    primer j and the matrix is symmetric. Pairs with no complementary base pair are NaN and, with a
+    threshold, pairs that cannot exceed it are PRUNED.
+    Rows are spread over a process pool when workers > 1.
+    """
+
+    entries = [pool_entry(primer.sequence) for primer in primers]
+    size = len(entries)
+    matrix = np.full((size, size), np.nan)
+
+    # Interleave the rows so every block gets a similar share of the (shrinking) upper-triangle rows
+    block_count = max(1, workers) * 4
+    blocks = [list(range(start, size, block_count)) for start in range(min(block_count, size))]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(entries,)) as executor:
+            results = executor.map(_matrix_rows, blocks, [threshold] * len(blocks))
+            block_rows = list(zip(blocks, results))
+    else:
+        _init_worker(entries)
+        block_rows = [(block, _matrix_rows(block, threshold)) for block in blocks]
+
+    for block, rows in block_rows:
+        for i, row in zip(block, rows):
+            matrix[i, i:] = row
+            matrix[i:, i] = row
+
+    return matrix
+
+def main() -> None:
+    parser = ArgumentParser(description="Cross-dimer matrix for a pool of primers")
+    parser.add_argument("sequences", nargs="+", help="Primer sequences of the pool")
+    parser.add_argument("-v", "--variables", help="variables.json with the primerDimerPercentage threshold", type=str, default="variables.json")
+    parser.add_argument("-a", "--all", help="Compute every pair instead of skipping those below the threshold", action="store_true")
+    parser.add_argument("-w", "--workers", help="Number of worker processes", type=int, default=1)
+
+    args: Namespace = parser.parse_args()
+    threshold = None if args.all else variables_access(args.variables)["primerDimerPercentage"]
+    primers = [Primer(f"P{index + 1}", sequence) for index, sequence in enumerate(args.sequences)]
+    matrix = cross_dimer_matrix(primers, threshold, args.workers)
+
+    for primer, row in zip(primers, matrix):
+        print(primer.name, " ".join("     -" if value == PRUNED else f"{value:6.2f}" for value in row))
+
+    return
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+"""
+Sliding-window primer candidate scanner.
+
+Walks a template on both strands for a range of primer lengths and yields the windows that pass the
+variables.json thresholds used by primer_score_calc:
+- length in [primerLengthLow, primerLengthHigh)
+- int(GC%) in [gcPercentLow, gcPercentHigh)
+- G or C at the 3' end
+- int(Tm) in [meltingTempLow, meltingTempHigh)
+- longest homopolymer below homoPolymerLength
+- hairpin and self-dimer percentages not above hairpinPercentage and primerDimerPercentage
+
+GC count, Tm terms, homopolymer runs and letters outside a/c/g/t are turned into cumulative sums over
+the template once, so every window is an O(1) difference of two entries and a whole length is evaluated
+as one NumPy expression. Only windows that pass these cheap checks go through the batched dimer check of
+PrimerBatch, and only those that also hold an inverted repeat long enough to form a failing hairpin stem
+go through its hairpin check.
+
+A reverse-strand candidate is the reverse complement of its template window. It has the same GC count,
+Tm and homopolymer runs, and its 3' end is the complement of the first nucleotide of the window.
+
+Candidates are yielded as plain records rather than Primer objects, since a template yields tens of
+thousands of them; Primer(candidate.name, candidate.sequence, candidate.orientation) builds the full primer.
+"""
+
+import sys
+from argparse import ArgumentParser, Namespace
+from collections import namedtuple
+import numpy as np
+from composition import read_template
+from primer_batch import BASE_INDEX, PrimerBatch
+from primer_class import gc_percentage_calc, hairpin_percentage_calc, melting_temperature_calc
+from primer_score import variables_access
+from thermodynamics import nn_window_melting_temperature
+
+COMPLEMENTS = str.maketrans("acgt", "tgca")
+
+# start is the 0-based position of the binding window on the template
+Candidate = namedtuple("Candidate", ["name", "start", "orientation", "sequence", "melting_temperature"])
+
+def _cumulative(values):
+    return np.concatenate(([0], np.cumsum(values)))
+
+def _run_lengths(codes):
+    """ Length of the run of identical letters ending at every position """
+    if not codes.size:
+        return codes.astype(np.int64)
+    positions = np.arange(codes.size)
+    run_starts = np.where(np.concatenate(([True], codes[1:] != codes[:-1])), positions, 0)
+    return positions - np.maximum.accumulate(run_starts) + 1
+
+def _inverted_repeats(codes, stem):
+    """
+    For every position p of the template, the first q >= p + stem where template[q:q + stem] is the reverse
+    complement of template[p:p + stem], or the template length if there is none. Letters outside a/c/g/t
+    are read as a, which can only add repeats.
+    """
+
+    length = codes.size
+    if length < 2 * stem:
+        return np.full(max(length - stem + 1, 0), length)
+    bases = BASE_INDEX[codes].astype(np.int64)
+    windows = np.lib.stride_tricks.sliding_window_view(bases, stem)
+    weights = 4 ** np.arange(stem - 1, -1, -1, dtype=np.int64)
+    kmers = windows @ weights
+    # With a, c, g, t as 0-3 the complement of a base b is 3 - b
+    reverse_complements = (3 - windows[:, ::-1]) @ weights
+
+    positions = np.arange(kmers.size)
+    keys = np.sort(reverse_complements * length + positions)
+    found = np.minimum(np.searchsorted(keys, kmers * length + positions + stem), keys.size - 1)
+    return np.where(keys[found] // length == kmers, keys[found] % length, length)
+
+def _possible_hairpins(codes, length, threshold):
+    """
+    False for the windows of the given length whose hairpin percentage cannot be above the threshold.
+
+    A stem of s base pairs in the scan of hairpin_stem_length pairs template[p:p + s] with the reverse
+    complement of a later, non-overlapping template[q:q + s], so a window without such an inverted repeat of
+    the shortest stem above the threshold passes the hairpin check. The same holds for its reverse complement.
+    """
+
+    starts = max(codes.size - length + 1, 0)
+    stems = [stem for stem in range(1, length // 2 + 1) if hairpin_percentage_calc(stem, length) > threshold]
+    if not stems:
+        return np.zeros(starts, dtype=bool)
+
+    stem = stems[0]
+    repeats = _inverted_repeats(codes, stem)
+    # The repeat must start at p <= start + length - 2 * stem and end inside the window
+    first_repeat = np.lib.stride_tricks.sliding_window_view(repeats, length - 2 * stem + 1).min(axis=1)[:starts]
+    return first_repeat <= np.arange(starts) + length - stem
+
+def scan_template(template, variables, min_length=18, max_length=30, tm_mode="basic", structure_checks=True):
+    """
+    Yield a Candidate for every window of the template that passes the variables.json thresholds.
+    Reverse-strand candidates have orientation "reverse" and the reverse complement of the window as
+    their sequence. The melting temperature is the one of the tm_mode model.
+    """
+
+    template = template.lower()
+    codes = np.frombuffer(template.encode("ascii", "replace"), dtype=np.uint8)
+
+    is_gc = np.isin(codes, np.frombuffer(b"gc", dtype=np.uint8))
+    cumulative_gc = _cumulative(is_gc)
+    cumulative_invalid = _cumulative(~np.isin(codes, np.frombuffer(b"acgt", dtype=np.uint8)))
+    # A window holds a homopolymer of the limit length iff one ends inside it at least limit - 1 after its start
+    homopolymer_limit = variables["homoPolymerLength"]
+    cumulative_homopolymer = _cumulative(_run_lengths(codes) >= homopolymer_limit)
+
+    lowest = max(min_length, variables["primerLengthLow"])
+    highest = min(max_length, variables["primerLengthHigh"] - 1)
+    for length in range(lowest, highest + 1):
+        starts = np.arange(max(len(template) - length + 1, 0))
+        if not starts.size:
+            continue
+        ends = starts + length
+
+        gc_count = cumulative_gc[ends] - cumulative_gc[starts]
+        # GC% and the basic Tm only depend on the GC count at a fixed length: one lookup per count
+        gc_table = np.array([int(gc_percentage_calc(count, length)) for count in range(length + 1)])
+        gc_percentage = gc_table[gc_count]
+        if tm_mode == "basic":
+            melting_temp = np.array([melting_temperature_calc(count, length) for count in range(length + 1)])[gc_count]
+        else:
+            melting_temp = nn_window_melting_temperature(template, length)
+        # primer_score_calc compares int(Tm), which truncates towards zero
+        with np.errstate(invalid="ignore"):
+            tm_ok = (np.trunc(melting_temp) >= variables["meltingTempLow"]) & (np.trunc(melting_temp) < variables["meltingTempHigh"])
+
+        homopolymer_ok = np.ones(starts.size, dtype=bool)
+        if homopolymer_limit <= length:
+            homopolymer_ok = cumulative_homopolymer[ends] - cumulative_homopolymer[starts + homopolymer_limit - 1] == 0
+
+        shared_ok = ((cumulative_invalid[ends] - cumulative_invalid[starts] == 0)
+                     & (gc_percentage >= variables["gcPercentLow"]) & (gc_percentage < variables["gcPercentHigh"])
+                     & tm_ok & homopolymer_ok)
+
+        if structure_checks:
+            possible_hairpin = _possible_hairpins(codes, length, variables["hairpinPercentage"])
+
+        for orientation, three_prime_gc in (("forward", is_gc[ends - 1]), ("reverse", is_gc[starts])):
+            candidates = [int(start) for start in np.flatnonzero(shared_ok & three_prime_gc)]
+            sequences = [template[start:start + length] for start in candidates]
+            if orientation == "reverse":
+                sequences = [sequence.translate(COMPLEMENTS)[::-1] for sequence in sequences]
+
+            names = [f"{orientation}_{start + 1}_{length}" for start in candidates]
+
+            structure_ok = np.ones(len(candidates), dtype=bool)
+            if structure_checks and candidates:
+                batch = PrimerBatch(names, sequences, orientation)
+                structure_ok = ~(batch.primer_dimer_check() > variables["primerDimerPercentage"])
+                # Only the windows with an inverted repeat long enough go through the hairpin scan
+                rows = np.flatnonzero(possible_hairpin[candidates] & structure_ok)
+                if rows.size:
+                    hairpins = PrimerBatch([names[row] for row in rows], [sequences[row] for row in rows], orientation).hairpin_check()
+                    structure_ok[rows[hairpins > variables["hairpinPercentage"]]] = False
+
+            temperatures = melting_temp[candidates].tolist()
+            for name, start, sequence, temperature, passed in zip(names, candidates, sequences, temperatures, structure_ok.tolist()):
+                if passed:
+                    yield Candidate(name, start, orientation, sequence, temperature)
+
+def main() -> None:
+    parser = ArgumentParser(description="Scan a template for primer candidates on both strands")
+    parser.add_argument("template", help="Plain or FASTA file with the template sequence", type=str)
+    parser.add_argument("-l", "--min-length", help="Shortest primer length", type=int, default=18)
+    parser.add_argument("-L", "--max-length", help="Longest primer length", type=int, default=30)
+    parser.add_argument("-v", "--variables", help="variables.json with the primer thresholds", type=str, default="variables.json")
+    parser.add_argument("-t", "--tm-mode", help="Melting temperature model", choices=["basic", "nearest_neighbour"], default="basic")
+
+    args: Namespace = parser.parse_args()
+    template = read_template(args.template)
+    variables = variables_access(args.variables)
+
+    count = 0
+    for candidate in scan_template(template, variables, args.min_length, args.max_length, args.tm_mode):
+        sys.stdout.write(f"{candidate.name}\t{candidate.start + 1}\t{candidate.orientation}\t{candidate.sequence}\t{candidate.melting_temperature}\n")
+        count += 1
+    print(f"{count} candidates found", file=sys.stderr)
+
+    return
+
+if __name__ == '__main__':
+    main()
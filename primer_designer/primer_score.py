@@ -1,5 +1,16 @@
+import csv
+import heapq
 import json
-from primer_class import Primer
+import sys
+import time
+from argparse import ArgumentParser, Namespace
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from itertools import islice
+from composition import read_fasta
+from primer_class import SCORING_ERRORS, Primer
+from score_cache import CachedPrimer, ScoreCache, compute_metrics
 
 def variables_access(file_path):
     with open(file_path, "r") as file:
@@ -8,6 +19,13 @@ def variables_access(file_path):
     return primer_variables
     
 def primer_score_calc(primer, args):
+    primer_score = primer_score_cheap(primer, args)
+    primer_score += primer_score_structural(primer, args)
+    
+    return primer_score
+
+def primer_score_cheap(primer, args):
+    """ Score from the checks that only need a scan of the sequence: length, GC%, 3' nucleotide, Tm and homopolymers """
     primer_score = 0
         
     if primer.length in range(args["primerLengthLow"], args["primerLengthHigh"]):
@@ -25,6 +43,12 @@ def primer_score_calc(primer, args):
     if primer.homopolymer_check() >= args["homoPolymerLength"]:
         primer_score -= 2
 
+    return primer_score
+
+def primer_score_structural(primer, args):
+    """ Penalty from the expensive hairpin and primer-dimer checks. It is never positive. """
+    primer_score = 0
+
     if primer.hairpin_check() > args["hairpinPercentage"]:
         primer_score -= 2
 
@@ -33,8 +57,216 @@ def primer_score_calc(primer, args):
     
     return primer_score
 
+def rank_primers(primers, args, top_k=None, cutoff=None):
+    """
+    Best primers by primer_score_calc, as a list of (score, primer) from best to worst. Ties keep input order.
+
+    The structural checks can only lower a score, so the cheap score is an upper bound. The hairpin and dimer
+    checks are skipped whenever that bound (or what is left of it after the hairpin penalty) is below the cutoff
+    or cannot beat the worst of the current top_k, which are kept in a bounded heap.
+    Primers that cannot be scored (letters outside the IUPAC alphabet) are left out.
+    """
+
+    kept = []
+    for index, primer in enumerate(primers):
+        try:
+            best_possible = primer_score_cheap(primer, args)
+            if not _can_rank(best_possible, kept, top_k, cutoff):
+                continue
+            if primer.hairpin_check() > args["hairpinPercentage"]:
+                best_possible -= 2
+                if not _can_rank(best_possible, kept, top_k, cutoff):
+                    continue
+            if primer.primer_dimer_check() > args["primerDimerPercentage"]:
+                best_possible -= 1
+                if not _can_rank(best_possible, kept, top_k, cutoff):
+                    continue
+        except SCORING_ERRORS:
+            continue
+
+        # Min-heap on (score, -index): the root is the lowest score, and the latest primer among equal scores
+        entry = (best_possible, -index, primer)
+        if top_k is not None and len(kept) >= top_k:
+            heapq.heapreplace(kept, entry)
+        else:
+            heapq.heappush(kept, entry)
+
+    return [(score, primer) for score, _, primer in sorted(kept, key=lambda entry: (-entry[0], -entry[1]))]
+
+def _can_rank(best_possible, kept, top_k, cutoff):
+    if cutoff is not None and best_possible < cutoff:
+        return False
+    if top_k is not None and len(kept) >= top_k:
+        # A later primer only displaces the worst kept one with a strictly higher score
+        return top_k > 0 and best_possible > kept[0][0]
+    return True
+
+def read_primers(file_path):
+    """ Yield (name, sequence, orientation) rows from a FASTA file or a name,sequence[,orientation] CSV file """
+
+    with open(file_path, "r") as file:
+        first_line = file.readline()
+        file.seek(0)
+
+        if first_line.startswith(">"):
+            for name, sequence in read_fasta(file_path):
+                yield name, sequence, "forward"
+            return
+
+        reader = csv.reader(file)
+        for row in reader:
+            if not row or row[0].strip().lower() == "name":
+                continue
+            orientation = row[2].strip() if len(row) > 2 and row[2].strip() else "forward"
+            yield row[0].strip(), row[1].strip(), orientation
+
+def chunked(rows, chunk_size):
+    """ Split an iterable of rows into lists of at most chunk_size rows """
+    rows = iter(rows)
+    while chunk := list(islice(rows, chunk_size)):
+        yield chunk
+
+_worker_variables = None
+
+def _init_worker(variables_path):
+    """ Load variables.json once per worker process """
+    global _worker_variables
+    _worker_variables = variables_access(variables_path)
+
+def _score_chunk(rows):
+    results = []
+    for name, sequence, orientation in rows:
+        primer = Primer(name, sequence, orientation)
+        try:
+            score = primer_score_calc(primer, _worker_variables)
+        except SCORING_ERRORS:
+            score = None
+        results.append({"name": name, "sequence": primer.sequence, "orientation": orientation, "score": score})
+
+    return results
+
+def cached_score(metrics, args, tm_mode="basic"):
+    """ primer_score_calc from a metrics tuple of the score cache, None if the sequence cannot be scored """
+    try:
+        return primer_score_calc(CachedPrimer(metrics, tm_mode), args)
+    except (*SCORING_ERRORS, ValueError):
+        return None
+
+def _cached_task(chunk, cache, executor):
+    """ Look a chunk up in the score cache and start computing the metrics of the sequences it does not hold yet """
+    sequences = [sequence.lower() for _, sequence, _ in chunk]
+    known = cache.lookup(sequences)
+    missing = list(set(sequences) - known.keys())
+    future = executor.submit(compute_metrics, missing) if executor is not None and missing else None
+
+    return chunk, sequences, known, missing, future
+
+def _cached_results(task, cache, variables):
+    chunk, sequences, known, missing, future = task
+    if missing:
+        known.update(cache.store(missing, future.result() if future is not None else compute_metrics(missing)))
+
+    return [{"name": name, "sequence": sequence, "orientation": orientation, "score": cached_score(known[sequence], variables)}
+            for (name, _, orientation), sequence in zip(chunk, sequences)]
+
+def _write_results(file, results, output_format, writer):
+    if output_format == "jsonl":
+        for result in results:
+            file.write(json.dumps(result) + "\n")
+    else:
+        writer.writerows(results)
+
+def primer_score_batch(input_path, output_path, variables_path="variables.json", workers=1, chunk_size=10_000, output_format="csv", cache_path=None):
+    """
+    Score every primer of a CSV or FASTA file with primer_score_calc and stream the results to CSV or JSONL in input order.
+    The input is read in chunks and at most two chunks per worker are in flight, so memory stays bounded for any input size.
+    With a cache_path, metrics are read from and saved to that score cache and only unseen sequences are computed.
+    Returns (number of primers scored, elapsed seconds).
+    """
+
+    start = time.perf_counter()
+    count = 0
+    with open(output_path, "w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=["name", "sequence", "orientation", "score"])
+        if output_format == "csv":
+            writer.writeheader()
+
+        chunks = chunked(read_primers(input_path), chunk_size)
+        if cache_path is not None:
+            variables = variables_access(variables_path)
+            # nullcontext() gives None as the executor, so metrics are computed in this process
+            with ScoreCache(cache_path) as cache, (ProcessPoolExecutor(max_workers=workers) if workers > 1 else nullcontext()) as executor:
+                pending = deque()
+                for chunk in chunks:
+                    pending.append(_cached_task(chunk, cache, executor))
+                    if len(pending) >= 2 * workers:
+                        results = _cached_results(pending.popleft(), cache, variables)
+                        _write_results(file, results, output_format, writer)
+                        count += len(results)
+                while pending:
+                    results = _cached_results(pending.popleft(), cache, variables)
+                    _write_results(file, results, output_format, writer)
+                    count += len(results)
+        elif workers <= 1:
+            _init_worker(variables_path)
+            for chunk in chunks:
+                results = _score_chunk(chunk)
+                _write_results(file, results, output_format, writer)
+                count += len(results)
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(variables_path,)) as executor:
+                pending = deque()
+                for chunk in chunks:
+                    pending.append(executor.submit(_score_chunk, chunk))
+                    if len(pending) >= 2 * workers:
+                        results = pending.popleft().result()
+                        _write_results(file, results, output_format, writer)
+                        count += len(results)
+                while pending:
+                    results = pending.popleft().result()
+                    _write_results(file, results, output_format, writer)
+                    count += len(results)
+
+    return count, time.perf_counter() - start
+
 def main():
-    file_path = "variables.json"
+    parser = ArgumentParser(description="Score primers against the thresholds in variables.json")
+    parser.add_argument("-i", "--input", help="CSV (name,sequence[,orientation]) or FASTA file of primers to score", type=str)
+    parser.add_argument("-o", "--output", help="Output file for the scores (.csv or .jsonl)", type=str)
+    parser.add_argument("-v", "--variables", help="Path to variables.json", type=str, default="variables.json")
+    parser.add_argument("-w", "--workers", help="Number of worker processes", type=int, default=1)
+    parser.add_argument("-c", "--chunk-size", help="Primers per task sent to a worker", type=int, default=10_000)
+    parser.add_argument("-f", "--format", help="Output format, defaults to the output file extension", choices=["csv", "jsonl"])
+    parser.add_argument("-C", "--cache", help="SQLite score cache of per-sequence metrics, reused across runs and threshold changes", type=str)
+    parser.add_argument("-k", "--top-k", help="Only keep the K best primers, ranked by score", type=int)
+    parser.add_argument("-s", "--cutoff", help="Only keep primers scoring at least this, ranked by score", type=int)
+
+    args: Namespace = parser.parse_args()
+    if args.input:
+        if not args.output:
+            parser.error("Please pass an output file with -o when scoring a file with -i")
+        output_format = args.format or ("jsonl" if args.output.endswith(".jsonl") else "csv")
+        if args.top_k is not None or args.cutoff is not None:
+            # Ranking skips the structural checks primer by primer, in this process and without the score cache
+            if args.workers != 1 or args.chunk_size != 10_000 or args.cache:
+                parser.error("--workers, --chunk-size and --cache cannot be combined with --top-k or --cutoff")
+            start = time.perf_counter()
+            primers = (Primer(name, sequence, orientation) for name, sequence, orientation in read_primers(args.input))
+            ranking = rank_primers(primers, variables_access(args.variables), args.top_k, args.cutoff)
+            with open(args.output, "w", newline="") as file:
+                writer = csv.DictWriter(file, fieldnames=["name", "sequence", "orientation", "score"])
+                if output_format == "csv":
+                    writer.writeheader()
+                results = [{"name": primer.name, "sequence": primer.sequence, "orientation": primer.orientation, "score": score} for score, primer in ranking]
+                _write_results(file, results, output_format, writer)
+            print(f"Ranked {len(ranking)} primers in {time.perf_counter() - start:.2f} s", file=sys.stderr)
+            return 0
+
+        count, elapsed = primer_score_batch(args.input, args.output, args.variables, args.workers, args.chunk_size, output_format, args.cache)
+        print(f"Scored {count} primers in {elapsed:.2f} s ({count / elapsed if elapsed else 0:.0f} primers/s)", file=sys.stderr)
+        return 0
+
+    file_path = args.variables
     input_variables = variables_access(file_path)
     print(input_variables)
     test = Primer("TDSP1712", "tgaggccgccatccacgc", "reverse")
@@ -43,4 +275,4 @@ def main():
     return 0
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -16,43 +16,84 @@ Calculate the dNTP exhaustion rate given key reaction variables:
 - Template DNA sequence
 - Phi29 synthesis rate (nucleotides/minute)
 
+rca_sweep evaluates the same model over whole grids of templates and reaction conditions in one NumPy pass,
+and rca_batch over every template of a FASTA file.
+simulate_rca integrates a kinetic version over time for a batch of reactions, which can lift the phi29 excess and
+viscosity assumptions and track every dNTP.
+
 """
 
+import csv
+import sys
+from argparse import ArgumentParser, Namespace
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+import numpy as np
+from composition import CHUNK_SIZE, GAP, nucleotide_counts, read_fasta_chunks, read_template
+
+AVOGADRO = 6.022 * 10**23
+PHI29_SPEED = 2280 # nt/min
+PHI29_MOLAR_MASS = 67000 # g/mol
+CONCENTRATION_UNITS = {
+    "mM": 1000,
+    "uM": 1_000_000,
+    "nM": 1_000_000_000
+}
+MASS_UNITS = {
+    "g": 1,
+    "mg": 1000,
+    "ug": 1_000_000,
+    "ng": 1_000_000_000,
+    "pg": 1_000_000_000_000
+}
+
+# The arithmetic of the model. Every input may be a float or a NumPy array, so the scalar functions below,
+# the sweep and the Monte Carlo sampling of rca_uncertainty all evaluate the same expressions.
+
+def ntp_molecule_count(concentration, unit: str, reaction_volume):
+    """ dNTP molecules of a concentration in unit (mM, uM, nM) in a volume in ml """
+    moles = reaction_volume * (concentration / (CONCENTRATION_UNITS[unit] * 1000))
+    return moles * AVOGADRO
+
+def template_molecule_count(mass, unit: str, length):
+    """ Template molecules of a mass in unit (g ... pg) of a double-stranded template of length nucleotides """
+    moles = (mass / MASS_UNITS[unit]) / ((617.96 * length) + 36.04)
+    return moles * AVOGADRO
+
+def phi29_molecule_count(unit_conc, specific_activity, volume):
+    """ phi29 molecules of a concentration in units/ml of an enzyme of specific_activity units/mg, in a volume in ml """
+    phi29_mass = unit_conc / specific_activity * volume # in mg
+    return (phi29_mass / (1000 * PHI29_MOLAR_MASS)) * AVOGADRO
+
+def rca_cycle_count(highest_nt_count, ntp_molecules, template_molecules):
+    """ Rounds of RCA until the most used dNTP runs out """
+    return 1 + (((ntp_molecules / 4)-(highest_nt_count * template_molecules)) / (highest_nt_count * 2 * template_molecules))
+
+def rca_minutes(rca_cycles, ntps_per_molecule, phi29_speed=PHI29_SPEED):
+    """ Time in minutes phi29 takes to synthesise rca_cycles copies of a template """
+    return (rca_cycles * ntps_per_molecule) / (phi29_speed)
+
 def molar_to_molecule(concentration: str, reaction_volume: float):
-    dilution_factor = {
-        "mM": 1000,
-        "uM": 1_000_000,
-        "nM": 1_000_000_000
-    }
     values = concentration.split()
     conc = float(values[0])
     dilution = values[1]
-    moles = reaction_volume * (conc / (dilution_factor[dilution] * 1000))
-    molecule_count = moles * (6.022 * 10**23)
+    molecule_count = ntp_molecule_count(conc, dilution, reaction_volume)
     
     return molecule_count
 
 def dna_mass_to_moles(dna_mass: str, sequence: str):
-    dilution_factor = {
-        "g": 1,
-        "mg": 1000,
-        "ug": 1_000_000,
-        "ng": 1_000_000_000,
-        "pg": 1_000_000_000_000
-    }
     values = dna_mass.split()
     mass = float(values[0])
     dilution = values[1]
-    moles = (mass / dilution_factor[dilution]) / ((617.96 * len(sequence)) + 36.04)
-    molecules_of_template = moles * (6.022 * 10**23)
+    molecules_of_template = template_molecule_count(mass, dilution, len(sequence))
     
     return molecules_of_template
 
 def units_to_molecule(unit_conc: int, specific_activity: int, volume: float):
 
-    phi29_molar_mass = 67000 # g/mol
     phi29_mass = unit_conc / specific_activity * volume # in mg
-    molecules_in_reaction = (phi29_mass / (1000 * phi29_molar_mass)) * (6.022 * 10**23)
+    molecules_in_reaction = phi29_molecule_count(unit_conc, specific_activity, volume)
     print(phi29_mass, molecules_in_reaction)
 
     return molecules_in_reaction
@@ -67,37 +108,324 @@ def base_complement(nucleotide):
     return base_pairs[nucleotide]
 
 def count_nt(sequence: str):
+    """
+    Nucleotides of both strands of a sequence: every A or T counts once as A and once as T, every G or C as G and C.
+    Other letters are left out, with one warning on stderr giving how many there were.
+    """
+    a, c, g, t, invalid = nucleotide_counts(sequence).tolist()
+    if invalid:
+        print(f"{invalid} invalid nucleotide{'s' if invalid > 1 else ''} in sequence, left out of the counts", file=sys.stderr)
+
     nt_count = {
-        "A": 0,
-        "T": 0,
-        "G": 0,
-        "C": 0
+        "A": a + t,
+        "T": a + t,
+        "G": g + c,
+        "C": g + c
     }
 
-    for nt in sequence:
-        try:
-            nt_count[nt.upper()] += 1
-            nt_count[base_complement(nt.upper())] += 1
-        except KeyError:
-            print("Invalid nucleotide in sequence")
-
     return nt_count
 
 def rca_time(nt_count: dict, ntp_molecules: float, phi29_molecules: float, template_molecules: float):
     """Calculate incubate time necessary for phi29 to reach RCA completion"""
-    phi29_speed = 2280 # nt/min
     nt_list = nt_count.values()
     highest_nt_count = max(nt_list)
     ntps_per_molecule = sum(nt_list)/2
-    number_of_rca_cycles = 1 + (((ntp_molecules / 4)-(highest_nt_count * template_molecules)) / (highest_nt_count * 2 * template_molecules))
+    number_of_rca_cycles = rca_cycle_count(highest_nt_count, ntp_molecules, template_molecules)
     print(number_of_rca_cycles, ntps_per_molecule)
     print(phi29_molecules > 2*template_molecules)
-    total_rca_time = (number_of_rca_cycles * ntps_per_molecule) / (phi29_speed) # in minutes
+    total_rca_time = rca_minutes(number_of_rca_cycles, ntps_per_molecule) # in minutes
     print(f"Estimated time for RCA completion by way of dNTP exhaustion: {total_rca_time/(60*24)} days")
     
     return total_rca_time
 
+NUCLEOTIDE_MASS = 308.98 # g/mol per nucleotide of product DNA, half the 617.96 per base pair of dna_mass_to_moles
+# Completion time (minutes, NaN if not reached) of every reaction, and the curves recorded along the way: the time
+# of every point (B, P), the dNTP concentrations in mM (B, P, 4, in count_nt order A, T, G, C) and the strands
+# being extended per phi29 molecule (B, P), above 1 only when phi29 is short and occupancy is off
+KineticResult = namedtuple("KineticResult", ["completion_time", "times", "dntps", "occupancy"])
+
+def simulate_rca(nt_counts, ntp_molecules, phi29_molecules, template_molecules, volume=1.0, km: float = 0.0,
+                 viscosity: float | None = None, exhausted: float = 0.0, steps: int = 1000, curve_points: int = 100,
+                 max_steps: int | None = None, occupancy: bool = False):
+    """
+    Kinetic model of a batch of RCA reactions, integrated with a fixed time step for all of them at once.
+
+    Every reaction starts with ntp_molecules / 4 of each dNTP. A template strand is copied once at phi29 speed
+    during the first round (len/speed minutes), both strands are copied from then on, and each copy consumes
+    the count_nt share of every dNTP. A reaction is complete when one dNTP falls to `exhausted` times its start.
+    With the defaults phi29 is in excess, as rca_time assumes, and the closed-form time is reproduced whenever
+    the first round completes. Optional slowdowns, all off by default:
+    - occupancy: every synthesising strand needs a polymerase, so only min(strands, phi29) are extended
+    - km (mM): each polymerase is slowed by the Michaelis-Menten factor of the scarcest dNTP. The last dNTPs are
+      then used up exponentially slowly, so pass a positive `exhausted` fraction with it.
+    - viscosity (ug/ml): product DNA concentration at which synthesis runs at half speed
+
+    nt_counts is one count_nt dict, a list of them or a (B, 4) array; the other inputs are scalars or arrays of
+    B reactions, with the volume in ml. The step is the time / steps each reaction takes without the km and
+    viscosity slowdowns, and reactions still running after max_steps (100 * steps by default) are reported with
+    a NaN completion time.
+    """
+
+    if isinstance(nt_counts, dict):
+        nt_counts = [nt_counts]
+    if len(nt_counts) and isinstance(nt_counts[0], dict):
+        nt_counts = [[counts[nt] for nt in ("A", "T", "G", "C")] for counts in nt_counts]
+    per_molecule = np.asarray(nt_counts, dtype=np.float64).reshape(-1, 4)
+    batch = np.broadcast_shapes(per_molecule.shape[:1], np.shape(ntp_molecules), np.shape(phi29_molecules),
+                                np.shape(template_molecules), np.shape(volume))
+    # dNTP arrays are kept as (4, B) so the reductions over the four dNTPs run across whole rows
+    per_molecule = np.ascontiguousarray(np.broadcast_to(per_molecule, batch + (4,)).T)
+    ntp_molecules, phi29_molecules, template_molecules, volume = (np.broadcast_to(np.asarray(value, dtype=np.float64), batch)
+                                                                  for value in (ntp_molecules, phi29_molecules, template_molecules, volume))
+    max_steps = max_steps or 100 * steps
+
+    length = per_molecule.sum(axis=0) / 2 # nucleotides per template molecule, as in rca_time
+    highest = per_molecule.max(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        usage = per_molecule / length # dNTP molecules per nucleotide of strand travel
+        travel_per_dntp = np.where(per_molecule > 0, 1 / usage, np.inf)
+    # Strands extended during the first round and from the second round on
+    first_round = np.minimum(template_molecules, phi29_molecules) if occupancy else template_molecules
+    later_rounds = np.minimum(2 * template_molecules, phi29_molecules) if occupancy else 2 * template_molecules
+    # dNTP molecules to mM and polymerised nucleotides to ug/ml
+    to_mm = 1e6 / (AVOGADRO * volume)
+    km_molecules = km / to_mm
+    viscosity_molecules = np.inf if viscosity is None else viscosity * AVOGADRO * volume / (NUCLEOTIDE_MASS * 1e6)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Time to completion without the km and viscosity slowdowns: the closed form when phi29 is in excess or occupancy is off
+        strand_travel = (1 - exhausted) * ntp_molecules / 4 * length / highest
+        first_travel = first_round * length
+        expected = np.where(strand_travel <= first_travel, strand_travel / (first_round * PHI29_SPEED),
+                            (length + (strand_travel - first_travel) / later_rounds) / PHI29_SPEED)
+    dt = np.where(np.isfinite(expected) & (expected > 0), expected, length / PHI29_SPEED) / steps
+
+    dntps = np.repeat((ntp_molecules / 4)[None, :], 4, axis=0)
+    floor = exhausted * dntps
+    progress = np.zeros(batch) # nucleotides travelled by one polymerase, to tell the first round from the next
+    time = np.zeros(batch)
+    completion = np.full(batch, np.nan)
+    # Reactions without a template (or, with occupancy, without a polymerase) never start
+    running = later_rounds > 0
+    # curve_points = 0 records no curves, for large batches that only need completion times
+    record_every = max(steps // curve_points, 1) if curve_points else max_steps + 1
+    times, curves, occupied = [], [], []
+
+    def record(active):
+        if not curve_points:
+            return
+        times.append(time.copy())
+        curves.append((dntps * to_mm).T)
+        occupied.append(np.where(phi29_molecules > 0, active / np.where(phi29_molecules > 0, phi29_molecules, 1), 0.0))
+
+    record(np.where(progress < length, first_round, later_rounds))
+    for step in range(1, max_steps + 1):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            slowdown = np.where(dntps > 0, dntps / (km_molecules + dntps), 0.0).min(axis=0) if km else (dntps > 0).all(axis=0)
+            if viscosity is not None:
+                slowdown = slowdown / (1 + (ntp_molecules - dntps.sum(axis=0)) / viscosity_molecules)
+        speed = PHI29_SPEED * slowdown
+
+        # Distance travelled this step before and after the end of the first round, weighted by the strands extended
+        travel = speed * dt
+        before = np.clip(length - progress, 0, travel)
+        strand_travel = first_round * before + later_rounds * (travel - before)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # Strand travel that brings each reaction's first dNTP down to its floor
+            limit = ((dntps - floor) * travel_per_dntp).min(axis=0)
+            finishing = running & (strand_travel >= limit)
+            limit_time = np.where(limit <= first_round * before, limit / (first_round * speed),
+                                  before / speed + (limit - first_round * before) / (later_rounds * speed))
+        completion = np.where(finishing, time + limit_time, completion)
+        strand_travel = np.where(finishing, limit, strand_travel)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            dntps = np.where(running, np.maximum(dntps - strand_travel * usage, floor), dntps)
+        progress = np.where(running, progress + travel, progress)
+        time = np.where(finishing, completion, np.where(running, time + dt, time))
+        running &= ~finishing & (speed > 0)
+
+        if step % record_every == 0 or not running.any():
+            record(np.where(running, np.where(progress < length, first_round, later_rounds), 0.0))
+        if not running.any():
+            break
+
+    if not curve_points:
+        return KineticResult(completion, np.zeros(batch + (0,)), np.zeros(batch + (0, 4)), np.zeros(batch + (0,)))
+    return KineticResult(completion, np.stack(times, axis=1), np.stack(curves, axis=1), np.stack(occupied, axis=1))
+
+SWEEP_COLUMNS = ["template", "ntp_concentration", "template_mass", "phi29_concentration", "volume", "ntp_molecules",
+                 "template_molecules", "phi29_molecules", "phi29_excess", "rca_cycles", "rca_time"]
+
+def rca_sweep(templates, ntp_concentrations, template_masses, phi29_concentrations, volumes, ntp_unit: str = "mM",
+              mass_unit: str = "ng", phi29_activity: float = 83_333, phi29_volume: float = 0.001, kinetic: bool = False,
+              km: float = 0.0, viscosity: float | None = None, exhausted: float = 0.0, occupancy: bool = False):
+    """
+    Evaluate rca_time over the full grid of templates x dNTP concentrations x template masses x phi29
+    concentrations (units/ml) x reaction volumes (ml) in one broadcasted NumPy pass, without printing.
+    templates is a {name: sequence} dict or a list of sequences; every other input is a scalar, a list, a range
+    or an array. Returns a structured array with one row per combination, in grid order, with SWEEP_COLUMNS
+    as fields. rca_time is in minutes; phi29_excess is the check that there are two phi29 per template.
+    With kinetic, every combination is also run through simulate_rca (with km, viscosity, exhausted and occupancy) and
+    its completion time in minutes is added as a kinetic_time column.
+    """
+
+    if not isinstance(templates, dict):
+        templates = {f"template_{index + 1}": sequence for index, sequence in enumerate(templates)}
+    counts = np.array([nucleotide_counts(sequence) for sequence in templates.values()], dtype=np.int64).reshape(-1, GAP + 1)
+
+    return sweep_counts(list(templates), counts, ntp_concentrations, template_masses, phi29_concentrations, volumes, ntp_unit,
+                        mass_unit, phi29_activity, phi29_volume, kinetic, km, viscosity, exhausted, occupancy)
+
+def sweep_counts(names, counts, ntp_concentrations, template_masses, phi29_concentrations, volumes, ntp_unit: str = "mM",
+                 mass_unit: str = "ng", phi29_activity: float = 83_333, phi29_volume: float = 0.001, kinetic: bool = False,
+                 km: float = 0.0, viscosity: float | None = None, exhausted: float = 0.0, occupancy: bool = False):
+    """ rca_sweep of templates given by name and nucleotide_counts row (a, c, g, t, other) instead of sequence """
+
+    counts = np.asarray(counts, dtype=np.int64).reshape(-1, GAP + 1)
+    # count_nt on both strands: the most frequent nucleotide and the nucleotides per template molecule
+    a_t = counts[:, 0] + counts[:, 3]
+    g_c = counts[:, 1] + counts[:, 2]
+    # The template length, other letters included, as len(sequence) in dna_mass_to_moles
+    lengths = counts.sum(axis=1).astype(np.float64)
+
+    # One axis per input: (template, dNTP, mass, phi29, volume)
+    shape = (-1, 1, 1, 1, 1)
+    highest = np.maximum(a_t, g_c).astype(np.float64).reshape(shape)
+    ntps_per_molecule = (a_t + g_c).astype(np.float64).reshape(shape)
+    length = lengths.reshape(shape)
+    ntp_conc = np.asarray(ntp_concentrations, dtype=np.float64).reshape(1, -1, 1, 1, 1)
+    mass = np.asarray(template_masses, dtype=np.float64).reshape(1, 1, -1, 1, 1)
+    phi29_conc = np.asarray(phi29_concentrations, dtype=np.float64).reshape(1, 1, 1, -1, 1)
+    volume = np.asarray(volumes, dtype=np.float64).reshape(1, 1, 1, 1, -1)
+
+    ntp_molecules = ntp_molecule_count(ntp_conc, ntp_unit, volume)
+    template_molecules = template_molecule_count(mass, mass_unit, length)
+    phi29_molecules = phi29_molecule_count(phi29_conc, phi29_activity, phi29_volume)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rca_cycles = rca_cycle_count(highest, ntp_molecules, template_molecules)
+        rca_time_minutes = rca_minutes(rca_cycles, ntps_per_molecule)
+
+    grid = np.broadcast_shapes(highest.shape, ntp_conc.shape, mass.shape, phi29_conc.shape, volume.shape)
+    table = np.zeros(int(np.prod(grid)), dtype=[("template", f"U{max([len(name) for name in names] + [1])}")]
+                     + [(column, np.float64) for column in SWEEP_COLUMNS[1:8]] + [("phi29_excess", bool)]
+                     + [(column, np.float64) for column in SWEEP_COLUMNS[9:]] + ([("kinetic_time", np.float64)] if kinetic else []))
+    values = {
+        "template": np.array(names).reshape(shape), "ntp_concentration": ntp_conc, "template_mass": mass,
+        "phi29_concentration": phi29_conc, "volume": volume, "ntp_molecules": ntp_molecules,
+        "template_molecules": template_molecules, "phi29_molecules": phi29_molecules,
+        "phi29_excess": phi29_molecules > 2 * template_molecules, "rca_cycles": rca_cycles, "rca_time": rca_time_minutes
+    }
+    for column, value in values.items():
+        table[column] = np.broadcast_to(value, grid).ravel()
+
+    if kinetic:
+        per_molecule = np.stack((a_t, a_t, g_c, g_c), axis=1).reshape(-1, 1, 1, 1, 1, 4)
+        result = simulate_rca(np.broadcast_to(per_molecule, grid + (4,)).reshape(-1, 4), table["ntp_molecules"], table["phi29_molecules"],
+                              table["template_molecules"], table["volume"], km, viscosity, exhausted, curve_points=0, occupancy=occupancy)
+        table["kinetic_time"] = result.completion_time
+
+    return table
+
+def write_sweep(table, file_path: str):
+    """ Write a sweep table as CSV with a header row """
+    with open(file_path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(table.dtype.names)
+        writer.writerows(table.tolist())
+
+def rca_batch(input_path: str, output_path: str, ntp_concentrations=20, template_masses=2000, phi29_concentrations=10_000,
+              volumes=1, chunk_size: int = CHUNK_SIZE, flush_records: int = 10_000, workers: int = 1, **sweep_options):
+    """
+    rca_time of every template of a plain or gzip FASTA file under shared reaction conditions, written as a CSV
+    table with the sweep_counts columns (one row per record, or per record and condition when lists are given).
+    Records are streamed in chunks of about chunk_size nucleotides, so memory stays bounded for any file size,
+    and each chunk is counted once with nucleotide_counts as it is read: counting runs at the speed of reading
+    the file, so it is not worth shipping chunks to worker processes. Every flush_records records go through
+    sweep_counts together, and with workers > 1 those calls run in a process pool, which pays off for the
+    kinetic model. Only the counts are sent to the workers, and rows are written in input order either way.
+    sweep_options go to sweep_counts (units, phi29 activity and volume, kinetic settings). Returns the number
+    of records.
+    """
+
+    names = []
+    counts = []
+    written = 0
+    pending = deque()
+
+    with open(output_path, "w", newline="") as file, (ProcessPoolExecutor(max_workers=workers) if workers > 1 else nullcontext()) as executor:
+        writer = csv.writer(file)
+        header = True
+
+        def write(table):
+            nonlocal header
+            if header:
+                writer.writerow(table.dtype.names)
+                header = False
+            writer.writerows(table.tolist())
+
+        def flush():
+            # Predict the records so far, all fully counted
+            nonlocal written, names, counts
+            arguments = (names, counts, ntp_concentrations, template_masses, phi29_concentrations, volumes)
+            if executor:
+                pending.append(executor.submit(sweep_counts, *arguments, **sweep_options))
+                # At most two tables per worker in flight
+                while len(pending) > 2 * workers:
+                    write(pending.popleft().result())
+            else:
+                write(sweep_counts(*arguments, **sweep_options))
+            written += len(names)
+            names, counts = [], []
+
+        for name, chunk in read_fasta_chunks(input_path, chunk_size):
+            if chunk is not None:
+                counts[-1] += nucleotide_counts(chunk)
+                continue
+            # Every record before this one is complete
+            if len(names) >= flush_records:
+                flush()
+            names.append(name)
+            counts.append(np.zeros(GAP + 1, dtype=np.int64))
+
+        # A file without records still gets the header
+        if names or not written:
+            flush()
+        while pending:
+            write(pending.popleft().result())
+
+    return written
+
 def main():
+    parser = ArgumentParser(description="Predict RCA reaction times from dNTP exhaustion, for one scenario or a grid of them")
+    parser.add_argument("-t", "--templates", help="Template sequences, plain or FASTA files (one template per file)", nargs="+", type=str)
+    parser.add_argument("-f", "--fasta", help="FASTA file (plain or gzip) of templates, one row per record under shared conditions", type=str)
+    parser.add_argument("-n", "--ntp", help="dNTP concentrations (mM)", nargs="+", type=float, default=[20])
+    parser.add_argument("-m", "--mass", help="Template masses (ng)", nargs="+", type=float, default=[2000])
+    parser.add_argument("-p", "--phi29", help="phi29 concentrations (units/ml)", nargs="+", type=float, default=[10_000])
+    parser.add_argument("-v", "--volume", help="Reaction volumes (ml)", nargs="+", type=float, default=[1])
+    parser.add_argument("-o", "--output", help="CSV file for the sweep table", type=str, default="rca_sweep.csv")
+    parser.add_argument("-k", "--kinetic", help="Also simulate every scenario with the kinetic model", action="store_true")
+    parser.add_argument("--km", help="Michaelis constant of phi29 for dNTPs (mM) in the kinetic model", type=float, default=0.0)
+    parser.add_argument("--viscosity", help="Product DNA (ug/ml) that halves the synthesis speed in the kinetic model", type=float)
+    parser.add_argument("--exhausted", help="Fraction of a dNTP left when the kinetic model calls a reaction complete", type=float, default=0.0)
+    parser.add_argument("--occupancy", help="Limit the strands extended in the kinetic model to the phi29 molecules", action="store_true")
+    parser.add_argument("-w", "--workers", help="Number of worker processes for the predictions of --fasta, worth it with --kinetic", type=int, default=1)
+
+    args: Namespace = parser.parse_args()
+    if args.fasta:
+        count = rca_batch(args.fasta, args.output, args.ntp, args.mass, args.phi29, args.volume, workers=args.workers, kinetic=args.kinetic,
+                          km=args.km, viscosity=args.viscosity, exhausted=args.exhausted, occupancy=args.occupancy)
+        print(f"Predicted {count} templates, written to {args.output}")
+        return 0
+    if args.templates:
+        templates = {file_path: read_template(file_path) for file_path in args.templates}
+        table = rca_sweep(templates, args.ntp, args.mass, args.phi29, args.volume, kinetic=args.kinetic, km=args.km,
+                          viscosity=args.viscosity, exhausted=args.exhausted, occupancy=args.occupancy)
+        write_sweep(table, args.output)
+        print(f"Wrote {len(table)} scenarios to {args.output}")
+        return 0
+
     ntp_conc = "20 mM"
     reaction_volume = 1 # in mL
     no_of_ntp_molecules = molar_to_molecule(ntp_conc, reaction_volume)
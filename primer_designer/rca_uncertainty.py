@@ -0,0 +1,168 @@
+"""
+Monte Carlo uncertainty analysis of the RCA completion time of rca_time_predictor.
+
+Every uncertain input is drawn from a lognormal distribution with the nominal value as its mean and a
+coefficient of variation (standard deviation / mean) from UNCERTAINTY, so samples are always positive.
+Samples are drawn and pushed through the closed-form model (or the kinetic one) in vectorized batches.
+
+Batches run across a process pool. Every batch gets its own child of one np.random.SeedSequence, so a
+seed gives the same samples whatever the number of workers. Every check_every batches, in batch order, the
+95% confidence interval of each reported percentile is estimated from the spread of the per-batch
+percentiles (batch means), and sampling stops once every interval is within the relative tolerance.
+"""
+
+import math
+import sys
+from argparse import ArgumentParser, Namespace
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from composition import nucleotide_counts, read_template
+from rca_time_predictor import (PHI29_SPEED, ntp_molecule_count, phi29_molecule_count, rca_cycle_count, rca_minutes, simulate_rca,
+                                template_molecule_count)
+
+# Default coefficients of variation of the inputs; the ones left out are exact
+UNCERTAINTY = {
+    "phi29_speed": 0.10,
+    "phi29_activity": 0.10,
+    "ntp_concentration": 0.02,
+    "template_mass": 0.05,
+    "phi29_concentration": 0.05,
+    "volume": 0.01,
+    "phi29_volume": 0.02,
+}
+PERCENTILES = (2.5, 50, 97.5)
+Z_95 = 1.959964 # two-sided 95% normal quantile
+
+# Percentiles and their 95% confidence half-widths, in minutes, as {percentile: value} dicts
+MonteCarloResult = namedtuple("MonteCarloResult", ["percentiles", "half_widths", "samples", "converged"])
+
+def _draw(generator, mean, cv, size):
+    """ Lognormal samples with this mean and coefficient of variation, the mean itself when cv is 0 """
+    if not cv:
+        return np.full(size, float(mean))
+    sigma = math.sqrt(math.log1p(cv ** 2))
+    return generator.lognormal(math.log(mean) - sigma ** 2 / 2, sigma, size)
+
+def sample_rca_times(seed, batch_size, model):
+    """
+    RCA completion times in minutes of one batch of sampled inputs. model holds the template counts, the
+    nominal inputs, their coefficients of variation and the kinetic settings, see monte_carlo_rca.
+    Module-level so it can run in a worker process.
+    """
+
+    generator = np.random.default_rng(seed)
+    cv = model["uncertainty"]
+    inputs = {name: _draw(generator, model[name], cv.get(name, 0), batch_size) for name in sorted(UNCERTAINTY)}
+
+    ntp_molecules = ntp_molecule_count(inputs["ntp_concentration"], "mM", inputs["volume"])
+    template_molecules = template_molecule_count(inputs["template_mass"], "ng", model["length"])
+    a_t, g_c = model["a_t"], model["g_c"]
+
+    if model["kinetic"]:
+        phi29_molecules = phi29_molecule_count(inputs["phi29_concentration"], inputs["phi29_activity"], inputs["phi29_volume"])
+        result = simulate_rca([a_t, a_t, g_c, g_c], ntp_molecules, phi29_molecules, template_molecules, inputs["volume"], model["km"],
+                              model["viscosity"], model["exhausted"], model["steps"], curve_points=0, occupancy=model["occupancy"])
+        # Every rate of the kinetic model is proportional to the phi29 speed
+        return result.completion_time * PHI29_SPEED / inputs["phi29_speed"]
+
+    return rca_minutes(rca_cycle_count(max(a_t, g_c), ntp_molecules, template_molecules), a_t + g_c, inputs["phi29_speed"])
+
+def _confidence(batches, batch_percentiles, percentiles):
+    """ Pooled percentiles of all samples and the 95% half-widths from the spread of the per-batch percentiles """
+    pooled = np.nanpercentile(np.concatenate(batches), percentiles)
+    half_widths = Z_95 * np.array(batch_percentiles).std(axis=0, ddof=1) / math.sqrt(len(batches))
+    return pooled, half_widths
+
+def monte_carlo_rca(sequence: str, ntp_concentration: float = 20, template_mass: float = 2000, phi29_concentration: float = 10_000,
+                    volume: float = 1, phi29_activity: float = 83_333, phi29_volume: float = 0.001, uncertainty: dict | None = None,
+                    percentiles=PERCENTILES, tolerance: float = 0.005, batch_size: int = 100_000, max_samples: int = 10_000_000,
+                    check_every: int = 4, workers: int = 1, seed: int = 0, kinetic: bool = False, km: float = 0.0,
+                    viscosity: float | None = None, exhausted: float = 0.0, steps: int = 200, occupancy: bool = False):
+    """
+    Percentiles of the RCA completion time (minutes) of a template under input uncertainty. Inputs are in mM
+    (dNTPs), ng (template), units/ml and units/mg (phi29) and ml (volumes); uncertainty maps input names to
+    coefficients of variation, UNCERTAINTY by default. Sampling stops once the 95% confidence half-width of
+    every percentile is within tolerance times its value, or after max_samples. With kinetic, samples go
+    through simulate_rca, where the phi29 inputs only matter with occupancy; the closed form never uses them.
+    """
+
+    counts = nucleotide_counts(sequence).tolist()
+    model = {
+        "length": len(sequence), "a_t": counts[0] + counts[3], "g_c": counts[1] + counts[2],
+        "ntp_concentration": ntp_concentration, "template_mass": template_mass, "phi29_concentration": phi29_concentration,
+        "volume": volume, "phi29_activity": phi29_activity, "phi29_volume": phi29_volume, "phi29_speed": PHI29_SPEED,
+        "uncertainty": UNCERTAINTY if uncertainty is None else uncertainty,
+        "kinetic": kinetic, "km": km, "viscosity": viscosity, "exhausted": exhausted, "steps": steps,
+        "occupancy": occupancy,
+    }
+    unknown = set(model["uncertainty"]) - set(UNCERTAINTY)
+    if unknown:
+        raise ValueError(f"Unknown inputs {', '.join(sorted(unknown))}, choose from {', '.join(UNCERTAINTY)}")
+
+    root = np.random.SeedSequence(seed)
+    max_batches = max(math.ceil(max_samples / batch_size), 2)
+    check_every = max(check_every, 2)
+    batches = []
+    batch_percentiles = []
+    converged = False
+    pooled = half_widths = None
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        pending = deque()
+        submitted = 0
+        while len(batches) < max_batches:
+            # Keep two batches per worker in flight; the results are still used strictly in batch order
+            while submitted < max_batches and len(pending) < max(2 * workers, 1):
+                child = root.spawn(1)[0]
+                pending.append(executor.submit(sample_rca_times, child, batch_size, model) if executor else (child, batch_size, model))
+                submitted += 1
+            task = pending.popleft()
+            batches.append(task.result() if executor else sample_rca_times(*task))
+            batch_percentiles.append(np.nanpercentile(batches[-1], percentiles))
+
+            if len(batches) % check_every == 0 or len(batches) == max_batches:
+                pooled, half_widths = _confidence(batches, batch_percentiles, percentiles)
+                if (half_widths <= tolerance * np.abs(pooled)).all():
+                    converged = True
+                    break
+    finally:
+        if executor:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    return MonteCarloResult(dict(zip(percentiles, pooled.tolist())), dict(zip(percentiles, half_widths.tolist())),
+                            len(batches) * batch_size, converged)
+
+def main():
+    parser = ArgumentParser(description="Monte Carlo percentiles of the RCA completion time under input uncertainty")
+    parser.add_argument("template", help="Plain or FASTA file with the template sequence", type=str)
+    parser.add_argument("-n", "--ntp", help="dNTP concentration (mM)", type=float, default=20)
+    parser.add_argument("-m", "--mass", help="Template mass (ng)", type=float, default=2000)
+    parser.add_argument("-p", "--phi29", help="phi29 concentration (units/ml)", type=float, default=10_000)
+    parser.add_argument("-v", "--volume", help="Reaction volume (ml)", type=float, default=1)
+    parser.add_argument("-u", "--uncertainty", help=f"Coefficients of variation as name=cv, replacing the defaults {UNCERTAINTY}", nargs="+", type=str)
+    parser.add_argument("-q", "--percentiles", help="Percentiles to report", nargs="+", type=float, default=list(PERCENTILES))
+    parser.add_argument("-t", "--tolerance", help="Relative 95%% confidence half-width to stop at", type=float, default=0.005)
+    parser.add_argument("-b", "--batch-size", help="Samples per batch", type=int, default=100_000)
+    parser.add_argument("-s", "--max-samples", help="Samples to stop at if not converged", type=int, default=10_000_000)
+    parser.add_argument("-w", "--workers", help="Number of worker processes", type=int, default=1)
+    parser.add_argument("--seed", help="Seed of the random inputs", type=int, default=0)
+    parser.add_argument("-k", "--kinetic", help="Sample the kinetic model instead of the closed form", action="store_true")
+    parser.add_argument("--occupancy", help="Limit the strands extended in the kinetic model to the phi29 molecules", action="store_true")
+
+    args: Namespace = parser.parse_args()
+    uncertainty = None
+    if args.uncertainty:
+        uncertainty = {name: float(cv) for name, cv in (entry.split("=") for entry in args.uncertainty)}
+    result = monte_carlo_rca(read_template(args.template), args.ntp, args.mass, args.phi29, args.volume, uncertainty=uncertainty,
+                             percentiles=args.percentiles, tolerance=args.tolerance, batch_size=args.batch_size,
+                             max_samples=args.max_samples, workers=args.workers, seed=args.seed, kinetic=args.kinetic,
+                             occupancy=args.occupancy)
+    for percentile, minutes in result.percentiles.items():
+        print(f"P{percentile:g}: {minutes:.2f} min ({minutes / (60 * 24):.3f} days) +/- {result.half_widths[percentile]:.2f} min")
+    print(f"{result.samples} samples, {'converged' if result.converged else 'not converged'}", file=sys.stderr)
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
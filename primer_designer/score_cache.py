@@ -0,0 +1,157 @@
+"""
+Persistent SQLite cache of the raw per-sequence metrics behind primer_score_calc.
+
+Only the metrics are stored (length, GC count, both Tm models, homopolymer, 3' G/C, hairpin % and dimer %),
+never the scores. None of them depend on variables.json, so after a threshold change every score is
+re-derived from the cache without recomputing a single metric.
+
+METRICS_VERSION is saved in the database. Bump it whenever one of the metric algorithms changes its
+results: an existing cache with another version is emptied when it is opened.
+"""
+
+import math
+import sqlite3
+from primer_class import SCORING_ERRORS, TM_METRICS, gc_percentage_calc, melting_temperature_calc, sequence_metric
+
+METRICS_VERSION = 3
+METRIC_COLUMNS = ("length", "gc_count", "melting_temperature", "melting_temperature_nn", "homopolymer", "last_gc", "hairpin", "dimer")
+# SQLite's default limit on the number of ? parameters in one statement is 999
+LOOKUP_SIZE = 500
+
+def _safe_metric(sequence, metric):
+    """ A metric of the sequence, or None if it cannot be computed for this sequence """
+    try:
+        return sequence_metric(sequence, metric)
+    except SCORING_ERRORS:
+        return None
+
+def primer_metrics(sequence):
+    """ Every metric primer_score_calc needs for a lowercase sequence, in METRIC_COLUMNS order """
+    gc_count = sequence_metric(sequence, "gc_count")
+    return (
+        len(sequence),
+        gc_count,
+        melting_temperature_calc(gc_count, len(sequence)),
+        _safe_metric(sequence, "melting_temperature_nn"),
+        _safe_metric(sequence, "homopolymer"),
+        sequence[-1:] in ("g", "c"),
+        _safe_metric(sequence, "hairpin"),
+        _safe_metric(sequence, "dimer"),
+    )
+
+def compute_metrics(sequences):
+    """ primer_metrics of a list of sequences. Module-level so it can run in a worker process. """
+    return [primer_metrics(sequence) for sequence in sequences]
+
+class CachedPrimer():
+    """
+    Read-only view of cached metrics with the scoring interface of Primer, so primer_score_calc scores it
+    unchanged. Metrics that could not be computed raise ValueError when read.
+    """
+
+    __slots__ = ("_values", "tm_mode")
+
+    def __init__(self, values, tm_mode="basic"):
+        self._values = dict(zip(METRIC_COLUMNS, values))
+        self.tm_mode = tm_mode
+
+    def _metric(self, metric):
+        value = self._values[metric]
+        if value is None:
+            raise ValueError(f"Metric {metric} could not be computed for this sequence")
+        return value
+
+    @property
+    def length(self):
+        return self._metric("length")
+
+    @property
+    def gc_count(self):
+        return self._metric("gc_count")
+
+    @property
+    def gc_percentage(self):
+        return gc_percentage_calc(self.gc_count, self.length)
+
+    @property
+    def melting_temperature(self):
+        return self._metric(TM_METRICS[self.tm_mode])
+
+    def homopolymer_check(self):
+        return self._metric("homopolymer")
+
+    def last_nucleotide_check(self):
+        return bool(self._metric("last_gc"))
+
+    def hairpin_check(self):
+        return self._metric("hairpin")
+
+    def primer_dimer_check(self):
+        return self._metric("dimer")
+
+class ScoreCache():
+    """ Sequence -> metrics store in an SQLite file. Use as a context manager or call close(). """
+
+    def __init__(self, path="score_cache.sqlite3"):
+        self.connection = sqlite3.connect(path)
+        columns = ", ".join(f"{column} {'REAL' if column in ('melting_temperature', 'melting_temperature_nn', 'hairpin', 'dimer') else 'INTEGER'}" for column in METRIC_COLUMNS)
+        with self.connection:
+            self.connection.execute("CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT)")
+            self.connection.execute(f"CREATE TABLE IF NOT EXISTS metrics (sequence TEXT PRIMARY KEY, {columns}) WITHOUT ROWID")
+            row = self.connection.execute("SELECT value FROM settings WHERE key = 'metrics_version'").fetchone()
+            if row is None or int(row[0]) != METRICS_VERSION:
+                self.connection.execute("DELETE FROM metrics")
+                self.connection.execute("INSERT OR REPLACE INTO settings VALUES ('metrics_version', ?)", (str(METRICS_VERSION),))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM metrics").fetchone()[0]
+
+    def close(self):
+        self.connection.close()
+
+    def lookup(self, sequences):
+        """ {sequence: metrics tuple} for the given lowercase sequences that are in the cache """
+
+        sequences = list(set(sequences))
+        found = {}
+        for start in range(0, len(sequences), LOOKUP_SIZE):
+            block = sequences[start:start + LOOKUP_SIZE]
+            query = f"SELECT sequence, {', '.join(METRIC_COLUMNS)} FROM metrics WHERE sequence IN ({', '.join('?' * len(block))})"
+            for sequence, *values in self.connection.execute(query, block):
+                found[sequence] = tuple(values)
+
+        # SQLite stores NaN as NULL: the nearest-neighbour Tm is NaN, not missing, for sequences it does not cover
+        tm_nn = METRIC_COLUMNS.index("melting_temperature_nn")
+        return {sequence: values[:tm_nn] + (math.nan if values[tm_nn] is None else values[tm_nn],) + values[tm_nn + 1:]
+                for sequence, values in found.items()}
+
+    def store(self, sequences, metrics):
+        """ Save metrics tuples for lowercase sequences and return them as a {sequence: metrics} dict """
+        rows = dict(zip(sequences, metrics))
+        with self.connection:
+            self.connection.executemany(f"INSERT OR REPLACE INTO metrics VALUES ({', '.join('?' * (len(METRIC_COLUMNS) + 1))})",
+                                        [(sequence, *values) for sequence, values in rows.items()])
+        return rows
+
+    def metrics(self, sequences):
+        """ {sequence: metrics tuple} for lowercase sequences, computing and saving the ones that are not cached yet """
+        sequences = list(sequences)
+        found = self.lookup(sequences)
+        missing = list(set(sequences) - found.keys())
+        if missing:
+            found.update(self.store(missing, compute_metrics(missing)))
+        return found
+
+def main():
+    with ScoreCache(":memory:") as cache:
+        metrics = cache.metrics(["tgaggccgccatccacgc"])
+        print(dict(zip(METRIC_COLUMNS, metrics["tgaggccgccatccacgc"])))
+
+if __name__ == "__main__":
+    main()
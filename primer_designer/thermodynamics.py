@@ -0,0 +1,186 @@
+"""
+Nearest-neighbour melting temperature model (SantaLucia 1998 unified parameters).
+
+Tm = 1000 * dH / (dS + R * ln(Ct / x)) - 273.15
+
+- dH and dS are the sums of the dinucleotide stacking terms plus the initiation terms of both ends.
+- dS gets the sodium correction 0.368 * (N - 1) * ln[Na+]. Mg2+ is converted to a sodium equivalent
+  with Na_eq = Na + 120 * sqrt(Mg - dNTP) (von Ahsen et al. 2001).
+- x is 4 for a non self-complementary oligo and 1 for a self-complementary one.
+
+The table values all have one decimal, so they are stored as integer tenths. Sums are then exact and the
+scalar, batched and sliding-window functions below give identical temperatures.
+"""
+
+import math
+import numpy as np
+
+NUCLEOTIDES = "acgt"
+GAS_CONSTANT = 1.987 # cal/(K*mol)
+
+# Default reaction conditions, matching the IDT oligo analyser defaults
+NA_CONC = 50 # mM
+MG_CONC = 0 # mM
+DNTP_CONC = 0 # mM
+OLIGO_CONC = 250 # nM
+
+# Stacking terms (dH in 0.1 kcal/mol, dS in 0.1 cal/K/mol) for the dinucleotide 5'-XY-3'/3'-X'Y'-5'
+NN_PARAMETERS = {
+    "aa": (-79, -222), "tt": (-79, -222),
+    "at": (-72, -204),
+    "ta": (-72, -213),
+    "ca": (-85, -227), "tg": (-85, -227),
+    "gt": (-84, -224), "ac": (-84, -224),
+    "ct": (-78, -210), "ag": (-78, -210),
+    "ga": (-82, -222), "tc": (-82, -222),
+    "cg": (-106, -272),
+    "gc": (-98, -244),
+    "gg": (-80, -199), "cc": (-80, -199),
+}
+INIT_GC = (1, -28)
+INIT_AT = (23, 41)
+SYMMETRY = (0, -14)
+
+# Same tables indexed by 4 * code(X) + code(Y) with a=0, c=1, g=2, t=3
+NN_DH = np.array([NN_PARAMETERS[x + y][0] for x in NUCLEOTIDES for y in NUCLEOTIDES], dtype=np.int64)
+NN_DS = np.array([NN_PARAMETERS[x + y][1] for x in NUCLEOTIDES for y in NUCLEOTIDES], dtype=np.int64)
+INIT_DH = np.array([INIT_AT[0], INIT_GC[0], INIT_GC[0], INIT_AT[0]], dtype=np.int64)
+INIT_DS = np.array([INIT_AT[1], INIT_GC[1], INIT_GC[1], INIT_AT[1]], dtype=np.int64)
+
+INVALID = 255
+CODES = np.full(256, INVALID, dtype=np.uint8)
+for code, nucleotide in enumerate(NUCLEOTIDES):
+    CODES[ord(nucleotide)] = code
+    CODES[ord(nucleotide.upper())] = code
+
+def encode(sequence):
+    """ Nucleotide codes (a=0, c=1, g=2, t=3, anything else 255) of a sequence """
+    return CODES[np.frombuffer(sequence.encode("ascii", "replace"), dtype=np.uint8)]
+
+def salt_conditions(na_conc=NA_CONC, mg_conc=MG_CONC, dntp_conc=DNTP_CONC, oligo_conc=OLIGO_CONC):
+    """ ln[Na+ equivalent] (M) and ln(Ct) (M) for the given conditions in mM and nM """
+
+    na_equivalent = na_conc
+    if mg_conc > dntp_conc:
+        na_equivalent += 120 * math.sqrt(mg_conc - dntp_conc)
+
+    return math.log(na_equivalent / 1000), math.log(oligo_conc / 1e9)
+
+def tm_from_sums(dh, ds, length, self_complementary, log_na, log_ct):
+    """ Tm in Celcius from dH and dS sums in tenths. Works on Python numbers and NumPy arrays alike. """
+
+    dh = dh / 10
+    ds = ds / 10 + 0.368 * (length - 1) * log_na
+    log_strands = log_ct - np.where(self_complementary, 0, math.log(4))
+
+    return 1000 * dh / (ds + GAS_CONSTANT * log_strands) - 273.15
+
+def nn_melting_temperature(sequence, na_conc=NA_CONC, mg_conc=MG_CONC, dntp_conc=DNTP_CONC, oligo_conc=OLIGO_CONC):
+    """ Nearest-neighbour Tm of one sequence in Celcius. NaN for sequences shorter than 2 or with letters other than a, c, g and t. """
+
+    sequence = sequence.lower()
+    if len(sequence) < 2 or sequence.strip(NUCLEOTIDES):
+        return math.nan
+
+    dh = 0
+    ds = 0
+    for index in range(len(sequence) - 1):
+        stack_dh, stack_ds = NN_PARAMETERS[sequence[index:index + 2]]
+        dh += stack_dh
+        ds += stack_ds
+
+    for end in (sequence[0], sequence[-1]):
+        init_dh, init_ds = INIT_GC if end in "gc" else INIT_AT
+        dh += init_dh
+        ds += init_ds
+
+    self_complementary = sequence == sequence.translate(str.maketrans("acgt", "tgca"))[::-1]
+    if self_complementary:
+        ds += SYMMETRY[1]
+
+    melting_temp = tm_from_sums(dh, ds, len(sequence), self_complementary, *salt_conditions(na_conc, mg_conc, dntp_conc, oligo_conc))
+
+    return float(np.round(melting_temp, 2))
+
+def nn_melting_temperature_batch(sequences, na_conc=NA_CONC, mg_conc=MG_CONC, dntp_conc=DNTP_CONC, oligo_conc=OLIGO_CONC):
+    """ Nearest-neighbour Tm of every sequence of a list, evaluated with table lookups on one padded code array """
+
+    sequences = list(sequences)
+    lengths = np.fromiter(map(len, sequences), dtype=np.int64, count=len(sequences))
+    codes = np.full((len(sequences), lengths.max(initial=0)), INVALID, dtype=np.uint8)
+    flat = encode("".join(sequences))
+    columns = np.arange(flat.size) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    codes[np.repeat(np.arange(len(sequences)), lengths), columns] = flat
+
+    rows = np.arange(len(sequences))
+    inside = np.arange(codes.shape[1]) < lengths[:, None]
+    valid = (lengths >= 2) & ((codes != INVALID) | ~inside).all(axis=1)
+    safe = np.where(codes == INVALID, 0, codes).astype(np.int64)
+
+    stacks = 4 * safe[:, :-1] + safe[:, 1:]
+    pairs = inside[:, 1:]
+    dh = np.where(pairs, NN_DH[stacks], 0).sum(axis=1)
+    ds = np.where(pairs, NN_DS[stacks], 0).sum(axis=1)
+
+    first = safe[:, 0] if codes.shape[1] else np.zeros(len(sequences), dtype=np.int64)
+    last = safe[rows, np.maximum(lengths - 1, 0)] if codes.shape[1] else first
+    dh += INIT_DH[first] + INIT_DH[last]
+    ds += INIT_DS[first] + INIT_DS[last]
+
+    # Self-complementary: the reverse of each sequence equals its complement (3 - code)
+    reverse_index = np.maximum(lengths[:, None] - 1 - np.arange(codes.shape[1]), 0)
+    self_complementary = ((safe == 3 - safe[rows[:, None], reverse_index]) | ~inside).all(axis=1)
+    ds += np.where(self_complementary, SYMMETRY[1], 0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        melting_temp = tm_from_sums(dh, ds, lengths, self_complementary, *salt_conditions(na_conc, mg_conc, dntp_conc, oligo_conc))
+
+    return np.where(valid, np.round(melting_temp, 2), np.nan)
+
+def nn_window_terms(template):
+    """
+    Cumulative dH and dS stacking sums over a template, so the stacking sum of any window is a difference
+    of two entries. Pairs touching a non-acgt letter count as zero and are tracked in a cumulative count.
+    """
+
+    codes = encode(template)
+    valid = codes != INVALID
+    safe = np.where(valid, codes, 0).astype(np.int64)
+    stacks = 4 * safe[:-1] + safe[1:]
+    pair_valid = valid[:-1] & valid[1:]
+
+    cumulative_dh = np.concatenate(([0], np.cumsum(np.where(pair_valid, NN_DH[stacks], 0))))
+    cumulative_ds = np.concatenate(([0], np.cumsum(np.where(pair_valid, NN_DS[stacks], 0))))
+    cumulative_invalid = np.concatenate(([0], np.cumsum(~valid)))
+
+    return safe, cumulative_dh, cumulative_ds, cumulative_invalid
+
+def nn_window_melting_temperature(template, length, na_conc=NA_CONC, mg_conc=MG_CONC, dntp_conc=DNTP_CONC, oligo_conc=OLIGO_CONC):
+    """ Nearest-neighbour Tm of every window of the given length along a template (index = window start) """
+
+    safe, cumulative_dh, cumulative_ds, cumulative_invalid = nn_window_terms(template)
+    starts = np.arange(max(len(safe) - length + 1, 0))
+    ends = starts + length - 1
+
+    dh = cumulative_dh[ends] - cumulative_dh[starts] + INIT_DH[safe[starts]] + INIT_DH[safe[ends]]
+    ds = cumulative_ds[ends] - cumulative_ds[starts] + INIT_DS[safe[starts]] + INIT_DS[safe[ends]]
+
+    windows = np.lib.stride_tricks.sliding_window_view(safe, length) if len(starts) else np.zeros((0, length), dtype=np.int64)
+    self_complementary = (windows == 3 - windows[:, ::-1]).all(axis=1)
+    ds += np.where(self_complementary, SYMMETRY[1], 0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        melting_temp = tm_from_sums(dh, ds, length, self_complementary, *salt_conditions(na_conc, mg_conc, dntp_conc, oligo_conc))
+
+    valid = (cumulative_invalid[ends + 1] - cumulative_invalid[starts] == 0) & (length >= 2)
+
+    return np.where(valid, np.round(melting_temp, 2), np.nan)
+
+def main():
+    sequences = ["tgaggccgccatccacgc", "acttggcagtacatctacgtattagtcatcgctatta"]
+    print(f"Nearest-neighbour Tm: {[nn_melting_temperature(sequence) for sequence in sequences]}")
+    print(f"Batched: {nn_melting_temperature_batch(sequences)}")
+    print(f"18-mer windows: {nn_window_melting_temperature(sequences[1], 18)}")
+
+if __name__ == "__main__":
+    main()
@@ -2,37 +2,52 @@ import csv
 import os
 from argparse import ArgumentParser, Namespace
 
+def merge_intervals(intervals: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    """ Sorted union of closed (start, end) intervals, joining the ones that overlap or touch """
+    merged: list[tuple[int, int]] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1] + 1:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+
+    return merged
+
+def coverage_gaps(intervals: list[tuple[int, int]], q_length: int) -> list[tuple[int, int]]:
+    """
+    (start, end) ranges of the query positions 1..q_length that no hit covers. Hits on the minus strand
+    (start > end) are turned around and hits are clipped to the query, so only the hits are sorted and the
+    query length does not matter.
+    """
+    clipped: list[tuple[int, int]] = []
+    for start, end in intervals:
+        low: int = max(min(start, end), 1)
+        high: int = min(max(start, end), q_length)
+        if low <= high:
+            clipped.append((low, high))
+
+    gaps: list[tuple[int, int]] = []
+    next_uncovered: int = 1
+    for start, end in merge_intervals(clipped):
+        if start > next_uncovered:
+            gaps.append((next_uncovered, start - 1))
+        next_uncovered = end + 1
+    if next_uncovered <= q_length:
+        gaps.append((next_uncovered, q_length))
+
+    return gaps
+
 def blast_sequence_coverage(file: str, q_length: int) -> list[str] | None:
-    coverage_gap: set = {x for x in range(1, q_length + 1)}
-    temp_set: set = {}
     with open(file, 'r') as f:
         reader: csv.reader = csv.reader(f, delimiter=',')
+        # Query start and end are the last two columns
+        hits: list[tuple[int, int]] = [(int(line[-2]), int(line[-1])) for line in reader]
 
-        for line in reader:
-            start: int = int(line[-2])
-            end: int = int(line[-1])
-            temp_set = {x for x in range(start, end + 1)}
-            coverage_gap -= temp_set
-    # print(coverage_gap)
-    if len(coverage_gap) == 0:
+    gaps: list[tuple[int, int]] = coverage_gaps(hits, q_length)
+    if len(gaps) == 0:
         return None
-    cov_gap_list: list[int] = list(coverage_gap)
-    cov_gap_list.sort()
-    largest_num : int = max(coverage_gap)
-    gap_ranges: list[str] = []
-    temp_range: str = f"{cov_gap_list[0]}"
-    previous_num: int = cov_gap_list[0]
-    for num in cov_gap_list[1:]:
-        if previous_num + 1 != num:
-            temp_range += '-' + str(previous_num)
-            gap_ranges.append(temp_range)
-            temp_range = str(num)
-
-        if num == largest_num:
-            temp_range += '-' + str(num)
-            gap_ranges.append(temp_range)
-
-        previous_num = num
+    gap_ranges: list[str] = [f"{start}-{end}" for start, end in gaps]
 
     return gap_ranges
 
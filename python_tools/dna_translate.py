@@ -1,384 +1,562 @@
 """
 Tool to take a nucleotide sequence and convert it to a peptide.
 
-In current version, this tool ignores searching for start and stop codons.
+translate_dna ignores start and stop codons.
+IUPAC ambiguity codes are complemented, and codons that do not resolve to one amino acid translate to X.
 It will naively translate all 6 frames of the full nucleotide sequence.
+Any NCBI genetic code in genetic_codes.json can be chosen, the standard code is the default.
 If a stop codon is encountered when translating, it will be ignored.
+find_orfs calls the ATG...stop open reading frames of all 6 frames instead.
 """
 
+import gzip
 import json
+import os
+import tempfile
+from argparse import ArgumentParser, Namespace
+from collections import deque, namedtuple
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import nullcontext
+from functools import lru_cache
+from multiprocessing.shared_memory import SharedMemory
+from typing import BinaryIO, Iterator, TextIO
+import numpy as np
 
-# Codon Table Dictionary:
-
-codons: dict[str, dict[str, str]] = {
-    "ttt": {
-        "letter": 'F',
-        "abbreviation": 'Phe',
-        "amino_acid": "Phenyalanine"
-    },
-    "ttc": {
-        "letter": 'F',
-        "abbreviation": 'Phe',
-        "amino_acid": "Phenyalanine"
-    },
-    "tta": {
-        "letter": 'L',
-        "abbreviation": 'Leu',
-        "amino_acid": "Leucine"
-    },
-    "ttg": {
-        "letter": 'L',
-        "abbreviation": 'Leu',
-        "amino_acid": "Leucine"
-    },
-    "ctt": {
-        "letter": 'L',
-        "abbreviation": 'Leu',
-        "amino_acid": "Leucine"
-    },
-    "ctc": {
-        "letter": 'L',
-        "abbreviation": 'Leu',
-        "amino_acid": "Leucine"
-    },
-    "cta": {
-        "letter": 'L',
-        "abbreviation": 'Leu',
-        "amino_acid": "Leucine"
-    },
-    "ctg": {
-        "letter": 'L',
-        "abbreviation": 'Leu',
-        "amino_acid": "Leucine"
-    },
-    "att": {
-        "letter": 'I',
-        "abbreviation": 'Ile',
-        "amino_acid": "Isoleucine"
-    },
-    "atc": {
-        "letter": 'I',
-        "abbreviation": 'Ile',
-        "amino_acid": "Isoleucine"
-    },
-    "ata": {
-        "letter": 'I',
-        "abbreviation": 'Ile',
-        "amino_acid": "Isoleucine"
-    },
-    "atg": {
-        "letter": 'M',
-        "abbreviation": 'Met',
-        "amino_acid": "Methionine"
-    },
-    "gtt": {
-        "letter": 'V',
-        "abbreviation": 'Val',
-        "amino_acid": "Valine"
-    },
-    "gtc": {
-        "letter": 'V',
-        "abbreviation": 'Val',
-        "amino_acid": "Valine"
-    },
-    "gta": {
-        "letter": 'V',
-        "abbreviation": 'Val',
-        "amino_acid": "Valine"
-    },
-    "gtg": {
-        "letter": 'V',
-        "abbreviation": 'Val',
-        "amino_acid": "Valine"
-    },
-    "tct": {
-        "letter": 'S',
-        "abbreviation": 'Ser',
-        "amino_acid": "Serine"
-    },
-    "tcc": {
-        "letter": 'S',
-        "abbreviation": 'Ser',
-        "amino_acid": "Serine"
-    },
-    "tca": {
-        "letter": 'S',
-        "abbreviation": 'Ser',
-        "amino_acid": "Serine"
-    },
-    "tcg": {
-        "letter": 'S',
-        "abbreviation": 'Ser',
-        "amino_acid": "Serine"
-    },
-    "cct": {
-        "letter": 'P',
-        "abbreviation": 'Pro',
-        "amino_acid": "Proline"
-    },
-    "ccc": {
-        "letter": 'P',
-        "abbreviation": 'Pro',
-        "amino_acid": "Proline"
-    },
-    "cca": {
-        "letter": 'P',
-        "abbreviation": 'Pro',
-        "amino_acid": "Proline"
-    },
-    "ccg": {
-        "letter": 'P',
-        "abbreviation": 'Pro',
-        "amino_acid": "Proline"
-    },
-    "act": {
-        "letter": 'T',
-        "abbreviation": 'Thr',
-        "amino_acid": "Threonine"
-    },
-    "acc": {
-        "letter": 'T',
-        "abbreviation": 'Thr',
-        "amino_acid": "Threonine"
-    },
-    "aca": {
-        "letter": 'T',
-        "abbreviation": 'Thr',
-        "amino_acid": "Threonine"
-    },
-    "acg": {
-        "letter": 'T',
-        "abbreviation": 'Thr',
-        "amino_acid": "Threonine"
-    },
-    "gct": {
-        "letter": 'A',
-        "abbreviation": 'Ala',
-        "amino_acid": "Alanine"
-    },
-    "gcc": {
-        "letter": 'A',
-        "abbreviation": 'Ala',
-        "amino_acid": "Alanine"
-    },
-    "gca": {
-        "letter": 'A',
-        "abbreviation": 'Ala',
-        "amino_acid": "Alanine"
-    },
-    "gcg": {
-        "letter": 'A',
-        "abbreviation": 'Ala',
-        "amino_acid": "Alanine"
-    },
-    "tat": {
-        "letter": 'Y',
-        "abbreviation": 'Tyr',
-        "amino_acid": "Tyrosine"
-    },
-    "tac": {
-        "letter": 'Y',
-        "abbreviation": 'Tyr',
-        "amino_acid": "Tyrosine"
-    },
-    "taa": {
-        "letter": '*',
-        "abbreviation": 'Sto',
-        "amino_acid": "Stop"
-    },
-    "tag": {
-        "letter": '*',
-        "abbreviation": 'Sto',
-        "amino_acid": "Stop"
-    },
-    "cat": {
-        "letter": 'H',
-        "abbreviation": 'His',
-        "amino_acid": "Histidine"
-    },
-    "cac": {
-        "letter": 'H',
-        "abbreviation": 'His',
-        "amino_acid": "Histidine"
-    },
-    "caa": {
-        "letter": 'Q',
-        "abbreviation": 'Gln',
-        "amino_acid": "Glutamine"
-    },
-    "cag": {
-        "letter": 'Q',
-        "abbreviation": 'Gln',
-        "amino_acid": "Glutamine"
-    },
-    "aat": {
-        "letter": 'N',
-        "abbreviation": 'Asn',
-        "amino_acid": "Asparagine"
-    },
-    "aac": {
-        "letter": 'N',
-        "abbreviation": 'Asn',
-        "amino_acid": "Asparagine"
-    },
-    "aaa": {
-        "letter": 'K',
-        "abbreviation": 'Lys',
-        "amino_acid": "Lysine"
-    },
-    "aag": {
-        "letter": 'K',
-        "abbreviation": 'Lys',
-        "amino_acid": "Lysine"
-    },
-    "gat": {
-        "letter": 'D',
-        "abbreviation": 'Asp',
-        "amino_acid": "Aspartic acid"
-    },
-    "gac": {
-        "letter": 'D',
-        "abbreviation": 'Asp',
-        "amino_acid": "Aspartic acid"
-    },
-    "gaa": {
-        "letter": 'E',
-        "abbreviation": 'Glu',
-        "amino_acid": "Glutamic acid"
-    },
-    "gag": {
-        "letter": 'E',
-        "abbreviation": 'Glu',
-        "amino_acid": "Glutamic acid"
-    },
-    "tgt": {
-        "letter": 'C',
-        "abbreviation": 'Cys',
-        "amino_acid": "Cysteine"
-    },
-    "tgc": {
-        "letter": 'C',
-        "abbreviation": 'Cys',
-        "amino_acid": "Cysteine"
-    },
-    "tga": {
-        "letter": '*',
-        "abbreviation": 'Sto',
-        "amino_acid": "Stop"
-    },
-    "tgg": {
-        "letter": 'W',
-        "abbreviation": 'Trp',
-        "amino_acid": "Tryptophan"
-    },
-    "cgt": {
-        "letter": 'R',
-        "abbreviation": 'Arg',
-        "amino_acid": "Arginine"
-    },
-    "cgc": {
-        "letter": 'R',
-        "abbreviation": 'Arg',
-        "amino_acid": "Arginine"
-    },
-    "cga": {
-        "letter": 'R',
-        "abbreviation": 'Arg',
-        "amino_acid": "Arginine"
-    },
-    "cgg": {
-        "letter": 'R',
-        "abbreviation": 'Arg',
-        "amino_acid": "Arginine"
-    },
-    "agt": {
-        "letter": 'S',
-        "abbreviation": 'Ser',
-        "amino_acid": "Serine"
-    },
-    "agc": {
-        "letter": 'S',
-        "abbreviation": 'Ser',
-        "amino_acid": "Serine"
-    },
-    "aga": {
-        "letter": 'R',
-        "abbreviation": 'Arg',
-        "amino_acid": "Arginine"
-    },
-    "agg": {
-        "letter": 'R',
-        "abbreviation": 'Arg',
-        "amino_acid": "Arginine"
-    },
-    "ggt": {
-        "letter": 'G',
-        "abbreviation": 'Gly',
-        "amino_acid": "Glycine"
-    },
-    "ggc": {
-        "letter": 'G',
-        "abbreviation": 'Gly',
-        "amino_acid": "Glycine"
-    },
-    "gga": {
-        "letter": 'G',
-        "abbreviation": 'Gly',
-        "amino_acid": "Glycine"
-    },
-    "ggg": {
-        "letter": 'G',
-        "abbreviation": 'Gly',
-        "amino_acid": "Glycine"
-    }
+NUCLEOTIDES: str = "acgt"
+INVALID: int = 0 # mask of any letter outside the IUPAC nucleotide alphabet
+
+# IUPAC nucleotide codes as 4-bit masks of the bases they stand for (a=1, c=2, g=4, t=8).
+# Reversing the four bits swaps a with t and c with g, so it complements every ambiguity code as well.
+IUPAC_MASKS: dict[str, int] = {
+    "a": 1, "c": 2, "g": 4, "t": 8,
+    "m": 3, "r": 5, "w": 9, "s": 6, "y": 10, "k": 12,
+    "v": 7, "h": 11, "d": 13, "b": 14,
+    "n": 15
 }
+MASKED: int = IUPAC_MASKS["n"]
+NUCLEOTIDE_MASKS: np.ndarray = np.full(256, INVALID, dtype=np.uint8)
+MASK_LETTERS: np.ndarray = np.zeros(16, dtype=np.uint8)
+for letter, mask in IUPAC_MASKS.items():
+    NUCLEOTIDE_MASKS[ord(letter)] = mask
+    MASK_LETTERS[mask] = ord(letter)
+COMPLEMENT_MASKS: np.ndarray = np.array([int(f"{mask:04b}"[::-1], 2) for mask in range(16)], dtype=np.uint8)
+
+# Codon tables are read from JSON next to this repository's codons.json: genetic_codes.json holds the NCBI
+# translation tables by number, each as the 64 amino acid letters of the codons in NCBI order (tcag for every position)
+DATA_DIRECTORY: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CODONS_PATH: str = os.path.join(DATA_DIRECTORY, "codons.json")
+GENETIC_CODES_PATH: str = os.path.join(DATA_DIRECTORY, "genetic_codes.json")
+NCBI_ORDER: str = "tcag"
+STANDARD_CODE: int = 1
+
+CODON_INDICES: np.ndarray = np.arange(4096)
+# Bases of every IUPAC mask as a (16, 4) boolean matrix in NUCLEOTIDES order
+MASK_BASES: np.ndarray = (np.arange(16)[:, None] >> np.arange(4) & 1).astype(bool)
+
+@lru_cache(maxsize=None)
+def _codons() -> dict[str, dict[str, str]]:
+    with open(CODONS_PATH, "r") as file:
+        return json.load(file)
+
+def __getattr__(name: str):
+    # The codon dictionary that used to be defined here, now read from codons.json on first use
+    if name == "codons":
+        return _codons()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def genetic_codes() -> dict[int, str]:
+    """ Number and name of every NCBI translation table in genetic_codes.json """
+    with open(GENETIC_CODES_PATH, "r") as file:
+        return {int(number): code["name"] for number, code in json.load(file).items()}
+
+def _amino_acids(genetic_code: int | str) -> dict[str, str]:
+    """ Codon -> amino acid letter of an NCBI table number or of a codons.json-like file """
+
+    if isinstance(genetic_code, str) and not genetic_code.isdigit():
+        with open(genetic_code, "r") as file:
+            return {codon.lower(): entry["letter"] for codon, entry in json.load(file).items()}
+
+    with open(GENETIC_CODES_PATH, "r") as file:
+        tables: dict[str, dict[str, str]] = json.load(file)
+    if str(genetic_code) not in tables:
+        raise ValueError(f"Unknown genetic code {genetic_code}, choose one of {', '.join(tables)}")
+    codon_list: list[str] = [x + y + z for x in NCBI_ORDER for y in NCBI_ORDER for z in NCBI_ORDER]
+    return dict(zip(codon_list, tables[str(genetic_code)]["amino_acids"]))
+
+def _compile_table(letters: dict[str, str]) -> np.ndarray:
+    """
+    Amino acid letter of every codon of IUPAC masks, indexed by mask(first) << 8 | mask(second) << 4 | mask(third).
+    An ambiguous codon gets the amino acid all its expansions share (gcn is A), and X if they differ.
+    """
+
+    amino_acids: np.ndarray = np.array([ord(letters[x + y + z]) for x in NUCLEOTIDES for y in NUCLEOTIDES for z in NUCLEOTIDES], dtype=np.uint8)
+    # (4096, 64) matrix of the acgt codons every codon of masks expands to
+    expansions: np.ndarray = (MASK_BASES[CODON_INDICES >> 8][:, :, None, None] & MASK_BASES[CODON_INDICES >> 4 & 15][:, None, :, None]
+                              & MASK_BASES[CODON_INDICES & 15][:, None, None, :]).reshape(4096, 64)
+    highest: np.ndarray = np.where(expansions, amino_acids, 0).max(axis=1)
+    lowest: np.ndarray = np.where(expansions, amino_acids, 255).min(axis=1)
+    return np.where(highest == lowest, highest, ord("X")).astype(np.uint8)
+
+@lru_cache(maxsize=None)
+def codon_tables(genetic_code: int | str = STANDARD_CODE) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Compiled lookup arrays of a genetic code: an NCBI table number (1 is the standard code, 2 vertebrate
+    mitochondrial, ...) or the path of a codons.json-like file. Returns the amino acid letter of every codon
+    and of its reverse complement, both indexed like _compile_table. Tables are compiled once per process.
+    """
+
+    table: np.ndarray = _compile_table(_amino_acids(genetic_code))
+
+    reverse_table: np.ndarray = table[(COMPLEMENT_MASKS[CODON_INDICES & 15].astype(np.intp) << 8)
+                                      | (COMPLEMENT_MASKS[CODON_INDICES >> 4 & 15] << 4) | COMPLEMENT_MASKS[CODON_INDICES >> 8]]
+    table.flags.writeable = False
+    reverse_table.flags.writeable = False
+    return table, reverse_table
+
+START_CODON: int = IUPAC_MASKS["a"] << 8 | IUPAC_MASKS["t"] << 4 | IUPAC_MASKS["g"]
+
+# An open reading frame: frame f1-f6 as in translate_dna, forward-strand coordinates (0-based, end exclusive,
+# ATG to stop codon included), length in amino acids and the protein without the stop
+Orf = namedtuple("Orf", ["frame", "strand", "start", "end", "length", "protein"])
+
+CHUNK_SIZE: int = 1 << 20 # nucleotides read at a time when streaming
+LINE_WIDTH: int = 60 # residues per line of the translated FASTA
+SEGMENT_SIZE: int = 1 << 20 # nucleotides per task of the parallel translation
+
+def encode(sequence: str) -> np.ndarray:
+    """ IUPAC masks of a lowercase sequence, INVALID for any other letter """
+    return NUCLEOTIDE_MASKS[np.frombuffer(sequence.encode("ascii", "replace"), dtype=np.uint8)]
+
+def _check_nucleotides(codes: np.ndarray, sequence: str) -> None:
+    """ Raise the KeyError of the base pair lookup for the first letter of the reversed sequence that is not an IUPAC code """
+    if not codes.size or codes.min() != INVALID:
+        return
+    invalid: np.ndarray = np.flatnonzero(codes[::-1] == INVALID)
+    raise KeyError(sequence[len(sequence) - 1 - int(invalid[0])])
+
+def _codon_indices(codes: np.ndarray, frame: int) -> np.ndarray:
+    """ Codon table index of every complete codon of one frame """
+    count: int = max(len(codes) - frame, 0) // 3
+    triplets: np.ndarray = codes[frame:frame + 3 * count].reshape(count, 3)
+    return (triplets[:, 0].astype(np.uint16) << 8) | (triplets[:, 1].astype(np.uint16) << 4) | triplets[:, 2]
+
+def _translate_frame(codes: np.ndarray, frame: int, sequence: str = "", table: np.ndarray | None = None) -> str:
+    """ Translate the complete codons of one frame of IUPAC masks through a codon table, the standard code by default """
+    count: int = max(len(codes) - frame, 0) // 3
+    if count and codes[frame:frame + 3 * count].min() == INVALID:
+        # Same error as the codon table lookup: the first codon that is not in it
+        invalid: np.ndarray = np.flatnonzero((codes[frame:frame + 3 * count].reshape(count, 3) == INVALID).any(axis=1))
+        start: int = frame + 3 * int(invalid[0])
+        raise KeyError(sequence[start:start + 3])
+
+    if table is None:
+        table = codon_tables()[0]
+    return table[_codon_indices(codes, frame)].tobytes().decode("ascii")
+
+def masked_runs(codes: np.ndarray, offset: int = 0) -> list[tuple[int, int]]:
+    """ (start, end) of every run of n in IUPAC masks, 0-based with the end excluded, shifted by offset """
+    masked: np.ndarray = np.concatenate(([False], codes == MASKED, [False]))
+    edges: np.ndarray = np.flatnonzero(masked[1:] != masked[:-1]) + offset
+    return list(zip(edges[::2].tolist(), edges[1::2].tolist()))
+
+def _extend_runs(runs: list[tuple[int, int]], new_runs: list[tuple[int, int]]) -> None:
+    """ Append the runs of the next part of a sequence, joining a run that continues across the boundary """
+    if runs and new_runs and runs[-1][1] == new_runs[0][0]:
+        runs[-1] = (runs[-1][0], new_runs.pop(0)[1])
+    runs.extend(new_runs)
+
+def _write_masked(masked: TextIO | None, name: str, runs: list[tuple[int, int]]) -> None:
+    """ BED lines (record, start, end) of the runs of n of a record """
+    if masked is not None:
+        masked.writelines(f"{name}\t{start}\t{end}\n" for start, end in runs)
 
 def reverse_complement(sequence: str) -> str:
-    base_pairs: dict[str, str] = {
-        "a": "t",
-        "t": "a",
-        "g": "c",
-        "c": "g"
-    }
+    """ Reverse complement of a sequence of IUPAC codes: ambiguity codes are complemented too (r and y, n and n) """
+    sense_direction: str = sequence.lower()
+    codes: np.ndarray = encode(sense_direction)
+    _check_nucleotides(codes, sense_direction)
+
+    return MASK_LETTERS[COMPLEMENT_MASKS[codes[::-1]]].tobytes().decode("ascii")
+
+def translation_helper(sequence: str, genetic_code: int | str = STANDARD_CODE) -> list[str]:
+    temp: str = sequence.lower()
+    codes: np.ndarray = encode(temp)
+    table: np.ndarray = codon_tables(genetic_code)[0]
+
+    return [_translate_frame(codes, frame, temp, table) for frame in range(3)]
+
+def translate_dna(sequence: str, genetic_code: int | str = STANDARD_CODE) -> dict[str, str]:
+    """
+    Translate the three forward frames (f1-f3) and the three frames of the reverse complement (f4-f6), encoding the sequence once.
+    genetic_code is an NCBI table number or a codons.json-like file, see codon_tables.
+    """
+    return translate_dna_masked(sequence, genetic_code)[0]
+
+def translate_dna_masked(sequence: str, genetic_code: int | str = STANDARD_CODE) -> tuple[dict[str, str], list[tuple[int, int]]]:
+    """ translate_dna plus the (start, end) runs of n in the sequence, found on the same encoded array """
     sense_direction: str = sequence.lower()
-    sense_reverse: str = sense_direction[::-1] # no built-in function to reverse. Use splicing in reverse direction.
-    # print(sense_reverse)
-    sense_reverse_complement: str = ""
-    for letter in sense_reverse:
-        sense_reverse_complement += base_pairs[letter]
-
-    return sense_reverse_complement
-
-def translation_helper(sequence: str) -> list[str]:
-
-    frames: list[str] = []
-    i: int = 0
-    while i < 3:
-        translation: str = ""
-        temp: str = sequence[i:].lower()
-        start: int = 0
-        end: int = start + 3
-        while end <= len(temp):
-            codon = temp[start:end]
-            # print(end)
-            # print(codon)
-            translation += codons[codon]["letter"]
-            start += 3
-            end = start + 3
-
-        frames.append(translation)
-        i += 1
-
-    return frames
-
-def translate_dna(sequence: str) -> dict[str, str]:
-    f1: list[str] = translation_helper(sequence)
-    f2: list[str] = translation_helper(reverse_complement(sequence))
+    codes: np.ndarray = encode(sense_direction)
+    table: np.ndarray = codon_tables(genetic_code)[0]
+    f1: list[str] = [_translate_frame(codes, frame, sense_direction, table) for frame in range(3)]
+
+    _check_nucleotides(codes, sense_direction)
+    reverse_codes: np.ndarray = COMPLEMENT_MASKS[codes[::-1]]
+    f2: list[str] = [_translate_frame(reverse_codes, frame, table=table) for frame in range(3)]
     f1 = f1 + f2
     frames: dict[str, str] = {}
     for i, seq in enumerate(f1):
         frames[f"f{i+1}"] = seq
-    return frames
+    return frames, masked_runs(codes)
+
+def find_orfs(sequence: str, min_length: int = 100, genetic_code: int | str = STANDARD_CODE) -> Iterator[Orf]:
+    """
+    Yield the open reading frames of all six frames with at least min_length amino acids, frame by frame and by position.
+    An ORF runs from the first ATG after an in-frame stop (or the start of the frame) to the next stop codon, so nested
+    ATGs are not reported separately. Ambiguous codons are X in the protein and only end an ORF if every expansion
+    is a stop. Stops come from the genetic code, starts are always ATG. KeyError for letters outside the IUPAC
+    alphabet, like translate_dna.
+    """
+
+    sense_direction: str = sequence.lower()
+    codes: np.ndarray = encode(sense_direction)
+    _check_nucleotides(codes, sense_direction)
+    table: np.ndarray = codon_tables(genetic_code)[0]
+    length: int = len(codes)
+    strands: list[tuple[str, np.ndarray]] = [("+", codes), ("-", COMPLEMENT_MASKS[codes[::-1]])]
+
+    for strand_index, (strand, strand_codes) in enumerate(strands):
+        for frame in range(3):
+            indices: np.ndarray = _codon_indices(strand_codes, frame)
+            stops: np.ndarray = np.flatnonzero(table[indices] == ord("*"))
+            starts: np.ndarray = np.flatnonzero(indices == START_CODON)
+            # The first ATG after the previous stop of the frame, for every stop
+            previous: np.ndarray = np.concatenate(([-1], stops[:-1]))
+            first: np.ndarray = np.searchsorted(starts, previous + 1)
+            found: np.ndarray = first < len(starts)
+            orf_starts: np.ndarray = starts[np.minimum(first, max(len(starts) - 1, 0))] if len(starts) else np.zeros(len(stops), dtype=np.int64)
+            keep: np.ndarray = found & (orf_starts < stops) & (stops - orf_starts >= min_length)
+
+            for start_codon, stop_codon in zip(orf_starts[keep].tolist(), stops[keep].tolist()):
+                protein: str = table[indices[start_codon:stop_codon]].tobytes().decode("ascii")
+                begin: int = frame + 3 * start_codon
+                end: int = frame + 3 * stop_codon + 3
+                if strand == "-":
+                    begin, end = length - end, length - begin
+                yield Orf(f"f{3 * strand_index + frame + 1}", strand, begin, end, stop_codon - start_codon, protein)
+
+def read_fasta_chunks(file_path: str, chunk_size: int = CHUNK_SIZE) -> Iterator[tuple[str, str | None]]:
+    """
+    Stream a plain or gzip FASTA file as (name, None) at the start of every record followed by (name, sequence chunk)
+    pieces of about chunk_size characters. name is the record ID, the first word of the header. Blank lines and
+    anything before the first header are skipped. No line is ever read whole, so memory stays bounded for
+    unwrapped files too.
+
+    primer_designer and python_tools are separate folders of scripts that never import from each other, so
+    primer_designer/composition.read_fasta_chunks is a copy of this reader. Change both together: the unit tests
+    check that they yield the same pieces.
+    """
+
+    with open(file_path, "rb") as file:
+        gzipped: bool = file.read(2) == b"\x1f\x8b"
+    opener = gzip.open if gzipped else open
+
+    with opener(file_path, "rt") as file:
+        name: str | None = None
+        # Sequence lines are joined into chunks of about chunk_size
+        pieces: list[str] = []
+        size: int = 0
+        line_start: bool = True
+        while line := file.readline(chunk_size):
+            if line_start and line.startswith(">"):
+                while not line.endswith("\n") and (rest := file.readline(chunk_size)):
+                    line += rest
+                if pieces:
+                    yield name, "".join(pieces)
+                    pieces, size = [], 0
+                name = next(iter(line[1:].split()), "")
+                yield name, None
+            elif name is not None and (piece := line.strip()):
+                pieces.append(piece)
+                size += len(piece)
+                if size >= chunk_size:
+                    yield name, "".join(pieces)
+                    pieces, size = [], 0
+            line_start = line.endswith("\n")
+
+        if pieces:
+            yield name, "".join(pieces)
+
+class StreamingTranslator():
+    """
+    Six-frame translation of one record fed in chunks, with the same frames as translate_dna.
+
+    The forward frames are translated as their codons complete. The codons of the reverse-complement frames are
+    the forward-strand codons of one of the three phases, read backwards and complemented, but which phase is
+    frame f4, f5 or f6 depends on the record length. All three phases are translated with the reverse codon table
+    into temporary files and the right ones are written out backwards, block by block, once the length is known.
+    """
+
+    def __init__(self, name: str, genetic_code: int | str = STANDARD_CODE) -> None:
+        self.name: str = name
+        self._table, self._reverse_table = codon_tables(genetic_code)
+        self.length: int = 0
+        # The last two nucleotides seen: the start of any codon that the next chunk completes
+        self._tail: str = ""
+        self._forward: list[BinaryIO] = [tempfile.TemporaryFile() for _ in range(3)]
+        self._reverse: list[BinaryIO] = [tempfile.TemporaryFile() for _ in range(3)]
+        # (start, end) runs of n, collected from the same encoded chunks
+        self.masked: list[tuple[int, int]] = []
+
+    def add(self, chunk: str) -> None:
+        """ Translate every codon completed by the next chunk of the sequence; KeyError for letters outside the IUPAC alphabet """
+
+        text: str = self._tail + chunk.lower()
+        codes: np.ndarray = encode(text)
+        text_start: int = self.length - len(self._tail)
+        for phase in range(3):
+            # First codon of this phase that starts inside the text
+            first: int = max(text_start, phase)
+            first += (phase - first) % 3
+            offset: int = first - text_start
+            self._forward[phase].write(_translate_frame(codes[offset:], 0, text[offset:], self._table).encode("ascii"))
+            self._reverse[phase].write(_translate_frame(codes[offset:], 0, text[offset:], self._reverse_table).encode("ascii"))
+
+        _extend_runs(self.masked, masked_runs(codes[len(self._tail):], self.length))
+        self.length += len(chunk)
+        self._tail = text[-2:]
+
+    def write(self, output: TextIO) -> None:
+        """ Write the six frames as FASTA records <name>_f1 to <name>_f6 and close the temporary files """
+
+        for frame, file in enumerate(self._forward):
+            file.seek(0)
+            output.write(f">{self.name}_f{frame + 1}\n")
+            _write_wrapped(output, iter(lambda file=file: file.read(CHUNK_SIZE), b""))
+
+        for frame in range(3):
+            # Frame f4 + frame starts `frame` nucleotides into the reverse complement, i.e. ends `frame` before the forward end
+            file: BinaryIO = self._reverse[(self.length - frame) % 3]
+            output.write(f">{self.name}_f{frame + 4}\n")
+            _write_wrapped(output, _read_backwards(file))
+
+        for file in self._forward + self._reverse:
+            file.close()
+
+def _read_backwards(file: BinaryIO) -> Iterator[bytes]:
+    """ Blocks of a file from its end to its start, each one reversed """
+    position: int = file.seek(0, 2)
+    while position > 0:
+        size: int = min(CHUNK_SIZE, position)
+        position -= size
+        file.seek(position)
+        yield file.read(size)[::-1]
+
+def _write_wrapped(output: TextIO, blocks: Iterator[bytes]) -> None:
+    """ Write residue blocks of any size as lines of LINE_WIDTH """
+    column: int = 0
+    for block in blocks:
+        # Finish the current line, then add a newline to every full line of the rest in one NumPy step
+        head: int = min(LINE_WIDTH - column, len(block)) if column else 0
+        output.write(block[:head].decode("ascii"))
+        column += head
+        if column == LINE_WIDTH:
+            output.write("\n")
+            column = 0
+
+        rest: bytes = block[head:]
+        full: int = len(rest) // LINE_WIDTH * LINE_WIDTH
+        lines: np.ndarray = np.frombuffer(rest[:full], dtype=np.uint8).reshape(-1, LINE_WIDTH)
+        output.write(np.hstack((lines, np.full((len(lines), 1), ord("\n"), dtype=np.uint8))).tobytes().decode("ascii"))
+        output.write(rest[full:].decode("ascii"))
+        column += len(rest) - full
+    if column:
+        output.write("\n")
+
+def translate_fasta(input_path: str, output_path: str, chunk_size: int = CHUNK_SIZE, masked_path: str | None = None,
+                    genetic_code: int | str = STANDARD_CODE) -> int:
+    """
+    Six-frame translation of every record of a plain or gzip FASTA file, streamed to a protein FASTA file.
+    Memory stays flat whatever the genome size. With a masked_path, the runs of n of every record are written
+    there as BED lines. Returns the number of records translated.
+    """
+
+    count: int = 0
+    translator: StreamingTranslator | None = None
+    with open(output_path, "w") as output, (open(masked_path, "w") if masked_path else nullcontext()) as masked:
+        for name, chunk in read_fasta_chunks(input_path, chunk_size):
+            if chunk is None:
+                if translator is not None:
+                    translator.write(output)
+                    _write_masked(masked, translator.name, translator.masked)
+                translator = StreamingTranslator(name, genetic_code)
+                count += 1
+            else:
+                translator.add(chunk)
+        if translator is not None:
+            translator.write(output)
+            _write_masked(masked, translator.name, translator.masked)
+
+    return count
+
+def _translate_segment(text: str, record_length: int, start: int, end: int, genetic_code: int | str = STANDARD_CODE) -> tuple:
+    """
+    Six-frame translation of the codons that start in the segment [start, end) of a record. text holds the segment
+    plus the two nucleotides after it. The forward frames come first; the reverse frames are the complemented codons
+    of the phase that frame f4-f6 uses for this record length, each one reversed. The runs of n of the segment are last.
+    """
+
+    codes: np.ndarray = encode(text)
+    table, reverse_table = codon_tables(genetic_code)
+    forward: list[str] = []
+    reverse: list[str] = []
+    for phase in range(3):
+        offset: int = (phase - start) % 3
+        forward.append(_translate_frame(codes[offset:], 0, text[offset:], table))
+        reverse.append(_translate_frame(codes[offset:], 0, text[offset:], reverse_table)[::-1])
+
+    # Frame f4 + frame ends `frame` nucleotides before the forward end, so it uses phase (length - frame) % 3
+    return tuple(forward) + tuple(reverse[(record_length - frame) % 3] for frame in range(3)) + (masked_runs(codes[:end - start], start),)
+
+def _translate_pieces(buffer_name: str, pieces: list[tuple[int, int, int, int]], genetic_code: int | str = STANDARD_CODE) -> list[tuple]:
+    """ Worker task: attach to a shared buffer of lowercase records and translate (offset, record length, start, end) pieces """
+
+    buffer: SharedMemory = SharedMemory(name=buffer_name)
+    try:
+        results: list[tuple] = []
+        for offset, record_length, start, end in pieces:
+            # Two nucleotides of overlap complete the codons that start at the end of the segment
+            stop: int = min(end + 2, record_length)
+            text: str = bytes(buffer.buf[offset + start:offset + stop]).decode("ascii")
+            results.append(_translate_segment(text, record_length, start, end, genetic_code))
+        return results
+    finally:
+        buffer.close()
+
+class _SharedBatch():
+    """ Records packed into one shared memory buffer and the tasks translating them """
+
+    def __init__(self, records: list[tuple[str, str]], executor: ProcessPoolExecutor, segment_size: int,
+                 genetic_code: int | str = STANDARD_CODE) -> None:
+        self.names: list[str] = [name for name, _ in records]
+        data: bytes = "".join(sequence for _, sequence in records).encode("ascii", "replace")
+        self.buffer: SharedMemory = SharedMemory(create=True, size=max(len(data), 1))
+        self.buffer.buf[:len(data)] = data
+
+        # Every record is cut into segments of segment_size nucleotides (a multiple of 3), small records into one piece
+        segment_size = max(3, segment_size // 3 * 3)
+        self.record_pieces: list[int] = []
+        tasks: list[list[tuple[int, int, int, int]]] = [[]]
+        task_size: int = 0
+        offset: int = 0
+        for _, sequence in records:
+            pieces: list[tuple[int, int, int, int]] = [(offset, len(sequence), start, min(start + segment_size, len(sequence)))
+                                                       for start in range(0, len(sequence), segment_size)] or [(offset, 0, 0, 0)]
+            self.record_pieces.append(len(pieces))
+            for piece in pieces:
+                if task_size >= segment_size:
+                    tasks.append([])
+                    task_size = 0
+                tasks[-1].append(piece)
+                task_size += piece[3] - piece[2]
+            offset += len(sequence)
+
+        self.futures: list[Future] = [executor.submit(_translate_pieces, self.buffer.name, task, genetic_code) for task in tasks]
+
+    def write(self, output: TextIO, masked: TextIO | None = None) -> None:
+        """ Wait for the tasks, write the records (and their runs of n to masked) in order and free the shared buffer """
+
+        try:
+            segments = iter([result for future in self.futures for result in future.result()])
+        finally:
+            self.buffer.close()
+            self.buffer.unlink()
+
+        for name, piece_count in zip(self.names, self.record_pieces):
+            record: list[tuple] = [next(segments) for _ in range(piece_count)]
+            for frame in range(6):
+                # Segments run forwards on the top strand, so the reverse frames are assembled back to front
+                ordered = record if frame < 3 else reversed(record)
+                output.write(f">{name}_f{frame + 1}\n")
+                _write_wrapped(output, (segment[frame].encode("ascii") for segment in ordered))
+            runs: list[tuple[int, int]] = []
+            for segment in record:
+                _extend_runs(runs, segment[6])
+            _write_masked(masked, name, runs)
+
+def translate_fasta_parallel(input_path: str, output_path: str, workers: int | None = None, segment_size: int = SEGMENT_SIZE, masked_path: str | None = None,
+                             genetic_code: int | str = STANDARD_CODE) -> int:
+    """
+    Six-frame translation of a plain or gzip FASTA file across a process pool, with the output of translate_fasta.
+    Records are packed into shared memory buffers of about segment_size nucleotides, so sequences are never pickled,
+    and large records are split into segments that overlap by two nucleotides. Records are written in input order.
+    Every worker compiles the codon table once, when it starts. Returns the number of records translated.
+    """
+
+    workers = workers or os.cpu_count() or 1
+    # An unknown genetic code fails here rather than in the workers
+    codon_tables(genetic_code)
+    count: int = 0
+    with open(output_path, "w") as output, (open(masked_path, "w") if masked_path else nullcontext()) as masked, ProcessPoolExecutor(max_workers=workers, initializer=codon_tables, initargs=(genetic_code,)) as executor:
+        pending: deque[_SharedBatch] = deque()
+        records: list[tuple[str, str]] = []
+        size: int = 0
+        name: str | None = None
+        pieces: list[str] = []
+
+        def submit(records: list[tuple[str, str]]) -> None:
+            pending.append(_SharedBatch(records, executor, segment_size, genetic_code))
+            # At most two batches of tasks per worker in flight
+            while sum(len(batch.futures) for batch in pending) > 2 * workers and len(pending) > 1:
+                pending.popleft().write(output, masked)
+
+        for record, chunk in read_fasta_chunks(input_path):
+            if chunk is not None:
+                pieces.append(chunk.lower())
+                continue
+            if name is not None:
+                records.append((name, "".join(pieces)))
+                size += len(records[-1][1])
+                count += 1
+                if size >= segment_size:
+                    submit(records)
+                    records, size = [], 0
+            name, pieces = record, []
+
+        if name is not None:
+            records.append((name, "".join(pieces)))
+            count += 1
+        if records:
+            submit(records)
+        while pending:
+            pending.popleft().write(output, masked)
+
+    return count
+
+def write_orfs(input_path: str, output_path: str, min_length: int = 100, genetic_code: int | str = STANDARD_CODE) -> int:
+    """ Tab-separated table of the ORFs of every record of a plain or gzip FASTA file. Returns the number of ORFs. """
+
+    def records() -> Iterator[tuple[str, str]]:
+        name: str | None = None
+        pieces: list[str] = []
+        for record, chunk in read_fasta_chunks(input_path):
+            if chunk is None:
+                if name is not None:
+                    yield name, "".join(pieces)
+                name, pieces = record, []
+            else:
+                pieces.append(chunk)
+        if name is not None:
+            yield name, "".join(pieces)
+
+    count: int = 0
+    with open(output_path, "w") as output:
+        output.write("record\tframe\tstrand\tstart\tend\tlength\tprotein\n")
+        for name, sequence in records():
+            for orf in find_orfs(sequence, min_length, genetic_code):
+                output.write(f"{name}\t{orf.frame}\t{orf.strand}\t{orf.start + 1}\t{orf.end}\t{orf.length}\t{orf.protein}\n")
+                count += 1
+
+    return count
 
 def write_json(object: dict) -> None:
     with open("codons.json", 'w') as file:
@@ -386,6 +564,31 @@ def write_json(object: dict) -> None:
     return
 
 def main() -> None:
+    parser = ArgumentParser(description="Translate DNA in all six reading frames")
+    parser.add_argument("-i", "--input", help="FASTA file to translate, plain or gzip", type=str)
+    parser.add_argument("-o", "--output", help="Protein FASTA output file", type=str, default="translated.fasta")
+    parser.add_argument("-c", "--chunk-size", help="Nucleotides read at a time", type=int, default=CHUNK_SIZE)
+    parser.add_argument("-w", "--workers", help="Translate across this many processes", type=int, default=1)
+    parser.add_argument("-n", "--masked", help="Also write the runs of n of every record to this BED file", type=str)
+    parser.add_argument("-g", "--genetic-code", help="NCBI translation table number (1 standard, 2 vertebrate mitochondrial, ...) or a codons.json-like file", type=str, default=str(STANDARD_CODE))
+    parser.add_argument("-m", "--min-orf-length", help="Write a table of the ORFs with at least this many amino acids instead of translating", type=int)
+
+    args: Namespace = parser.parse_args()
+    if args.genetic_code.isdigit():
+        args.genetic_code = int(args.genetic_code)
+    if args.input and args.min_orf_length is not None:
+        count: int = write_orfs(args.input, args.output, args.min_orf_length, args.genetic_code)
+        print(f"Found {count} ORFs, written to {args.output}")
+        return
+    if args.input and args.workers > 1:
+        count: int = translate_fasta_parallel(args.input, args.output, args.workers, masked_path=args.masked, genetic_code=args.genetic_code)
+        print(f"Translated {count} records to {args.output} with {args.workers} workers")
+        return
+    if args.input:
+        count: int = translate_fasta(args.input, args.output, args.chunk_size, args.masked, args.genetic_code)
+        print(f"Translated {count} records to {args.output}")
+        return
+
     # temp: str = "ATCATCGATCGATCGTCTAGCTAGCTAGCTGCTAGCT"
     temp: str = "ctttccacattcccacaagcctcccctatgcacaaccaggggggttggttcagtgcaagg"
     translated: str = translate_dna(temp)
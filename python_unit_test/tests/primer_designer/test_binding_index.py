@@ -0,0 +1,105 @@
+import os
+import random
+import sys
+import unittest
+
+# primer_designer is a folder of scripts with sibling imports, so it goes on the path as it is
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.insert(0, os.path.join(REPOSITORY, "primer_designer"))
+
+from binding_index import BindingIndex, BindingSite
+
+COMPLEMENTS = str.maketrans("acgt", "tgca")
+
+def count_mismatches(query, window):
+    """ Letters other than a/c/g/t never match, not even the same letter """
+    return sum(a != b or a not in "acgt" or b not in "acgt" for a, b in zip(query, window))
+
+def brute_force_sites(template, query, mismatches, circular, overhang):
+    """ Every window of the top strand where the query or its reverse complement binds """
+    length = len(template)
+    extended = template + template[:overhang] if circular else template
+    starts = range(length) if circular else range(length - len(query) + 1)
+    reverse_complement = query.translate(COMPLEMENTS)[::-1]
+
+    sites = []
+    for start in starts:
+        window = extended[start:start + len(query)]
+        if len(window) < len(query):
+            continue
+        for strand, sequence in (("+", query), ("-", reverse_complement)):
+            count = count_mismatches(sequence, window)
+            if count <= mismatches:
+                sites.append(BindingSite(strand, start, start + len(query), count))
+
+    return sorted(sites)
+
+def random_queries(template, count, generator):
+    """ Windows of both strands with a few point mutations, and random sequences """
+    queries = []
+    for _ in range(count):
+        length = generator.randint(4, 20)
+        start = generator.randint(0, len(template) - length)
+        query = list(template[start:start + length])
+        for _ in range(generator.randint(0, 3)):
+            query[generator.randrange(length)] = generator.choice("acgtn")
+        query = "".join(query)
+        if generator.random() < 0.5:
+            query = query.translate(COMPLEMENTS)[::-1]
+        queries.append(query)
+    queries += ["".join(generator.choices("acgt", k=generator.randint(3, 12))) for _ in range(count // 4)]
+
+    return queries
+
+class TestBindingIndex(unittest.TestCase):
+
+    def setUp(self):
+        generator = random.Random(0)
+        # Low complexity stretches give many sites per primer
+        self.template = "".join(generator.choices("acgt", k=300)) + "atatatatatgcgcgcn" + "".join(generator.choices("acgtn", k=150))
+        self.queries = random_queries(self.template, 60, generator)
+
+    def check(self, index, mismatches, three_prime=None):
+        found = index.search(self.queries, mismatches, three_prime)
+        for query, sites in zip(self.queries, found):
+            core = query[-three_prime:] if three_prime else query
+            expected = brute_force_sites(self.template, core, mismatches, index.circular, index.overhang)
+            self.assertEqual(sites, expected, (query, mismatches, three_prime))
+            self.assertEqual(index.sites(query, mismatches, three_prime), expected)
+
+    def test_linear_template(self):
+        index = BindingIndex(self.template)
+        for mismatches in range(4):
+            self.check(index, mismatches)
+            self.check(index, mismatches, three_prime=8)
+
+    def test_circular_template(self):
+        index = BindingIndex(self.template, circular=True, overhang=30)
+        for mismatches in range(4):
+            self.check(index, mismatches)
+            self.check(index, mismatches, three_prime=12)
+
+    def test_site_across_the_origin(self):
+        template = "".join(random.Random(2).choices("acgt", k=200))
+        primer = template[-7:] + template[:9]
+        index = BindingIndex(template, circular=True)
+        self.assertIn(BindingSite("+", 193, 209, 0), index.sites(primer))
+        reverse_sites = index.sites(primer.translate(COMPLEMENTS)[::-1])
+        self.assertIn(BindingSite("-", 193, 209, 0), reverse_sites)
+        self.assertTrue(all(site.end > len(template) for site in reverse_sites if site.start == 193))
+        # The linear template has no site across the origin
+        self.assertNotIn(193, [site.start for site in BindingIndex(template).sites(primer)])
+
+    def test_overhang_limits(self):
+        index = BindingIndex(self.template, circular=True, overhang=10)
+        with self.assertRaises(ValueError):
+            index.sites("acgtacgtacgt")
+        with self.assertRaises(ValueError):
+            index.sites("acgtacgtacgt", three_prime=12)
+        index.sites("acgtacgtacgt", three_prime=11)
+        index.sites("acgtacgtacg")
+        # Linear templates have no overhang to outgrow
+        BindingIndex(self.template, overhang=10).sites("acgtacgtacgt")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import gzip
+import os
+import random
+import sys
+import tempfile
+import unittest
+from collections import Counter
+
+# primer_designer is a folder of scripts with sibling imports, so it goes on the path as it is
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.insert(0, os.path.join(REPOSITORY, "primer_designer"))
+sys.path.insert(0, os.path.join(REPOSITORY, "python_tools"))
+
+import dna_translate
+from composition import Composition, codon_usage, fasta_composition, kmer_counts, kmer_names, read_fasta, read_fasta_chunks, sequence_composition
+
+def brute_force_counts(sequence, k, step=1):
+    """ {k-mer: count} of the windows starting at multiples of step that hold only a/c/g/t """
+    sequence = sequence.lower()
+    windows = (sequence[start:start + k] for start in range(0, len(sequence) - k + 1, step))
+    return Counter(window for window in windows if all(letter in "acgt" for letter in window))
+
+def as_table(counts, k):
+    return {name: int(count) for name, count in zip(kmer_names(k), counts) if count}
+
+def random_sequence(generator, length):
+    return "".join(generator.choices("acgtACGT" * 4 + "nrN-", k=length))
+
+class TestComposition(unittest.TestCase):
+
+    def setUp(self):
+        generator = random.Random(0)
+        self.sequences = [random_sequence(generator, length) for length in (0, 1, 2, 3, 5, 17, 250, 2000)]
+        self.generator = generator
+
+    def test_whole_sequence_matches_brute_force(self):
+        for sequence in self.sequences:
+            for k in (1, 2, 3, 5, 8):
+                self.assertEqual(as_table(kmer_counts(sequence, k), k), brute_force_counts(sequence, k), (sequence, k))
+            for frame in range(3):
+                self.assertEqual(as_table(codon_usage(sequence, frame), 3), brute_force_counts(sequence[frame:], 3, 3), (sequence, frame))
+
+    def test_chunks_match_whole_sequence(self):
+        for sequence in self.sequences:
+            for k in (1, 2, 4, 7):
+                whole = sequence_composition(sequence, k)
+                for chunk_size in (1, 2, 3, 5, 64):
+                    composition = Composition("chunked", k)
+                    # Random chunk sizes put the boundaries at every codon phase
+                    start = 0
+                    while start < len(sequence):
+                        end = start + self.generator.randint(1, chunk_size)
+                        composition.add(sequence[start:end])
+                        start = end
+                    self.assertEqual(composition.length, len(sequence))
+                    for counts in ("nucleotides", "dinucleotides", "codons", "kmers"):
+                        self.assertEqual(getattr(composition, counts).tolist(), getattr(whole, counts).tolist(), (sequence, k, chunk_size, counts))
+                self.assertEqual(whole.kmer_table(), brute_force_counts(sequence, k))
+                self.assertEqual(as_table(whole.codons, 3), brute_force_counts(sequence, 3, 3))
+                self.assertEqual(as_table(whole.dinucleotides, 2), brute_force_counts(sequence, 2))
+
+    def test_k_limits(self):
+        for k in (0, 13):
+            with self.assertRaises(ValueError):
+                Composition(k=k)
+            with self.assertRaises(ValueError):
+                kmer_counts("acgt", k)
+
+class TestReadFasta(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        generator = random.Random(1)
+        self.records = [(f"record{index}", random_sequence(generator, length)) for index, length in enumerate((0, 7, 60, 61, 500, 3000))]
+        self.path = os.path.join(self.directory.name, "input.fasta")
+        with open(self.path, "w") as file:
+            # Sequence before the first header and blank lines are skipped
+            file.write("acgt\n\n")
+            for name, sequence in self.records:
+                file.write(f">{name} description\n")
+                for start in range(0, len(sequence), 60):
+                    file.write(sequence[start:start + 60] + "\n\n")
+        self.gzip_path = self.path + ".gz"
+        with open(self.path, "rb") as source, gzip.open(self.gzip_path, "wb") as target:
+            target.write(source.read())
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_records(self):
+        for path in (self.path, self.gzip_path):
+            self.assertEqual(list(read_fasta(path)), self.records)
+
+    def test_chunks_match_python_tools_reader(self):
+        for path in (self.path, self.gzip_path):
+            for chunk_size in (1, 7, 64, 1 << 20):
+                chunks = list(read_fasta_chunks(path, chunk_size))
+                self.assertEqual(chunks, list(dna_translate.read_fasta_chunks(path, chunk_size)), chunk_size)
+                self.assertTrue(all(chunk for _, chunk in chunks if chunk is not None))
+
+    def test_fasta_composition_matches_whole_records(self):
+        for chunk_size in (1, 7, 64, 1 << 20):
+            compositions = list(fasta_composition(self.gzip_path, 5, chunk_size))
+            self.assertEqual([composition.name for composition in compositions], [name for name, _ in self.records])
+            for composition, (_, sequence) in zip(compositions, self.records):
+                whole = sequence_composition(sequence, 5)
+                self.assertEqual(composition.kmers.tolist(), whole.kmers.tolist(), chunk_size)
+                self.assertEqual(composition.codons.tolist(), whole.codons.tolist(), chunk_size)
+                self.assertEqual(composition.nucleotides.tolist(), whole.nucleotides.tolist(), chunk_size)
+
+if __name__ == "__main__":
+    unittest.main()
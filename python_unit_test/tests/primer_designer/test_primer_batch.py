@@ -0,0 +1,54 @@
+import os
+import random
+import sys
+import unittest
+
+# primer_designer is a folder of scripts with sibling imports, so it goes on the path as it is
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.insert(0, os.path.join(REPOSITORY, "primer_designer"))
+
+from primer_batch import PrimerBatch
+from primer_class import Primer
+
+class TestPrimerBatch(unittest.TestCase):
+
+    def setUp(self):
+        generator = random.Random(0)
+        self.sequences = ["".join(generator.choices(generator.choice(["acgt", "acgtn", "gc", "a"]), k=generator.randint(1, 80)))
+                          for _ in range(500)]
+        self.orientations = [generator.choice(["forward", "reverse"]) for _ in self.sequences]
+        self.batch = PrimerBatch(range(len(self.sequences)), self.sequences, self.orientations)
+
+    def test_matches_scalar_primer(self):
+        gc_percentage = self.batch.gc_percentage
+        melting_temperature = self.batch.melting_temperature
+        homopolymer = self.batch.homopolymer_check()
+        last_nucleotide = self.batch.last_nucleotide_check()
+        qc = self.batch.primer_qc_check()
+        for index, sequence in enumerate(self.sequences):
+            primer = Primer(index, sequence, self.orientations[index])
+            self.assertEqual(gc_percentage[index], primer.gc_percentage, sequence)
+            self.assertEqual(melting_temperature[index], primer.melting_temperature, sequence)
+            self.assertEqual(homopolymer[index], primer.homopolymer_check(), sequence)
+            self.assertEqual(last_nucleotide[index], primer.last_nucleotide_check(), sequence)
+            self.assertEqual(qc[index], primer.primer_qc_check(), sequence)
+
+    def test_round_trip(self):
+        self.assertEqual(self.batch.sequences, self.sequences)
+        self.assertEqual(self.batch.orientations, self.orientations)
+        self.assertEqual(PrimerBatch.from_primers(self.batch).sequences, self.sequences)
+
+    def test_rejects_empty_sequences(self):
+        with self.assertRaises(IndexError):
+            Primer("x", "").last_nucleotide_check()
+        with self.assertRaises(ValueError):
+            PrimerBatch(["x", "y"], ["acgt", ""])
+
+    def test_rejects_mismatched_orientations(self):
+        with self.assertRaises(ValueError):
+            PrimerBatch(["x", "y"], ["acgt", "gcta"], ["forward"])
+        with self.assertRaises(ValueError):
+            PrimerBatch(["x"], ["acgt", "gcta"])
+
+if __name__ == "__main__":
+    unittest.main()
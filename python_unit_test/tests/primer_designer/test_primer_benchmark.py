@@ -0,0 +1,38 @@
+import contextlib
+import io
+import os
+import sys
+import unittest
+
+# primer_designer is a folder of scripts with sibling imports, so it goes on the path as it is
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.insert(0, os.path.join(REPOSITORY, "primer_designer"))
+
+from primer_benchmark import BATCH_METHODS, METHODS, compare_to_baseline, run_benchmarks
+
+def entry(per_call_us, reference_us, kind="primer", method="hairpin_check"):
+    return {"kind": kind, "method": method, "length": 20, "batch_size": 100, "per_call_us": per_call_us, "relative": per_call_us / reference_us}
+
+class TestPrimerBenchmark(unittest.TestCase):
+
+    def test_every_method_runs(self):
+        with contextlib.redirect_stderr(io.StringIO()):
+            results = run_benchmarks(list(METHODS), list(BATCH_METHODS), [10, 70], [1, 3], repeats=1, reference_us=2.0)
+        self.assertEqual(len(results), 2 * 2 * (len(METHODS) + len(BATCH_METHODS)))
+        for result in results:
+            self.assertEqual(result["relative"], result["per_call_us"] / 2.0)
+            self.assertGreater(result["peak_memory_bytes"], 0)
+
+    def test_regressions_are_relative_to_the_reference(self):
+        baseline = {"results": [entry(10.0, 100.0), entry(10.0, 100.0, kind="batch")]}
+        # Twice the time on a machine twice as slow is not a regression
+        self.assertEqual(compare_to_baseline([entry(20.0, 200.0)], baseline), [])
+        regressions = compare_to_baseline([entry(20.0, 100.0), entry(11.0, 100.0, kind="batch")], baseline)
+        self.assertEqual([(current["kind"], round(ratio, 2)) for current, _, ratio in regressions], [("primer", 2.0)])
+
+    def test_noise_floor_and_unknown_entries(self):
+        baseline = {"results": [entry(0.1, 100.0)]}
+        self.assertEqual(compare_to_baseline([entry(0.5, 100.0), entry(50.0, 100.0, method="primer_qc_check")], baseline), [])
+
+if __name__ == "__main__":
+    unittest.main()
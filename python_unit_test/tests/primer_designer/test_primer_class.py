@@ -0,0 +1,40 @@
+import os
+import random
+import sys
+import unittest
+
+# primer_designer is a folder of scripts with sibling imports, so it goes on the path as it is
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.insert(0, os.path.join(REPOSITORY, "primer_designer"))
+
+from primer_class import Primer, disable_metric_cache, enable_metric_cache, melting_temperature_calc, sequence_metric
+
+class TestMetricCache(unittest.TestCase):
+
+    def setUp(self):
+        generator = random.Random(0)
+        self.sequences = ["".join(generator.choices("acgt", k=generator.randint(5, 40))) for _ in range(200)]
+
+    def tearDown(self):
+        disable_metric_cache()
+
+    def test_melting_temperature_reuses_gc_count(self):
+        primer = Primer("x", "tgaggccgccatccacgc")
+        primer.melting_temperature
+        self.assertIn("gc_count", primer._metrics)
+        self.assertEqual(primer.melting_temperature, melting_temperature_calc(13, 18))
+
+        primer.sequence = "aaaaaaaaaaaaaaaaaa"
+        self.assertEqual(primer.gc_count, 0)
+        self.assertEqual(primer.melting_temperature, melting_temperature_calc(0, 18))
+
+    def test_shared_cache_gives_the_same_metrics(self):
+        metrics = ["gc_count", "melting_temperature", "melting_temperature_nn", "homopolymer", "hairpin"]
+        expected = [[sequence_metric(sequence, metric) for metric in metrics] for sequence in self.sequences]
+        enable_metric_cache()
+        for _ in range(2):
+            self.assertEqual([[sequence_metric(sequence, metric) for metric in metrics] for sequence in self.sequences], expected)
+        self.assertEqual([Primer("x", sequence).melting_temperature for sequence in self.sequences], [row[1] for row in expected])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,170 @@
+import contextlib
+import io
+import math
+import os
+import random
+import sys
+import unittest
+
+# primer_designer is a folder of scripts with sibling imports, so it goes on the path as it is
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.insert(0, os.path.join(REPOSITORY, "primer_designer"))
+
+from primer_batch import PrimerBatch
+from primer_class import Primer
+from rca_time_predictor import count_nt
+
+# The original implementations, kept here to check the optimised ones against
+
+BASE_PAIRS = {"a": "t", "t": "a", "g": "c", "c": "g"}
+
+def old_hairpin_check(sequence):
+    length = len(sequence)
+    max_hairpin = 0
+    for index, _ in enumerate(sequence):
+        i = index
+        j = len(sequence)-1
+        hairpin_length = 0
+
+        while j > i:
+            x = sequence[i]
+            y = sequence[j]
+            if BASE_PAIRS[x] == y:
+                hairpin_length += 1
+                i += 1
+
+            elif BASE_PAIRS[x] != y and hairpin_length != 0:
+                if max_hairpin < hairpin_length:
+                    max_hairpin = hairpin_length
+
+                hairpin_length = 0
+
+            if max_hairpin < hairpin_length:
+                max_hairpin = hairpin_length
+
+            j -= 1
+
+    hairpin_percentage = (2 * max_hairpin) / length * 100
+
+    return round(hairpin_percentage, 2)
+
+def old_primer_dimer_check(sequence):
+    dimer_array = [[[sense_letter, letter] for sense_letter in sequence] for letter in sequence[::-1]]
+
+    current_row = len(dimer_array) - 1
+    current_column = 0
+    row_increment = 0
+    column_increment = 0
+    dimer_length = 0
+    overlap_length = 0
+    max_dimer = 0
+    max_dimer_overlap = 0
+    switch = False
+    while current_row >= 0 and current_column < len(dimer_array[0]):
+
+        while current_row + row_increment < len(dimer_array) and current_column + column_increment < len(dimer_array[0]):
+            if dimer_array[current_row + row_increment][current_column + column_increment][0] == BASE_PAIRS[dimer_array[current_row + row_increment][current_column + column_increment][1]]:
+                dimer_length += 1
+
+            overlap_length += 1
+            row_increment += 1
+            column_increment += 1
+
+        if max_dimer < dimer_length:
+            max_dimer = dimer_length
+            max_dimer_overlap = overlap_length
+
+        if switch:
+            current_column += 1
+        else:
+            current_row -= 1
+
+        row_increment = 0
+        column_increment = 0
+        dimer_length = 0
+        overlap_length = 0
+
+        if current_row == 0:
+            switch = True
+
+    return round((max_dimer/max_dimer_overlap*100), 2)
+
+def old_count_nt(sequence):
+    nt_count = {
+        "A": 0,
+        "T": 0,
+        "G": 0,
+        "C": 0
+    }
+
+    for nt in sequence:
+        try:
+            nt_count[nt.upper()] += 1
+            nt_count[BASE_PAIRS[nt.lower()].upper()] += 1
+        except KeyError:
+            print("Invalid nucleotide in sequence")
+
+    return nt_count
+
+def random_primers(count, seed=0):
+    generator = random.Random(seed)
+    primers = []
+    for _ in range(count):
+        # Short alphabets give long stems and dimers as well as primers with no base pair at all
+        alphabet = generator.choice(["acgt", "acgt", "at", "gc", "ag", "a"])
+        primers.append("".join(generator.choices(alphabet, k=generator.randint(1, 70))))
+
+    return primers
+
+class TestStructureChecks(unittest.TestCase):
+
+    def setUp(self):
+        self.sequences = random_primers(1500)
+
+    def test_hairpin_check(self):
+        batch = PrimerBatch(range(len(self.sequences)), self.sequences).hairpin_check()
+        for sequence, batch_value in zip(self.sequences, batch):
+            expected = old_hairpin_check(sequence)
+            self.assertEqual(Primer("x", sequence).hairpin_check(), expected, sequence)
+            self.assertEqual(batch_value, expected, sequence)
+
+    def test_primer_dimer_check(self):
+        batch = PrimerBatch(range(len(self.sequences)), self.sequences).primer_dimer_check()
+        for sequence, batch_value in zip(self.sequences, batch):
+            try:
+                expected = old_primer_dimer_check(sequence)
+            except ZeroDivisionError:
+                # No base pair at any offset: the scalar check still raises and the batch gives NaN
+                with self.assertRaises(ZeroDivisionError):
+                    Primer("x", sequence).primer_dimer_check()
+                self.assertTrue(math.isnan(batch_value), sequence)
+                continue
+            self.assertEqual(Primer("x", sequence).primer_dimer_check(), expected, sequence)
+            self.assertEqual(batch_value, expected, sequence)
+
+    def test_ambiguous_bases_never_pair(self):
+        primer = Primer("x", "n" * 20)
+        self.assertEqual(primer.hairpin_check(), 0.0)
+        with self.assertRaises(ZeroDivisionError):
+            primer.primer_dimer_check()
+
+class TestCountNt(unittest.TestCase):
+
+    def test_count_nt(self):
+        generator = random.Random(1)
+        for _ in range(300):
+            sequence = "".join(generator.choices("acgtACGTnN-", k=generator.randint(0, 300)))
+            with contextlib.redirect_stdout(io.StringIO()) as old_output:
+                expected = old_count_nt(sequence)
+            with contextlib.redirect_stdout(io.StringIO()) as new_output, contextlib.redirect_stderr(io.StringIO()) as warning:
+                counts = count_nt(sequence)
+            self.assertEqual(counts, expected, sequence)
+            # One warning with the number of invalid letters instead of a line per letter
+            invalid = old_output.getvalue().count("\n")
+            self.assertEqual(new_output.getvalue(), "")
+            self.assertEqual(warning.getvalue().count("\n"), 1 if invalid else 0, sequence)
+            if invalid:
+                self.assertTrue(warning.getvalue().startswith(f"{invalid} invalid nucleotide"), sequence)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import math
+import os
+import random
+import sys
+import unittest
+import numpy as np
+
+# primer_designer is a folder of scripts with sibling imports, so it goes on the path as it is
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.insert(0, os.path.join(REPOSITORY, "primer_designer"))
+
+from primer_class import Primer, dimer_alignment, dimer_percentage_calc
+from primer_pool import PRUNED, cross_dimer, cross_dimer_matrix, pool_entry
+
+def brute_force_dimer(sequence, partner):
+    max_dimer, max_dimer_overlap = dimer_alignment(sequence, partner)
+    if max_dimer == 0:
+        return math.nan
+    return dimer_percentage_calc(max_dimer, max_dimer_overlap)
+
+def random_pool(count, seed=0):
+    generator = random.Random(seed)
+    # Short alphabets give strong dimers as well as pairs with no base pair at all
+    return ["".join(generator.choices(generator.choice(["acgt", "acgt", "at", "gc", "ag", "a"]), k=generator.randint(1, 40)))
+            for _ in range(count)]
+
+class TestCrossDimer(unittest.TestCase):
+
+    def setUp(self):
+        self.sequences = random_pool(120)
+        self.entries = [pool_entry(sequence) for sequence in self.sequences]
+
+    def test_unpruned_matches_brute_force(self):
+        for sequence, entry in zip(self.sequences, self.entries):
+            for partner, partner_entry in zip(self.sequences, self.entries):
+                expected = brute_force_dimer(sequence, partner)
+                value = cross_dimer(entry, partner_entry)
+                if math.isnan(expected):
+                    self.assertTrue(math.isnan(value), (sequence, partner))
+                else:
+                    self.assertEqual(value, expected, (sequence, partner))
+
+    def test_pruning_keeps_every_value_above_threshold(self):
+        for threshold in (20, 50, 75, 100):
+            above = 0
+            for sequence, entry in zip(self.sequences, self.entries):
+                for partner, partner_entry in zip(self.sequences, self.entries):
+                    expected = brute_force_dimer(sequence, partner)
+                    value = cross_dimer(entry, partner_entry, threshold)
+                    if math.isnan(expected):
+                        self.assertTrue(math.isnan(value), (sequence, partner, threshold))
+                    elif expected > threshold:
+                        above += 1
+                        self.assertEqual(value, expected, (sequence, partner, threshold))
+                    else:
+                        self.assertIn(value, (PRUNED, expected), (sequence, partner, threshold))
+            if threshold < 100:
+                self.assertGreater(above, 0, threshold)
+
+    def test_parallel_matrix_matches_serial(self):
+        primers = [Primer(f"P{index}", sequence) for index, sequence in enumerate(self.sequences[:40])]
+        for threshold in (None, 50):
+            serial = cross_dimer_matrix(primers, threshold)
+            parallel = cross_dimer_matrix(primers, threshold, workers=2)
+            np.testing.assert_array_equal(parallel, serial)
+            np.testing.assert_array_equal(serial, serial.T)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import os
+import random
+import sys
+import unittest
+
+# primer_designer is a folder of scripts with sibling imports, so it goes on the path as it is
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.insert(0, os.path.join(REPOSITORY, "primer_designer"))
+
+from primer_class import SCORING_ERRORS, Primer
+from primer_scanner import scan_template
+from primer_score import variables_access
+
+VARIABLES = variables_access(os.path.join(REPOSITORY, "primer_designer", "variables.json"))
+
+def passes(primer, variables):
+    """ The checks of scan_template, one scalar Primer at a time """
+    try:
+        return (primer.primer_qc_check()
+                and int(primer.gc_percentage) in range(variables["gcPercentLow"], variables["gcPercentHigh"])
+                and primer.last_nucleotide_check()
+                and int(primer.melting_temperature) in range(variables["meltingTempLow"], variables["meltingTempHigh"])
+                and primer.homopolymer_check() < variables["homoPolymerLength"]
+                and primer.hairpin_check() <= variables["hairpinPercentage"]
+                and primer.primer_dimer_check() <= variables["primerDimerPercentage"])
+    except SCORING_ERRORS:
+        return False
+
+def brute_force_scan(template, variables, min_length, max_length):
+    found = []
+    for length in range(max(min_length, variables["primerLengthLow"]), min(max_length, variables["primerLengthHigh"] - 1) + 1):
+        for orientation in ("forward", "reverse"):
+            for start in range(len(template) - length + 1):
+                primer = Primer(f"{orientation}_{start + 1}_{length}", template[start:start + length], orientation)
+                if orientation == "reverse":
+                    primer.sequence = primer.reverse_complement()
+                if passes(primer, variables):
+                    found.append((primer.name, start, orientation, primer.sequence, primer.melting_temperature))
+
+    return found
+
+class TestScanTemplate(unittest.TestCase):
+
+    def test_matches_brute_force(self):
+        generator = random.Random(0)
+        for seed in range(8):
+            alphabet = ["acgt", "acgtn", "aattggcc", "gcgcat"][seed % 4]
+            template = "".join(generator.choices(alphabet, k=generator.randint(50, 400)))
+            # Low thresholds make the hairpin and dimer checks reject many windows
+            variables = dict(VARIABLES, hairpinPercentage=generator.choice([20, 40, 60]), primerDimerPercentage=generator.choice([40, 60, 75]))
+            expected = brute_force_scan(template, variables, 10, 30)
+            found = [tuple(candidate) for candidate in scan_template(template, variables, 10, 30)]
+            self.assertEqual(sorted(found), sorted(expected), (template, variables))
+
+    def test_structure_checks_off(self):
+        template = "".join(random.Random(1).choices("acgt", k=500))
+        variables = dict(VARIABLES, hairpinPercentage=100, primerDimerPercentage=100)
+        self.assertEqual(list(scan_template(template, variables, structure_checks=False)), list(scan_template(template, variables)))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+import contextlib
+import csv
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import unittest
+import unittest.mock
+
+# primer_designer is a folder of scripts with sibling imports, so it goes on the path as it is
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.insert(0, os.path.join(REPOSITORY, "primer_designer"))
+
+from primer_class import SCORING_ERRORS, Primer
+import primer_score
+from primer_score import primer_score_batch, primer_score_calc, rank_primers, variables_access
+
+VARIABLES_PATH = os.path.join(REPOSITORY, "primer_designer", "variables.json")
+
+def random_rows(count, seed=0):
+    generator = random.Random(seed)
+    rows = []
+    for index in range(count):
+        # Ambiguous letters, repeats and single letters give every kind of unscorable primer as well
+        alphabet = generator.choice(["acgt", "acgt", "acgtn", "gc", "a"])
+        sequence = "".join(generator.choices(alphabet, k=generator.randint(1, 35)))
+        rows.append((f"P{index}", sequence.upper() if index % 7 == 0 else sequence, generator.choice(["forward", "reverse"])))
+
+    return rows
+
+def expected_score(sequence, variables):
+    try:
+        return primer_score_calc(Primer("x", sequence), variables)
+    except SCORING_ERRORS:
+        return None
+
+class TestPrimerScoreBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.rows = random_rows(2000)
+        self.input_path = self.path("primers.csv")
+        with open(self.input_path, "w", newline="") as file:
+            csv.writer(file).writerows([("name", "sequence", "orientation"), *self.rows])
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def score(self, name, **options):
+        output_path = self.path(name)
+        count, _ = primer_score_batch(self.input_path, output_path, VARIABLES_PATH, chunk_size=150, **options)
+        self.assertEqual(count, len(self.rows))
+        with open(output_path, "r") as file:
+            return file.read()
+
+    def test_serial_scores_in_input_order(self):
+        variables = variables_access(VARIABLES_PATH)
+        self.score("serial.csv")
+        with open(self.path("serial.csv"), "r", newline="") as file:
+            results = list(csv.DictReader(file))
+
+        self.assertEqual([(result["name"], result["orientation"]) for result in results], [(name, orientation) for name, _, orientation in self.rows])
+        for result, (_, sequence, _) in zip(results, self.rows):
+            self.assertEqual(result["sequence"], sequence.lower())
+            score = expected_score(sequence, variables)
+            self.assertEqual(result["score"], "" if score is None else str(score), sequence)
+
+    def test_workers_match_serial(self):
+        for output_format in ("csv", "jsonl"):
+            serial = self.score(f"serial.{output_format}", output_format=output_format)
+            self.assertEqual(self.score(f"parallel.{output_format}", workers=3, output_format=output_format), serial)
+
+        names = [json.loads(line)["name"] for line in serial.splitlines()]
+        self.assertEqual(names, [name for name, _, _ in self.rows])
+
+    def test_cache_matches_serial(self):
+        serial = self.score("serial.csv")
+        cache_path = self.path("cache.sqlite3")
+        # A cold cache, the same cache warm, and the warm cache with workers
+        self.assertEqual(self.score("cold.csv", cache_path=cache_path), serial)
+        self.assertEqual(self.score("warm.csv", cache_path=cache_path), serial)
+        self.assertEqual(self.score("warm_parallel.csv", cache_path=cache_path, workers=2), serial)
+        self.assertEqual(self.score("cold_parallel.csv", cache_path=self.path("other.sqlite3"), workers=2), serial)
+
+class TestRankPrimers(unittest.TestCase):
+
+    def setUp(self):
+        self.variables = variables_access(VARIABLES_PATH)
+        self.primers = [Primer(name, sequence, orientation) for name, sequence, orientation in random_rows(1500, seed=1)]
+        # Every scorable primer by score, ties in input order
+        scored = [(expected_score(primer.sequence, self.variables), index) for index, primer in enumerate(self.primers)]
+        self.full_sort = sorted([entry for entry in scored if entry[0] is not None], key=lambda entry: -entry[0])
+
+    def ranked(self, top_k=None, cutoff=None):
+        fresh = [Primer(primer.name, primer.sequence, primer.orientation) for primer in self.primers]
+        indices = {id(primer): index for index, primer in enumerate(fresh)}
+        return [(score, indices[id(primer)]) for score, primer in rank_primers(fresh, self.variables, top_k, cutoff)]
+
+    def test_full_ranking(self):
+        self.assertEqual(self.ranked(), self.full_sort)
+
+    def test_top_k_and_cutoff_match_a_full_sort(self):
+        scores = sorted({score for score, _ in self.full_sort})
+        # Scores are small integers, so every cut below falls inside a run of ties
+        for top_k in (0, 1, 7, 100, 450, len(self.full_sort), len(self.full_sort) + 5):
+            self.assertEqual(self.ranked(top_k=top_k), self.full_sort[:top_k], top_k)
+            for cutoff in scores + [scores[-1] + 1]:
+                expected = [entry for entry in self.full_sort if entry[0] >= cutoff][:top_k]
+                self.assertEqual(self.ranked(top_k=top_k, cutoff=cutoff), expected, (top_k, cutoff))
+
+    def test_ranking_rejects_batch_options(self):
+        for options in (["-w", "2"], ["-c", "10"], ["-C", "cache.sqlite3"]):
+            arguments = ["primer_score.py", "-i", "primers.csv", "-o", "ranked.csv", "-k", "5", *options]
+            with unittest.mock.patch("sys.argv", arguments), contextlib.redirect_stderr(io.StringIO()):
+                with self.assertRaises(SystemExit) as raised:
+                    primer_score.main()
+            self.assertEqual(raised.exception.code, 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,152 @@
+import contextlib
+import io
+import itertools
+import os
+import random
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+# primer_designer is a folder of scripts with sibling imports, so it goes on the path as it is
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.insert(0, os.path.join(REPOSITORY, "primer_designer"))
+
+from rca_time_predictor import (count_nt, dna_mass_to_moles, molar_to_molecule, ntp_molecule_count, rca_batch, rca_cycle_count, rca_minutes,
+                                rca_sweep, rca_time, simulate_rca, template_molecule_count, units_to_molecule, write_sweep)
+
+def random_templates(generator):
+    """ Templates of different lengths and GC contents, in mixed case and with a few other letters """
+    templates = {}
+    for index, (length, gc) in enumerate(((50, 0.5), (400, 0.2), (1000, 0.8), (3000, 0.5))):
+        weights = [(1 - gc) / 2, gc / 2, gc / 2, (1 - gc) / 2]
+        sequence = "".join(generator.choices("acgt", weights, k=length))
+        templates[f"template_{index}"] = "".join(letter.upper() if generator.random() < 0.3 else letter for letter in sequence) + "n" * index
+
+    return templates
+
+class TestRcaSweep(unittest.TestCase):
+
+    def setUp(self):
+        self.templates = random_templates(random.Random(0))
+        self.conditions = ([5, 20, 50], [100, 2000], [1000, 10_000], [0.05, 1])
+
+    def test_sweep_matches_rca_time(self):
+        table = rca_sweep(self.templates, *self.conditions)
+        grid = list(itertools.product(self.templates.items(), *self.conditions))
+        self.assertEqual(len(table), len(grid))
+
+        for row, ((name, sequence), ntp, mass, phi29, volume) in zip(table, grid):
+            # The scalar functions print their intermediate values, and count_nt warns about the n
+            with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+                ntp_molecules = molar_to_molecule(f"{ntp} mM", volume)
+                template_molecules = dna_mass_to_moles(f"{mass} ng", sequence)
+                phi29_molecules = units_to_molecule(phi29, 83_333, 0.001)
+                expected = rca_time(count_nt(sequence), ntp_molecules, phi29_molecules, template_molecules)
+            self.assertEqual((row["template"], row["ntp_concentration"], row["template_mass"], row["phi29_concentration"], row["volume"]),
+                             (name, ntp, mass, phi29, volume))
+            self.assertTrue(np.isclose(row["ntp_molecules"], ntp_molecules, rtol=1e-12))
+            self.assertTrue(np.isclose(row["template_molecules"], template_molecules, rtol=1e-12))
+            self.assertTrue(np.isclose(row["phi29_molecules"], phi29_molecules, rtol=1e-12))
+            self.assertEqual(row["phi29_excess"], phi29_molecules > 2 * template_molecules)
+            self.assertTrue(np.isclose(row["rca_time"], expected, rtol=1e-12), (name, ntp, mass, phi29, volume))
+
+    def test_sequences_without_names(self):
+        table = rca_sweep(list(self.templates.values()), 20, 2000, 10_000, 1)
+        self.assertEqual(table["template"].tolist(), [f"template_{index + 1}" for index in range(len(self.templates))])
+        self.assertEqual(table["rca_time"].tolist(), rca_sweep(self.templates, 20, 2000, 10_000, 1)["rca_time"].tolist())
+
+class TestSimulateRca(unittest.TestCase):
+
+    def setUp(self):
+        generator = np.random.default_rng(0)
+        size = 50
+        # count_nt rows (A, T, G, C) of templates from 50 to 5000 nt and 20-80% GC
+        a_t = generator.integers(10, 2500, size)
+        g_c = generator.integers(10, 2500, size)
+        self.counts = np.stack((a_t, a_t, g_c, g_c), axis=1)
+        self.ntp_molecules = ntp_molecule_count(generator.uniform(1, 50, size), "mM", 1)
+        self.template_molecules = template_molecule_count(generator.uniform(10, 5000, size), "ng", a_t + g_c)
+        # From far fewer phi29 than strands to far more
+        self.phi29_molecules = self.template_molecules * 10 ** generator.uniform(-2, 2, size)
+
+    def closed_form(self):
+        highest = self.counts.max(axis=1)
+        return rca_minutes(rca_cycle_count(highest, self.ntp_molecules, self.template_molecules), self.counts.sum(axis=1) / 2)
+
+    def test_without_occupancy_matches_closed_form(self):
+        expected = self.closed_form()
+        # The closed form only holds once the first round completes
+        self.assertTrue((rca_cycle_count(self.counts.max(axis=1), self.ntp_molecules, self.template_molecules) > 1).all())
+        for steps in (10, 1000):
+            result = simulate_rca(self.counts, self.ntp_molecules, self.phi29_molecules, self.template_molecules, steps=steps)
+            np.testing.assert_allclose(result.completion_time, expected, rtol=1e-9)
+            # The last recorded point is the completion, with the scarcest dNTP used up
+            np.testing.assert_allclose(result.times[:, -1], expected, rtol=1e-9)
+            self.assertTrue((result.dntps[:, -1].min(axis=1) < 1e-6 * result.dntps[:, 0].max(axis=1)).all())
+
+    def test_single_reaction_and_count_dicts(self):
+        sequence = "".join(random.Random(1).choices("acgt", k=800))
+        with contextlib.redirect_stdout(io.StringIO()):
+            ntp_molecules = molar_to_molecule("20 mM", 1)
+            template_molecules = dna_mass_to_moles("2000 ng", sequence)
+            expected = rca_time(count_nt(sequence), ntp_molecules, 0, template_molecules)
+        result = simulate_rca(count_nt(sequence), ntp_molecules, 0, template_molecules)
+        self.assertTrue(np.isclose(result.completion_time[0], expected, rtol=1e-9))
+
+    def test_occupancy_only_slows_reactions_short_of_phi29(self):
+        expected = self.closed_form()
+        result = simulate_rca(self.counts, self.ntp_molecules, self.phi29_molecules, self.template_molecules, occupancy=True, curve_points=0)
+        in_excess = self.phi29_molecules >= 2 * self.template_molecules
+        np.testing.assert_allclose(result.completion_time[in_excess], expected[in_excess], rtol=1e-9)
+        self.assertTrue((result.completion_time[~in_excess] > expected[~in_excess]).all())
+
+    def test_sweep_kinetic_column(self):
+        table = rca_sweep(random_templates(random.Random(2)), [10, 20], [500, 2000], [10_000], [1], kinetic=True)
+        np.testing.assert_allclose(table["kinetic_time"], table["rca_time"], rtol=1e-9)
+
+class TestRcaBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        generator = random.Random(3)
+        self.templates = {f"record{index}": "".join(generator.choices("acgtACGTn", k=generator.randint(20, 600))) for index in range(40)}
+        self.input_path = self.path("templates.fasta")
+        with open(self.input_path, "w") as file:
+            for name, sequence in self.templates.items():
+                file.write(f">{name} template\n")
+                file.writelines(sequence[start:start + 60] + "\n" for start in range(0, len(sequence), 60))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def read(self, name):
+        with open(self.path(name), "r") as file:
+            return file.read()
+
+    def test_matches_sweep(self):
+        conditions = ([10, 20], [2000], [10_000], [0.5, 1])
+        write_sweep(rca_sweep(self.templates, *conditions), self.path("sweep.csv"))
+        for chunk_size, flush_records in ((7, 3), (100, 1000), (1 << 20, 10_000)):
+            self.assertEqual(rca_batch(self.input_path, self.path("batch.csv"), *conditions, chunk_size, flush_records), len(self.templates))
+            self.assertEqual(self.read("batch.csv"), self.read("sweep.csv"), (chunk_size, flush_records))
+
+    def test_workers_match_serial(self):
+        options = {"kinetic": True, "occupancy": True, "flush_records": 7, "chunk_size": 50}
+        rca_batch(self.input_path, self.path("serial.csv"), [10, 20], **options)
+        for workers in (2, 3):
+            self.assertEqual(rca_batch(self.input_path, self.path("parallel.csv"), [10, 20], workers=workers, **options), len(self.templates))
+            self.assertEqual(self.read("parallel.csv"), self.read("serial.csv"), workers)
+
+    def test_empty_file(self):
+        open(self.path("empty.fasta"), "w").close()
+        for workers in (1, 2):
+            self.assertEqual(rca_batch(self.path("empty.fasta"), self.path("empty.csv"), workers=workers), 0)
+            self.assertEqual(self.read("empty.csv").splitlines(), [",".join(rca_sweep([], 20, 2000, 10_000, 1).dtype.names)])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+import os
+import random
+import sys
+import unittest
+
+import numpy as np
+
+# primer_designer is a folder of scripts with sibling imports, so it goes on the path as it is
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.insert(0, os.path.join(REPOSITORY, "primer_designer"))
+
+from rca_time_predictor import rca_sweep
+from rca_uncertainty import monte_carlo_rca
+
+class TestMonteCarloRca(unittest.TestCase):
+
+    def setUp(self):
+        self.sequence = "".join(random.Random(0).choices("acgt", k=1500))
+
+    def test_workers_give_the_same_result(self):
+        # A tolerance of 0 never converges, so every batch up to max_samples is drawn
+        for options in ({"tolerance": 0.0, "max_samples": 20_000}, {"tolerance": 0.05, "max_samples": 200_000},
+                        {"tolerance": 0.0, "max_samples": 6_000, "kinetic": True, "occupancy": True, "steps": 20}):
+            serial = monte_carlo_rca(self.sequence, batch_size=2_000, seed=7, **options)
+            for workers in (2, 3):
+                parallel = monte_carlo_rca(self.sequence, batch_size=2_000, seed=7, workers=workers, **options)
+                self.assertEqual(parallel, serial, (workers, options))
+
+    def test_seed_and_convergence(self):
+        result = monte_carlo_rca(self.sequence, batch_size=2_000, max_samples=20_000, tolerance=0.0, seed=7)
+        self.assertFalse(result.converged)
+        self.assertEqual(result.samples, 20_000)
+        self.assertNotEqual(monte_carlo_rca(self.sequence, batch_size=2_000, max_samples=20_000, tolerance=0.0, seed=8), result)
+        self.assertTrue(monte_carlo_rca(self.sequence, batch_size=2_000, tolerance=0.05, seed=7).converged)
+
+    def test_without_uncertainty_every_percentile_is_the_closed_form(self):
+        result = monte_carlo_rca(self.sequence, uncertainty={}, batch_size=100, max_samples=200)
+        expected = rca_sweep([self.sequence], 20, 2000, 10_000, 1)["rca_time"][0]
+        for percentile in result.percentiles.values():
+            self.assertTrue(np.isclose(percentile, expected, rtol=1e-12))
+        self.assertTrue(result.converged)
+
+    def test_unknown_input(self):
+        with self.assertRaises(ValueError):
+            monte_carlo_rca(self.sequence, uncertainty={"temperature": 0.1})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import math
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+# primer_designer is a folder of scripts with sibling imports, so it goes on the path as it is
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.insert(0, os.path.join(REPOSITORY, "primer_designer"))
+
+from primer_class import SCORING_ERRORS, Primer
+from primer_score import cached_score, primer_score_calc, variables_access
+from score_cache import METRIC_COLUMNS, METRICS_VERSION, ScoreCache, primer_metrics
+
+VARIABLES = variables_access(os.path.join(REPOSITORY, "primer_designer", "variables.json"))
+
+def fresh_score(sequence, tm_mode):
+    try:
+        return primer_score_calc(Primer("x", sequence, tm_mode=tm_mode), VARIABLES)
+    # A NaN nearest-neighbour Tm cannot be compared either
+    except (*SCORING_ERRORS, ValueError):
+        return None
+
+def same_metrics(first, second):
+    return all(a == b or (isinstance(a, float) and isinstance(b, float) and math.isnan(a) and math.isnan(b)) for a, b in zip(first, second))
+
+class TestScoreCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "cache.sqlite3")
+        generator = random.Random(0)
+        # n and single letters give a NaN nearest-neighbour Tm, a missing dimer and so on
+        self.sequences = list({"".join(generator.choices(generator.choice(["acgt", "acgtn", "a"]), k=generator.randint(1, 35))) for _ in range(800)})
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_cache_hits_match_fresh_scores(self):
+        with ScoreCache(self.path) as cache:
+            cache.metrics(self.sequences)
+        with ScoreCache(self.path) as cache:
+            self.assertEqual(len(cache), len(self.sequences))
+            cached = cache.lookup(self.sequences)
+
+        self.assertEqual(cached.keys(), set(self.sequences))
+        for sequence in self.sequences:
+            self.assertTrue(same_metrics(cached[sequence], primer_metrics(sequence)), sequence)
+            for tm_mode in ("basic", "nearest_neighbour"):
+                self.assertEqual(cached_score(cached[sequence], VARIABLES, tm_mode), fresh_score(sequence, tm_mode), (sequence, tm_mode))
+
+    def test_nan_round_trip(self):
+        tm_nn = METRIC_COLUMNS.index("melting_temperature_nn")
+        with ScoreCache(self.path) as cache:
+            cache.metrics(["acgtnacgt", "a", "acgtacgtacgt"])
+        with ScoreCache(self.path) as cache:
+            cached = cache.lookup(["acgtnacgt", "a", "acgtacgtacgt"])
+            stored = dict(cache.connection.execute("SELECT sequence, melting_temperature_nn FROM metrics").fetchall())
+
+        # SQLite keeps NaN as NULL and the lookup turns it back into NaN
+        self.assertIsNone(stored["acgtnacgt"])
+        self.assertTrue(math.isnan(cached["acgtnacgt"][tm_nn]))
+        self.assertTrue(math.isnan(cached["a"][tm_nn]))
+        self.assertEqual(cached["acgtacgtacgt"][tm_nn], primer_metrics("acgtacgtacgt")[tm_nn])
+
+    def test_version_mismatch_empties_the_cache(self):
+        with ScoreCache(self.path) as cache:
+            cache.metrics(self.sequences)
+        with sqlite3.connect(self.path) as connection:
+            connection.execute("UPDATE settings SET value = ? WHERE key = 'metrics_version'", (str(METRICS_VERSION - 1),))
+        connection.close()
+
+        with ScoreCache(self.path) as cache:
+            self.assertEqual(len(cache), 0)
+            self.assertEqual(cache.lookup(self.sequences), {})
+        with sqlite3.connect(self.path) as connection:
+            version = connection.execute("SELECT value FROM settings WHERE key = 'metrics_version'").fetchone()[0]
+        connection.close()
+        self.assertEqual(int(version), METRICS_VERSION)
+
+if __name__ == "__main__":
+    unittest.main()
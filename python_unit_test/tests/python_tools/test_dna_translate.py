@@ -0,0 +1,193 @@
+import json
+import os
+import random
+import sys
+import tempfile
+import unittest
+
+# python_tools is a folder of scripts, so it goes on the path as it is
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.insert(0, os.path.join(REPOSITORY, "python_tools"))
+
+from dna_translate import Orf, codon_tables, find_orfs, genetic_codes, reverse_complement, translate_dna, translate_dna_masked, translate_fasta, translate_fasta_parallel
+
+def random_records(count, generator):
+    """ (name, sequence) records of every length class, with ambiguity codes, runs of n and mixed case """
+    records = []
+    for index in range(count):
+        length = generator.choice([0, 1, 2, 3, 5, generator.randint(6, 200), generator.randint(200, 3000)])
+        sequence = "".join(generator.choices("acgtACGT" * 6 + "rykmn", k=length))
+        if length > 20 and generator.random() < 0.5:
+            start = generator.randrange(length - 10)
+            sequence = sequence[:start] + "n" * generator.randint(1, 10) + sequence[start + 10:]
+        records.append((f"record{index}", sequence))
+
+    return records
+
+def write_fasta(path, records, generator):
+    with open(path, "w") as file:
+        for name, sequence in records:
+            file.write(f">{name} description of {name}\n")
+            width = generator.choice([10, 60, 80, max(len(sequence), 1)])
+            for start in range(0, len(sequence), width):
+                file.write(sequence[start:start + width] + "\n")
+
+def read_protein_fasta(path):
+    records = {}
+    name = None
+    with open(path, "r") as file:
+        for line in file:
+            if line.startswith(">"):
+                name = line[1:].strip()
+                records[name] = ""
+            else:
+                records[name] += line.strip()
+
+    return records
+
+def read_bed(path):
+    runs = {}
+    with open(path, "r") as file:
+        for line in file:
+            name, start, end = line.split()
+            runs.setdefault(name, []).append((int(start), int(end)))
+
+    return runs
+
+def expected_frames(records, genetic_code=1):
+    return {f"{name}_{frame}": protein for name, sequence in records for frame, protein in translate_dna(sequence, genetic_code).items()}
+
+def brute_force_orfs(sequence, min_length, genetic_code=1):
+    """ ORFs codon by codon: the first ATG after a stop or the frame start opens one, the next stop closes it """
+    sequence = sequence.lower()
+    frames = translate_dna(sequence, genetic_code)
+    orfs = []
+    for strand_index, (strand, strand_sequence) in enumerate((("+", sequence), ("-", reverse_complement(sequence)))):
+        for frame in range(3):
+            name = f"f{3 * strand_index + frame + 1}"
+            protein = frames[name]
+            start = None
+            for codon in range(len(protein)):
+                if start is None and strand_sequence[frame + 3 * codon:frame + 3 * codon + 3] == "atg":
+                    start = codon
+                if protein[codon] == "*":
+                    if start is not None and codon - start >= min_length:
+                        begin, end = frame + 3 * start, frame + 3 * codon + 3
+                        if strand == "-":
+                            begin, end = len(sequence) - end, len(sequence) - begin
+                        orfs.append(Orf(name, strand, begin, end, codon - start, protein[start:codon]))
+                    start = None
+
+    return orfs
+
+class TestTranslateFasta(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        generator = random.Random(0)
+        self.records = random_records(40, generator)
+        self.input_path = self.path("input.fasta")
+        write_fasta(self.input_path, self.records, generator)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def test_streaming_matches_translate_dna(self):
+        expected = expected_frames(self.records)
+        expected_runs = {name: runs for name, sequence in self.records if (runs := translate_dna_masked(sequence)[1])}
+        for chunk_size in (1, 2, 7, 64, 1000, 1 << 20):
+            count = translate_fasta(self.input_path, self.path("output.fasta"), chunk_size, self.path("masked.bed"))
+            self.assertEqual(count, len(self.records))
+            self.assertEqual(read_protein_fasta(self.path("output.fasta")), expected, chunk_size)
+            self.assertEqual(read_bed(self.path("masked.bed")), expected_runs, chunk_size)
+
+    def test_parallel_matches_serial(self):
+        translate_fasta(self.input_path, self.path("serial.fasta"), masked_path=self.path("serial.bed"))
+        with open(self.path("serial.fasta"), "r") as file:
+            serial = file.read()
+        with open(self.path("serial.bed"), "r") as file:
+            serial_runs = file.read()
+
+        # Small segments split records across tasks and shared memory batches
+        for workers, segment_size in ((2, 30), (2, 100), (3, 1000), (2, 1 << 20)):
+            count = translate_fasta_parallel(self.input_path, self.path("parallel.fasta"), workers, segment_size, self.path("parallel.bed"))
+            self.assertEqual(count, len(self.records))
+            with open(self.path("parallel.fasta"), "r") as file:
+                self.assertEqual(file.read(), serial, (workers, segment_size))
+            with open(self.path("parallel.bed"), "r") as file:
+                self.assertEqual(file.read(), serial_runs, (workers, segment_size))
+
+    def test_lines_are_wrapped(self):
+        translate_fasta(self.input_path, self.path("output.fasta"))
+        with open(self.path("output.fasta"), "r") as file:
+            lines = [line.rstrip("\n") for line in file if not line.startswith(">")]
+        self.assertTrue(all(0 < len(line) <= 60 for line in lines))
+
+class TestFindOrfs(unittest.TestCase):
+
+    def test_matches_brute_force(self):
+        generator = random.Random(1)
+        for _ in range(300):
+            # Few letters make ATGs and stops frequent; ambiguity codes give X and ambiguous stops
+            alphabet = generator.choice(["acgt", "atg", "tga", "acgtrn"])
+            sequence = "".join(generator.choices(alphabet, k=generator.randint(0, 400)))
+            for min_length in (0, 1, 5, 20):
+                for genetic_code in (1, 2):
+                    self.assertEqual(list(find_orfs(sequence, min_length, genetic_code)), brute_force_orfs(sequence, min_length, genetic_code),
+                                     (sequence, min_length, genetic_code))
+
+    def test_coordinates_cover_the_orf(self):
+        sequence = "cc" + "atg" + "aaa" * 5 + "taa" + "gg"
+        orfs = list(find_orfs(sequence + reverse_complement(sequence), 3))
+        self.assertEqual([(orf.strand, orf.start, orf.end, orf.protein) for orf in orfs],
+                         [("+", 2, 23, "MKKKKK"), ("-", 27, 48, "MKKKKK")])
+
+class TestGeneticCodes(unittest.TestCase):
+
+    def translate(self, codons, genetic_code):
+        return translate_dna("".join(codons), genetic_code)["f1"]
+
+    def test_non_standard_tables(self):
+        codons = ["aga", "agg", "tga", "ata", "ctg", "taa", "tag", "tgg"]
+        # NCBI tables 1, 2 (vertebrate mitochondrial), 3 (yeast mitochondrial), 4 (mold mitochondrial) and 11 (bacterial)
+        expected = {1: "RR*IL**W", 2: "**WML**W", 3: "RRWMT**W", 4: "RRWIL**W", 11: "RR*IL**W"}
+        for genetic_code, letters in expected.items():
+            self.assertEqual(self.translate(codons, genetic_code), letters, genetic_code)
+
+    def test_tables_follow_genetic_codes_json(self):
+        with open(os.path.join(REPOSITORY, "genetic_codes.json"), "r") as file:
+            tables = json.load(file)
+        codon_list = [x + y + z for x in "tcag" for y in "tcag" for z in "tcag"]
+        self.assertEqual(set(genetic_codes()), {int(number) for number in tables})
+        for number, table in tables.items():
+            self.assertEqual(self.translate(codon_list, int(number)), table["amino_acids"], number)
+            self.assertEqual(self.translate(codon_list, number), table["amino_acids"], number)
+
+    def test_standard_table_matches_codons_json(self):
+        with open(os.path.join(REPOSITORY, "codons.json"), "r") as file:
+            codons = json.load(file)
+        codon_list = sorted(codons)
+        expected = "".join(codons[codon]["letter"] for codon in codon_list)
+        self.assertEqual(self.translate(codon_list, 1), expected)
+        self.assertEqual(self.translate(codon_list, os.path.join(REPOSITORY, "codons.json")), expected)
+
+    def test_ambiguous_codons(self):
+        # gcn is alanine in every table; tgr (tga or tgg) only resolves in table 2, where tga is W
+        self.assertEqual(self.translate(["gcn", "tar", "tgr", "agr"], 1), "A*XR")
+        self.assertEqual(self.translate(["gcn", "tar", "tgr", "agr"], 2), "A*W*")
+
+    def test_reverse_table_and_unknown_code(self):
+        generator = random.Random(2)
+        for genetic_code in (1, 2, 5):
+            table, reverse_table = codon_tables(genetic_code)
+            sequence = "".join(generator.choices("acgt", k=300))
+            self.assertEqual(translate_dna(sequence, genetic_code)["f4"], translate_dna(reverse_complement(sequence), genetic_code)["f1"])
+            self.assertFalse(table.flags.writeable or reverse_table.flags.writeable)
+        with self.assertRaises(ValueError):
+            codon_tables(7)
+
+if __name__ == "__main__":
+    unittest.main()
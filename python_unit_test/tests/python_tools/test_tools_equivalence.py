@@ -0,0 +1,99 @@
+import json
+import os
+import random
+import sys
+import tempfile
+import unittest
+
+# python_tools is a folder of scripts, so it goes on the path as it is
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.insert(0, os.path.join(REPOSITORY, "python_tools"))
+
+from blast_coverage_check import blast_sequence_coverage
+from dna_translate import translate_dna
+
+# The original implementations, kept here to check the optimised ones against
+
+with open(os.path.join(REPOSITORY, "codons.json"), "r") as file:
+    CODONS = json.load(file)
+
+BASE_PAIRS = {"a": "t", "t": "a", "g": "c", "c": "g"}
+
+def old_reverse_complement(sequence):
+    sense_reverse_complement = ""
+    for letter in sequence.lower()[::-1]:
+        sense_reverse_complement += BASE_PAIRS[letter]
+
+    return sense_reverse_complement
+
+def old_translation_helper(sequence):
+    frames = []
+    for i in range(3):
+        translation = ""
+        temp = sequence[i:].lower()
+        start = 0
+        end = start + 3
+        while end <= len(temp):
+            translation += CODONS[temp[start:end]]["letter"]
+            start += 3
+            end = start + 3
+
+        frames.append(translation)
+
+    return frames
+
+def old_translate_dna(sequence):
+    frames = old_translation_helper(sequence) + old_translation_helper(old_reverse_complement(sequence))
+    return {f"f{i+1}": seq for i, seq in enumerate(frames)}
+
+def set_coverage_gaps(hits, q_length):
+    """
+    The set-based gap search of blast_sequence_coverage before it merged intervals. The original dropped a gap
+    of a single position when it was the only one; this copy reports it as "n-n" like every other gap.
+    """
+
+    coverage_gap = set(range(1, q_length + 1))
+    for start, end in hits:
+        coverage_gap -= set(range(start, end + 1))
+    if not coverage_gap:
+        return None
+
+    gaps = sorted(coverage_gap)
+    gap_ranges = []
+    first = previous = gaps[0]
+    for num in gaps[1:]:
+        if previous + 1 != num:
+            gap_ranges.append(f"{first}-{previous}")
+            first = num
+        previous = num
+    gap_ranges.append(f"{first}-{previous}")
+
+    return gap_ranges
+
+class TestTranslateDna(unittest.TestCase):
+
+    def test_translate_dna(self):
+        generator = random.Random(0)
+        for _ in range(500):
+            sequence = "".join(generator.choices("acgtACGT", k=generator.randint(0, 200)))
+            self.assertEqual(translate_dna(sequence), old_translate_dna(sequence), sequence)
+
+class TestBlastCoverage(unittest.TestCase):
+
+    def test_blast_sequence_coverage(self):
+        generator = random.Random(0)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "hits.csv")
+            for _ in range(1000):
+                q_length = generator.randint(0, 80)
+                hits = []
+                for _ in range(generator.randint(0, 6)):
+                    start = generator.randint(-5, 90)
+                    hits.append((start, start + generator.randint(0, 30)))
+                with open(path, "w") as file:
+                    file.writelines(f"query,subject,99.0,{start},{end}\n" for start, end in hits)
+
+                self.assertEqual(blast_sequence_coverage(path, q_length), set_coverage_gaps(hits, q_length), (hits, q_length))
+
+if __name__ == "__main__":
+    unittest.main()